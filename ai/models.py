@@ -1,183 +1,105 @@
+import json
 import time
 import hashlib
 import streamlit as st
-from openai import OpenAI
-import google.generativeai as genai
-from config import TEMPERATURA_FIXA, LIMITE_TOKENS
-from ai.schemas import AnaliseBiologica
-
-@st.cache_resource
-def get_nvidia_client():
-    return OpenAI(
-        api_key=st.secrets["NVIDIA_API_KEY"], 
-        base_url="https://integrate.api.nvidia.com/v1"
-    )
-
-
-def _get_openai_keys():
-    """Retorna lista de chaves OpenAI disponíveis."""
-    keys = []
-    if "OPENAI_API_KEY" in st.secrets:
-        keys.append(st.secrets["OPENAI_API_KEY"])
-    if "OPENAI_API_KEY_2" in st.secrets:
-        keys.append(st.secrets["OPENAI_API_KEY_2"])
-    return keys
-
-
-def _chamar_openai(nome_modelo, prompt, img_codificada, kwargs):
-    """Tenta chamar OpenAI com fallback entre chaves (mesmo padrão do Gemini)."""
-    keys = _get_openai_keys()
-    if not keys:
-        raise Exception("Nenhuma chave OpenAI configurada.")
-
-    last_error = None
-    for i, api_key in enumerate(keys):
-        try:
-            client = OpenAI(api_key=api_key)
-            mensagens = [{
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_codificada}"}}
-                ]
-            }]
-
-            try:
-                # Structured Outputs (SDK recente)
-                r = client.beta.chat.completions.parse(
-                    model=nome_modelo,
-                    messages=mensagens,
-                    response_format=AnaliseBiologica,
-                    **kwargs
-                )
-                return r.choices[0].message.parsed.model_dump_json()
-
-            except Exception as e_struct:
-                print(f"Erro ao usar Structured Outputs: {e_struct}. Tentando fallback JSON Mode.")
-                r = client.chat.completions.create(
-                    model=nome_modelo,
-                    messages=mensagens,
-                    response_format={"type": "json_object"},
-                    **kwargs
-                )
-                return r.choices[0].message.content
-
-        except Exception as e:
-            print(f"[OPENAI] Chave {i+1} falhou: {e}")
-            last_error = e
-            if i < len(keys) - 1:
-                print("Tentando próxima chave...")
-                continue
-
-    raise last_error
+from config import TTL_CACHE_ANALISE_S
+from ai.provedores import obter_registro, imagem_primeiro
+from ai.prazos import PrazoExcedido, chamar_com_prazo, orcamento_latencia
+from ai.saude import disjuntores
+from utils.estado import obter_backend
+from utils.tracing import span, marcar_erro, registrar_evento
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def executar_analise_cached(nome_modelo: str, prompt: str, img_hash: str, img_codificada: str, tipo: int):
+def _analisar_com_retries(nome_modelo: str, prompt: str, img_codificada: str, provedor: str):
     start = time.time()
     max_retries = 2
     tempo_espera = 20
+    # Prazo único para todas as tentativas: nenhum duelo espera mais que o orçamento do modelo
+    orcamento = orcamento_latencia(nome_modelo)
+    prazo = time.monotonic() + orcamento
+    instancia = obter_registro().provedor(provedor)
+
+    if instancia.limitador:
+        with span("provedor.limite_taxa", provedor=provedor):
+            liberado = instancia.limitador.adquirir(prazo)
+        if not liberado:
+            registrar_evento("modelo.limite_taxa", f"Limite de requisições do provedor {provedor} esgotado até o prazo do {nome_modelo}.",
+                             nivel="erro", modelo=nome_modelo, provedor=provedor)
+            return False, None, time.time() - start
 
     for tentativa in range(max_retries):
         try:
-            resposta_modelo = ""
-
-            if tipo == 1:
-                # Modelos novos (gpt-5*) usam max_completion_tokens
-                token_param = "max_completion_tokens" if "gpt-5" in nome_modelo else "max_tokens"
-                
-                # Alguns modelos novos não permitem temperatura != 1
-                kwargs = {token_param: LIMITE_TOKENS}
-                if not ("gpt-5" in nome_modelo or "o1" in nome_modelo):
-                    kwargs["temperature"] = TEMPERATURA_FIXA
-
-                resposta_modelo = _chamar_openai(nome_modelo, prompt, img_codificada, kwargs)
-
-            elif tipo == 2:
-                keys = []
-                if "GOOGLE_API_KEY" in st.secrets: keys.append(st.secrets["GOOGLE_API_KEY"])
-                if "GOOGLE_API_KEY_2" in st.secrets: keys.append(st.secrets["GOOGLE_API_KEY_2"])
-                
-                if not keys:
-                    raise Exception("Nenhuma chave Gemini configurada.")
-
-                last_error = None
-                for i, api_key in enumerate(keys):
-                    try:
-                        genai.configure(api_key=api_key)
-                        model = genai.GenerativeModel(nome_modelo)
-                        config_simples = {
-                            "temperature": TEMPERATURA_FIXA,
-                            "max_output_tokens": LIMITE_TOKENS,
-                            "response_mime_type": "application/json",
-                            "response_schema": AnaliseBiologica
-                        }
-                        
-                        blob = {"mime_type": "image/jpeg", "data": img_codificada}
-                        r = model.generate_content(
-                            [prompt, blob],
-                            generation_config=config_simples
-                        )
-                        resposta_modelo = r.text
-                        last_error = None
-                        break
-                        
-                    except Exception as e:
-                        print(f"[GEMINI] Chave {i+1} falhou: {e}")
-                        last_error = e
-                        if i < len(keys) - 1:
-                            print(f"Tentando próxima chave...")
-                            continue
-                
-                if last_error:
-                    raise last_error
-
-
-
-            elif tipo == 4:
-                client = get_nvidia_client()
-                r = client.chat.completions.create(
-                    model=nome_modelo,
-                    messages=[{
-                        "role": "system",
-                         "content": "You are a specialized biology assistant. You MUST output ONLY a valid JSON object matching the schema. Do not include markdown formatting (```json), explanations, or any other text."
-                    }, {
-                        "role":"user",
-                        "content":[
-                            {"type":"text","text":prompt},
-                            {"type":"image_url","image_url":{"url":f"data:image/jpeg;base64,{img_codificada}"}}
-                        ]
-                    }],
-                    temperature=TEMPERATURA_FIXA,
-                    max_tokens=LIMITE_TOKENS,
-                    response_format={
-                        "type": "json_schema",
-                        "json_schema": {
-                            "name": "AnaliseBiologica",
-                            "schema": AnaliseBiologica.model_json_schema()
-                        }
-                    }
-                )
-                resposta_modelo = r.choices[0].message.content
-
-            print(f"[LOG] Sucesso no modelo {nome_modelo} em {(time.time() - start):.2f}s")
+            with span("modelo.chamada", modelo=nome_modelo, provedor=provedor, tentativa=tentativa + 1,
+                      prazo_s=round(prazo - time.monotonic(), 3)) as s:
+                resposta_modelo = chamar_com_prazo(instancia, nome_modelo, prompt, img_codificada, prazo, s["attributes"])
+
+            registrar_evento("modelo.sucesso", f"Sucesso no modelo {nome_modelo} em {(time.time() - start):.2f}s",
+                             modelo=nome_modelo, tentativas=tentativa + 1, duracao_s=time.time() - start)
             return True, resposta_modelo, time.time() - start
 
+        except PrazoExcedido:
+            registrar_evento("modelo.prazo_excedido", f"Prazo de {orcamento:.0f}s excedido no modelo {nome_modelo}.",
+                             nivel="erro", modelo=nome_modelo, orcamento_s=orcamento, tentativa=tentativa + 1)
+            return False, None, time.time() - start
+
         except Exception as e:
             erro_msg = str(e)
+            cabe_no_prazo = prazo - time.monotonic() > tempo_espera
 
-            if ("429" in erro_msg or "quota" in erro_msg or "exhausted" in erro_msg) and tentativa < max_retries - 1:
-                print(f"[LOG] Cota excedida no {nome_modelo}. Tentativa {tentativa+1}. Aguardando {tempo_espera}s...")
-                time.sleep(tempo_espera)
+            if ("429" in erro_msg or "quota" in erro_msg or "exhausted" in erro_msg) and tentativa < max_retries - 1 and cabe_no_prazo:
+                registrar_evento("modelo.cota_excedida", f"Cota excedida no {nome_modelo}. Tentativa {tentativa+1}. Aguardando {tempo_espera}s...",
+                                 nivel="aviso", modelo=nome_modelo, tentativa=tentativa + 1, espera_s=tempo_espera)
+                with span("modelo.espera_retry", modelo=nome_modelo, tentativa=tentativa + 1):
+                    time.sleep(tempo_espera)
                 continue
 
-            print(f"[LOG] Erro fatal no modelo {nome_modelo}: {erro_msg}")
+            registrar_evento("modelo.erro_fatal", f"Erro fatal no modelo {nome_modelo}: {erro_msg}", nivel="erro", modelo=nome_modelo)
             return False, None, time.time() - start
 
-    print(f"[LOG] Falha total no modelo {nome_modelo} após {max_retries} tentativas.")
+    registrar_evento("modelo.falha_total", f"Falha total no modelo {nome_modelo} após {max_retries} tentativas.", nivel="erro", modelo=nome_modelo)
     return False, None, time.time() - start
 
-def executar_analise(nome_modelo, prompt, imagem, img_codificada):
-    tipo = st.session_state.modelos_disponiveis.get(nome_modelo)
-    img_hash = hashlib.sha256(img_codificada.encode()).hexdigest()
-    return executar_analise_cached(nome_modelo, prompt, img_hash, img_codificada, tipo)
\ No newline at end of file
+
+def _chave_analise(nome_modelo: str, prompt: str, img_hash: str) -> str:
+    # A ordem imagem/texto muda a requisição: chamadas com prefixo compartilhado (varredura) não dividem entrada com a arena
+    ordem = ":imagem_primeiro" if imagem_primeiro() else ""
+    return f"analise:{nome_modelo}:{hashlib.sha1(prompt.encode()).hexdigest()}:{img_hash}{ordem}"
+
+
+def executar_analise_cached(nome_modelo: str, prompt: str, img_hash: str, img_codificada: str, provedor: str):
+    # Cache de inferência no backend compartilhado (utils/estado.py): uma resposta paga numa réplica
+    # serve todas. A imagem entra na chave só pelo img_hash. Falhas não são guardadas.
+    backend = obter_backend()
+    chave = _chave_analise(nome_modelo, prompt, img_hash)
+    guardado = backend.obter(chave)
+    if guardado is not None:
+        # Cache hit não diz nada sobre a saúde do provedor, mas devolve a vaga de sondagem se esta era uma
+        disjuntores.liberar(nome_modelo)
+        registro = json.loads(guardado)
+        return True, registro["resposta"], registro["tempo"]
+
+    sucesso, resposta, tempo = _analisar_com_retries(nome_modelo, prompt, img_codificada, provedor)
+    # Só chamadas reais alimentam o disjuntor (cache hits não dizem nada sobre a saúde do provedor)
+    disjuntores.registrar(nome_modelo, sucesso, tempo)
+    if sucesso:
+        backend.definir(chave, json.dumps({"resposta": resposta, "tempo": tempo}).encode("utf-8"), TTL_CACHE_ANALISE_S)
+    return sucesso, resposta, tempo
+
+def executar_analise(nome_modelo, prompt, imagem, img_codificada, img_hash=None):
+    provedor = st.session_state.modelos_disponiveis.get(nome_modelo)
+    if img_hash is None:
+        # Sequências (lista de quadros) já chegam com o hash de utils.image.codificar_sequencia
+        anexos = [img_codificada] if isinstance(img_codificada, str) else img_codificada
+        with span("imagem.hash"):
+            img_hash = hashlib.sha256("".join(anexos).encode()).hexdigest()
+    # Disjuntor aberto: falha na hora, sem gastar a chamada nem o tempo do avaliador (e sem entrar no cache)
+    if not disjuntores.permitir(nome_modelo):
+        registrar_evento("modelo.disjuntor_aberto", f"Modelo {nome_modelo} indisponível (disjuntor aberto).",
+                         nivel="aviso", modelo=nome_modelo)
+        return False, None, 0.0
+    # Em cache hit o span "modelo.chamada" não aparece: só este, com a duração da consulta ao cache
+    with span("modelo.analise", modelo=nome_modelo, provedor=provedor):
+        sucesso, resposta, tempo = executar_analise_cached(nome_modelo, prompt, img_hash, img_codificada, provedor)
+        if not sucesso:
+            marcar_erro(f"Falha no modelo {nome_modelo}")
+        return sucesso, resposta, tempo
\ No newline at end of file
@@ -0,0 +1,138 @@
+import re
+import json
+from functools import lru_cache
+from typing import NamedTuple
+from pydantic import ValidationError
+from ai.schemas import AnaliseBiologica
+
+# Camada única de parsing das respostas dos modelos: extrai, repara e valida uma vez,
+# e devolve um registro compacto reutilizado pela UI, pelo gravador no banco e pelas análises.
+
+try:
+    import orjson
+
+    def _carregar_json(texto: str):
+        return orjson.loads(texto)
+except ImportError:
+    _carregar_json = json.loads
+
+_DECODIFICADOR = json.JSONDecoder()
+_CERCA_MARKDOWN = re.compile(r"```(?:json|JSON)?\s*(.*?)\s*```", re.DOTALL)
+_MAX_CORTES_REPARO = 8
+
+
+class RespostaAnalisada(NamedTuple):
+    dados: dict | None       # objeto JSON extraído (não modificar: é compartilhado pelo cache)
+    json_valido: bool        # JSON completo obtido (com ou sem limpeza de cercas/texto extra)
+    reparado: bool           # foi preciso limpar cercas markdown, texto extra ou fechar truncamento
+    truncado: bool           # JSON incompleto fechado à força; os campos finais podem estar faltando
+    schema_valido: bool      # dados batem com ai/schemas.py::AnaliseBiologica
+    erro: str | None = None
+
+
+RESPOSTA_VAZIA = RespostaAnalisada(None, False, False, False, False, "resposta vazia")
+
+
+def _tentar_carregar(texto: str):
+    try:
+        return _carregar_json(texto)
+    except (ValueError, TypeError):
+        return None
+
+
+def _remover_cercas(texto: str) -> str:
+    encontrado = _CERCA_MARKDOWN.search(texto)
+    if encontrado:
+        return encontrado.group(1)
+    if texto.startswith("```"):
+        # Cerca aberta e nunca fechada (resposta truncada)
+        return re.sub(r"^```(?:json|JSON)?\s*", "", texto)
+    return texto
+
+
+def _fechar_truncado(texto: str):
+    # Fecha um objeto JSON cortado no meio: encerra a string aberta e os colchetes/chaves pendentes.
+    # Se ainda assim não carregar, recua até a última vírgula de nível estrutural e tenta de novo.
+    pilha = []
+    virgulas = []
+    em_string = False
+    escapado = False
+
+    for posicao, caractere in enumerate(texto):
+        if em_string:
+            if escapado:
+                escapado = False
+            elif caractere == "\\":
+                escapado = True
+            elif caractere == '"':
+                em_string = False
+            continue
+        if caractere == '"':
+            em_string = True
+        elif caractere in "{[":
+            pilha.append("}" if caractere == "{" else "]")
+        elif caractere in "}]":
+            if pilha:
+                pilha.pop()
+        elif caractere == ",":
+            virgulas.append((posicao, list(pilha)))
+
+    candidato = texto + ('"' if em_string else "") + "".join(reversed(pilha))
+    dados = _tentar_carregar(candidato)
+    if dados is not None:
+        return dados
+
+    for posicao, pilha_na_virgula in reversed(virgulas[-_MAX_CORTES_REPARO:]):
+        dados = _tentar_carregar(texto[:posicao] + "".join(reversed(pilha_na_virgula)))
+        if dados is not None:
+            return dados
+    return None
+
+
+def _validar(dados: dict, reparado: bool, truncado: bool) -> RespostaAnalisada:
+    try:
+        AnaliseBiologica.model_validate(dados)
+        return RespostaAnalisada(dados, not truncado, reparado, truncado, True)
+    except ValidationError as e:
+        return RespostaAnalisada(dados, not truncado, reparado, truncado, False, f"schema: {e.error_count()} erro(s)")
+
+
+@lru_cache(maxsize=8192)
+def _analisar_texto(texto: str) -> RespostaAnalisada:
+    limpo = texto.strip()
+    if not limpo:
+        return RESPOSTA_VAZIA
+
+    # Caminho rápido: a grande maioria das respostas (JSON Mode / Structured Outputs) já vem limpa
+    dados = _tentar_carregar(limpo)
+    if isinstance(dados, dict):
+        return _validar(dados, reparado=False, truncado=False)
+
+    # Cercas markdown e texto antes/depois do objeto
+    sem_cercas = _remover_cercas(limpo)
+    inicio = sem_cercas.find("{")
+    if inicio < 0:
+        return RespostaAnalisada(None, False, False, False, False, "nenhum objeto JSON encontrado")
+
+    try:
+        dados, _ = _DECODIFICADOR.raw_decode(sem_cercas, inicio)
+        if isinstance(dados, dict):
+            return _validar(dados, reparado=True, truncado=False)
+    except ValueError:
+        pass
+
+    # Último recurso: objeto truncado (estouro de tokens, conexão cortada)
+    dados = _fechar_truncado(sem_cercas[inicio:])
+    if isinstance(dados, dict):
+        return _validar(dados, reparado=True, truncado=True)
+
+    return RespostaAnalisada(None, False, False, False, False, "JSON inválido")
+
+
+def analisar_resposta(resposta) -> RespostaAnalisada:
+    """Extrai, repara e valida a resposta de um modelo. Memorizado por texto: chamar de novo é O(1)."""
+    if isinstance(resposta, dict):
+        return _validar(resposta, reparado=False, truncado=False)
+    if not isinstance(resposta, str):
+        return RESPOSTA_VAZIA
+    return _analisar_texto(resposta)
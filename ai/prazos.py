@@ -0,0 +1,131 @@
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from config import (
+    ORCAMENTO_LATENCIA_PADRAO_S, ORCAMENTOS_LATENCIA_S,
+    HEDGE_HABILITADO, HEDGE_PERCENTIL, HEDGE_MIN_AMOSTRAS
+)
+
+# Prazos por chamada de modelo e requisições duplicadas (hedging).
+# Cada chamada recebe um prazo absoluto (time.monotonic) que é repassado ao provedor como timeout HTTP,
+# então nenhuma chamada passa do orçamento do modelo. Se a resposta demora mais que o p90 recente
+# do modelo, uma segunda requisição sai por outra chave e vale a que voltar primeiro; a perdedora
+# é abandonada e encerra sozinha quando o timeout dela vence.
+
+
+class PrazoExcedido(TimeoutError):
+    pass
+
+
+def orcamento_latencia(nome_modelo: str) -> float:
+    """Orçamento (s) do modelo: prefixo mais longo em ORCAMENTOS_LATENCIA_S, senão o padrão."""
+    prefixos = [p for p in ORCAMENTOS_LATENCIA_S if nome_modelo.startswith(p)]
+    if not prefixos:
+        return ORCAMENTO_LATENCIA_PADRAO_S
+    return ORCAMENTOS_LATENCIA_S[max(prefixos, key=len)]
+
+
+def tempo_restante(prazo: float | None) -> float | None:
+    """Segundos até o prazo, para usar como timeout da requisição (None = sem prazo)."""
+    if prazo is None:
+        return None
+    return max(prazo - time.monotonic(), 0.1)
+
+
+def motivo_falha(nome_modelo: str, tempo: float) -> str:
+    # Chamadas que falham por prazo terminam no orçamento; folga de 2% para o relógio de parede
+    return "prazo" if tempo >= orcamento_latencia(nome_modelo) * 0.98 else "erro"
+
+
+class HistoricoLatencia:
+    """Janela das latências recentes de sucesso por modelo, compartilhada pelo processo."""
+
+    def __init__(self, janela: int = 200):
+        self.janela = janela
+        self._amostras = {}
+        self._trava = threading.Lock()
+
+    def registrar(self, nome_modelo: str, duracao_s: float):
+        with self._trava:
+            self._amostras.setdefault(nome_modelo, deque(maxlen=self.janela)).append(duracao_s)
+
+    def percentil(self, nome_modelo: str, q: float, min_amostras: int = 1) -> float | None:
+        with self._trava:
+            amostras = list(self._amostras.get(nome_modelo, ()))
+        if len(amostras) < min_amostras:
+            return None
+        import numpy as np
+
+        return float(np.percentile(amostras, q))
+
+
+historico_latencia = HistoricoLatencia()
+
+# Threads das chamadas; as abandonadas ficam presas só até o timeout HTTP (o prazo)
+_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="ecollm-modelo")
+
+
+def _disparar(provedor, nome_modelo, prompt, img_codificada, prazo, chave):
+    inicio = time.monotonic()
+    # A thread herda o contexto de quem chamou (ex.: ai.provedores.prefixo_compartilhado)
+    futuro = _executor.submit(contextvars.copy_context().run, provedor.chamar, nome_modelo, prompt, img_codificada,
+                              prazo=prazo, chave=chave)
+
+    def _ao_terminar(f):
+        # Conta também as chamadas que perderam a corrida: o p90 deve refletir o provedor, não o hedge
+        if not f.cancelled() and f.exception() is None:
+            historico_latencia.registrar(nome_modelo, time.monotonic() - inicio)
+
+    futuro.add_done_callback(_ao_terminar)
+    return futuro
+
+
+def atraso_hedge(provedor, nome_modelo: str) -> float | None:
+    """Quanto esperar antes do hedge, ou None se não há hedge (desligado, chave única ou histórico curto)."""
+    if not HEDGE_HABILITADO or provedor.num_chaves() < 2:
+        return None
+    return historico_latencia.percentil(nome_modelo, HEDGE_PERCENTIL, HEDGE_MIN_AMOSTRAS)
+
+
+def chamar_com_prazo(provedor, nome_modelo: str, prompt: str, img_codificada: str, prazo: float,
+                     atributos: dict = None) -> str:
+    """Chama o modelo até o prazo, com hedge opcional. `atributos` (ex.: de um span) recebe o que aconteceu."""
+    atributos = atributos if atributos is not None else {}
+    atributos.update({"hedge": False, "vencedor": None})
+
+    principal = _disparar(provedor, nome_modelo, prompt, img_codificada, prazo, chave=0)
+    pendentes = {principal: "principal"}
+
+    atraso = atraso_hedge(provedor, nome_modelo)
+    if atraso is not None and time.monotonic() + atraso < prazo:
+        feitos, _ = wait([principal], timeout=atraso)
+        if not feitos:
+            pendentes[_disparar(provedor, nome_modelo, prompt, img_codificada, prazo, chave=1)] = "hedge"
+            atributos.update({"hedge": True, "atraso_hedge_s": round(atraso, 3)})
+
+    ultimo_erro = None
+    while pendentes:
+        feitos, _ = wait(pendentes, timeout=max(prazo - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+        if not feitos:
+            break
+        for futuro in feitos:
+            origem = pendentes.pop(futuro)
+            try:
+                resposta = futuro.result()
+            except Exception as e:
+                ultimo_erro = e
+                continue
+            for perdedor in pendentes:
+                perdedor.cancel()
+            atributos["vencedor"] = origem
+            return resposta
+
+    if not pendentes and ultimo_erro is not None:
+        raise ultimo_erro
+
+    for abandonado in pendentes:
+        abandonado.cancel()
+    atributos["prazo_excedido"] = True
+    raise PrazoExcedido(f"Prazo excedido para {nome_modelo} ({len(pendentes)} requisição(ões) abandonada(s)).")
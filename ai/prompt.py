@@ -38,4 +38,20 @@ Retorne a análise estritamente em formato JSON, sem qualquer texto adicional, c
 
 Condição de exceção:
 Se nenhum animal for detectado, retorne "Nenhum" em todos os campos, exceto em "descricao_imagem" e "razao", que devem conter apenas a descrição visual da cena e a justificativa para essa classificação.
-"""
\ No newline at end of file
+"""
+
+
+# --- SEQUÊNCIAS (duelos com vários quadros da mesma rajada) ---
+# Acrescentado ao prompt sorteado; o banco guarda o prompt base (o filtro por prompt do painel não muda)
+NOTA_SEQUENCIA = """
+Observação: as {n} imagens anexadas são quadros consecutivos de um mesmo disparo da armadilha fotográfica (a mesma cena, com segundos de diferença). Use todos os quadros em conjunto para identificar a espécie e conte os indivíduos sem repetir o mesmo animal visto em quadros diferentes. Retorne uma única análise para a sequência.
+"""
+
+NOTA_MOSAICO = """
+Observação: a imagem é um mosaico de {n} quadros consecutivos de um mesmo disparo da armadilha fotográfica (a mesma cena, com segundos de diferença), em ordem da esquerda para a direita e de cima para baixo. Use todos os quadros em conjunto para identificar a espécie e conte os indivíduos sem repetir o mesmo animal visto em quadros diferentes. Retorne uma única análise para a sequência.
+"""
+
+
+def prompt_sequencia(prompt: str, quadros: int, modo: str) -> str:
+    nota = NOTA_MOSAICO if modo == "mosaico" else NOTA_SEQUENCIA
+    return prompt.rstrip() + "\n" + nota.format(n=quadros)
@@ -0,0 +1,563 @@
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from config import (
+    TEMPERATURA_FIXA, LIMITE_TOKENS,
+    MODELOS_OPENAI, MODELOS_GEMINI, MODELOS_NVIDIA, PROVEDORES_HABILITADOS, LIMITES_RPM
+)
+from ai.schemas import AnaliseBiologica
+from ai.prazos import tempo_restante
+from utils.estado import LimitadorTaxa
+
+# Plugins de provedores de inferência. Cada provedor sabe chamar seus modelos (síncrono, assíncrono,
+# streaming e em lote) e declara suas capacidades. O registro é montado uma vez por processo.
+# Os SDKs (openai, google.generativeai) só são importados na primeira chamada: montar o registro para
+# a tela de login não paga o import deles (ver benchmarks/bench_inicio.py).
+#
+# Servidores extras compatíveis com a API da OpenAI (vLLM, llama.cpp, Ollama...) são só configuração:
+#   [provedores.llamacpp]
+#   tipo = "openai_compativel"
+#   base_url = "http://localhost:8080/v1"
+#   api_key = "local"
+#   modelos = ["qwen2.5-vl-3b"]
+#   # opcionais: suporta_temperatura, parametro_tokens, prompt_sistema, formato_resposta, max_concorrencia, limite_rpm,
+#   #            max_imagens (anexos por requisição, padrão 1; duelos em sequência usam o mosaico acima disso),
+#   #            cache_prefixo (o servidor reaproveita prefixos repetidos, ex.: vLLM com --enable-prefix-caching)
+#
+# Modelo de visão local em CPU (tipo = "local", ver ProvedorLocal):
+#   [provedores.local]
+#   tipo = "local"
+#   base_url = "http://127.0.0.1:8081/v1"
+#   modelos = ["smolvlm-500m"]
+#   comando = ["llama-server", "-hf", "ggml-org/SmolVLM-500M-Instruct-GGUF", "--port", "8081", "--parallel", "4"]
+#   slots = 4
+
+PROMPT_SISTEMA_JSON = "You are a specialized biology assistant. You MUST output ONLY a valid JSON object matching the schema. Do not include markdown formatting (```json), explanations, or any other text."
+
+
+def _chaves(*nomes):
+    """Chaves de API presentes no secrets, na ordem de preferência."""
+    return [st.secrets[n] for n in nomes if n in st.secrets]
+
+
+# Chave de prefixo compartilhado (ver prefixo_compartilhado). Contextvar: vale só para as chamadas de quem a definiu
+_prefixo = contextvars.ContextVar("ecollm_prefixo", default=None)
+
+
+@contextmanager
+def prefixo_compartilhado(chave: str):
+    """Chamadas dentro do bloco mandam a imagem antes do texto e se identificam por `chave`.
+
+    A arena manda o texto primeiro. Na varredura de prompts (ai/varredura.py) a mesma imagem vai com vários
+    prompts em seguida; com a imagem na frente, o prefixo longo (os tokens da imagem) é igual entre eles e
+    provedores com cache de prefixo só cobram o texto cheio. `chave` agrupa as requisições no mesmo cache.
+    """
+    token = _prefixo.set(chave)
+    try:
+        yield
+    finally:
+        _prefixo.reset(token)
+
+
+def imagem_primeiro() -> bool:
+    """A chamada atual está dentro de um prefixo_compartilhado (imagem antes do texto)."""
+    return _prefixo.get() is not None
+
+
+def _url_imagem(img_codificada: str) -> dict:
+    return {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_codificada}"}}
+
+
+def _anexos(img_codificada) -> list:
+    # Uma imagem (str) ou os quadros de uma sequência (lista), sempre como lista de base64
+    return [img_codificada] if isinstance(img_codificada, str) else list(img_codificada)
+
+
+def _conteudo_usuario(prompt: str, img_codificada) -> list:
+    texto = [{"type": "text", "text": prompt}]
+    imagens = [_url_imagem(i) for i in _anexos(img_codificada)]
+    return imagens + texto if imagem_primeiro() else texto + imagens
+
+
+class Provedor:
+    """Interface de um provedor. Subclasses implementam ao menos `chamar`."""
+
+    nome = "base"
+    max_concorrencia = 4
+    # Limite de requisições por minuto compartilhado entre réplicas (None = sem limite)
+    limitador = None
+
+    def __init__(self, modelos):
+        self.modelos = list(modelos)
+
+    def limitar(self, por_minuto: int | None):
+        self.limitador = LimitadorTaxa(self.nome, por_minuto) if por_minuto else None
+
+    # --- Capacidades ---
+    def suporta_temperatura(self, nome_modelo: str) -> bool:
+        return True
+
+    def parametro_tokens(self, nome_modelo: str) -> str:
+        return "max_tokens"
+
+    def parametros_geracao(self, nome_modelo: str) -> dict:
+        kwargs = {self.parametro_tokens(nome_modelo): LIMITE_TOKENS}
+        if self.suporta_temperatura(nome_modelo):
+            kwargs["temperature"] = TEMPERATURA_FIXA
+        return kwargs
+
+    def num_chaves(self) -> int:
+        """Chaves (ou réplicas) independentes para onde uma requisição duplicada pode ir."""
+        return 1
+
+    def max_imagens(self, nome_modelo: str) -> int:
+        """Imagens aceitas numa requisição (duelos em sequência). Padrão: uma."""
+        return 1
+
+    def suporta_cache_prefixo(self, nome_modelo: str) -> bool:
+        """O provedor reaproveita o processamento de prefixos repetidos (ver prefixo_compartilhado)."""
+        return False
+
+    def preparar(self):
+        """Importa o SDK e monta os clientes antes do primeiro duelo (aquecimento). Padrão: nada a fazer."""
+
+    # --- Chamadas ---
+    # `prazo` (time.monotonic) vira o timeout HTTP da requisição; `chave` escolhe por qual chave começar.
+    # `img_codificada` é o base64 de uma imagem, ou a lista dos quadros de uma sequência (ver max_imagens).
+    def chamar(self, nome_modelo: str, prompt: str, img_codificada: str, prazo: float = None, chave: int = 0) -> str:
+        raise NotImplementedError
+
+    async def chamar_async(self, nome_modelo: str, prompt: str, img_codificada: str) -> str:
+        return await asyncio.to_thread(self.chamar, nome_modelo, prompt, img_codificada)
+
+    def chamar_stream(self, nome_modelo: str, prompt: str, img_codificada: str):
+        """Gera pedaços de texto. Padrão: a resposta inteira num único pedaço."""
+        yield self.chamar(nome_modelo, prompt, img_codificada)
+
+    def chamar_lote(self, nome_modelo: str, prompt: str, imagens_codificadas) -> list:
+        """Várias imagens com o mesmo prompt, respeitando o limite de concorrência do provedor."""
+        with ThreadPoolExecutor(max_workers=self.max_concorrencia) as executor:
+            return list(executor.map(lambda img: self.chamar(nome_modelo, prompt, img), imagens_codificadas))
+
+
+class ProvedorOpenAI(Provedor):
+    nome = "openai"
+
+    def __init__(self, modelos):
+        super().__init__(modelos)
+        self._clientes = {}
+        self._trava = threading.Lock()
+
+    def suporta_temperatura(self, nome_modelo: str) -> bool:
+        # Alguns modelos novos não permitem temperatura != 1
+        return not ("gpt-5" in nome_modelo or "o1" in nome_modelo)
+
+    def parametro_tokens(self, nome_modelo: str) -> str:
+        # Modelos novos (gpt-5*) usam max_completion_tokens
+        return "max_completion_tokens" if "gpt-5" in nome_modelo else "max_tokens"
+
+    def num_chaves(self) -> int:
+        return len(_chaves("OPENAI_API_KEY", "OPENAI_API_KEY_2"))
+
+    def max_imagens(self, nome_modelo: str) -> int:
+        return 10
+
+    def suporta_cache_prefixo(self, nome_modelo: str) -> bool:
+        # Cache automático a partir de 1024 tokens de prefixo igual (uma imagem já passa disso)
+        return True
+
+    def _cliente(self, api_key: str):
+        # Um cliente (e seu pool HTTP) por chave, reaproveitado entre chamadas e sessões
+        from openai import OpenAI
+
+        with self._trava:
+            if api_key not in self._clientes:
+                # OPENAI_BASE_URL opcional: aponta para um servidor compatível (ex.: benchmarks/mock_provedores.py)
+                self._clientes[api_key] = OpenAI(api_key=api_key, base_url=st.secrets.get("OPENAI_BASE_URL"))
+            return self._clientes[api_key]
+
+    def preparar(self):
+        for api_key in _chaves("OPENAI_API_KEY", "OPENAI_API_KEY_2"):
+            self._cliente(api_key)
+
+    def _mensagens(self, prompt, img_codificada):
+        return [{"role": "user", "content": _conteudo_usuario(prompt, img_codificada)}]
+
+    def _com_fallback_de_chaves(self, funcao, prazo=None, chave=0):
+        """Tenta cada chave OpenAI configurada, na ordem a partir de `chave` (mesmo padrão do Gemini)."""
+        keys = _chaves("OPENAI_API_KEY", "OPENAI_API_KEY_2")
+        if not keys:
+            raise Exception("Nenhuma chave OpenAI configurada.")
+        keys = keys[chave % len(keys):] + keys[:chave % len(keys)]
+
+        last_error = None
+        for i, api_key in enumerate(keys):
+            try:
+                client = self._cliente(api_key)
+                if prazo is not None:
+                    # Os retries ficam com executar_analise_cached, que conhece o prazo
+                    client = client.with_options(timeout=tempo_restante(prazo), max_retries=0)
+                return funcao(client)
+            except Exception as e:
+                print(f"[OPENAI] Chave {i+1} falhou: {e}")
+                last_error = e
+                if prazo is not None and time.monotonic() >= prazo:
+                    break
+                if i < len(keys) - 1:
+                    print("Tentando próxima chave...")
+                    continue
+
+        raise last_error
+
+    def chamar(self, nome_modelo, prompt, img_codificada, prazo=None, chave=0):
+        mensagens = self._mensagens(prompt, img_codificada)
+        kwargs = self.parametros_geracao(nome_modelo)
+        if _prefixo.get():
+            # Roteia as requisições com o mesmo prefixo para a mesma máquina do cache (extra_body: vale em qualquer SDK)
+            kwargs["extra_body"] = {"prompt_cache_key": _prefixo.get()}
+
+        def _chamada(client):
+            try:
+                # Structured Outputs (SDK recente)
+                r = client.beta.chat.completions.parse(
+                    model=nome_modelo,
+                    messages=mensagens,
+                    response_format=AnaliseBiologica,
+                    **kwargs
+                )
+                return r.choices[0].message.parsed.model_dump_json()
+
+            except Exception as e_struct:
+                from openai import APITimeoutError
+
+                if isinstance(e_struct, APITimeoutError):
+                    raise
+                print(f"Erro ao usar Structured Outputs: {e_struct}. Tentando fallback JSON Mode.")
+                if prazo is not None:
+                    client = client.with_options(timeout=tempo_restante(prazo))
+                r = client.chat.completions.create(
+                    model=nome_modelo,
+                    messages=mensagens,
+                    response_format={"type": "json_object"},
+                    **kwargs
+                )
+                return r.choices[0].message.content
+
+        return self._com_fallback_de_chaves(_chamada, prazo, chave)
+
+    def chamar_stream(self, nome_modelo, prompt, img_codificada):
+        # Structured Outputs não faz streaming; usamos JSON Mode
+        def _abrir(client):
+            return client.chat.completions.create(
+                model=nome_modelo,
+                messages=self._mensagens(prompt, img_codificada),
+                response_format={"type": "json_object"},
+                stream=True,
+                **self.parametros_geracao(nome_modelo)
+            )
+
+        for pedaco in self._com_fallback_de_chaves(_abrir):
+            if pedaco.choices and pedaco.choices[0].delta.content:
+                yield pedaco.choices[0].delta.content
+
+
+class ProvedorGemini(Provedor):
+    nome = "gemini"
+
+    def parametro_tokens(self, nome_modelo: str) -> str:
+        return "max_output_tokens"
+
+    def num_chaves(self) -> int:
+        return len(_chaves("GOOGLE_API_KEY", "GOOGLE_API_KEY_2"))
+
+    def max_imagens(self, nome_modelo: str) -> int:
+        return 10
+
+    def suporta_cache_prefixo(self, nome_modelo: str) -> bool:
+        # Cache implícito dos modelos 2.5 em diante
+        return not nome_modelo.startswith(("gemini-1", "gemini-2.0"))
+
+    def preparar(self):
+        import google.generativeai  # noqa: F401  (import de ~1s, fora do primeiro duelo)
+
+    def _gerar(self, nome_modelo, prompt, img_codificada, stream=False, prazo=None, chave=0):
+        import google.generativeai as genai
+
+        keys = _chaves("GOOGLE_API_KEY", "GOOGLE_API_KEY_2")
+        if not keys:
+            raise Exception("Nenhuma chave Gemini configurada.")
+        keys = keys[chave % len(keys):] + keys[:chave % len(keys)]
+
+        last_error = None
+        for i, api_key in enumerate(keys):
+            try:
+                if "GEMINI_API_ENDPOINT" in st.secrets:
+                    # Endpoint alternativo via REST (ex.: benchmarks/mock_provedores.py)
+                    genai.configure(api_key=api_key, transport="rest",
+                                    client_options={"api_endpoint": st.secrets["GEMINI_API_ENDPOINT"]})
+                else:
+                    genai.configure(api_key=api_key)
+                model = genai.GenerativeModel(nome_modelo)
+                config_simples = {
+                    "temperature": TEMPERATURA_FIXA,
+                    "max_output_tokens": LIMITE_TOKENS,
+                    "response_mime_type": "application/json",
+                    "response_schema": AnaliseBiologica
+                }
+
+                blobs = [{"mime_type": "image/jpeg", "data": i} for i in _anexos(img_codificada)]
+                opcoes_requisicao = {"timeout": tempo_restante(prazo)} if prazo is not None else None
+                return model.generate_content(
+                    [*blobs, prompt] if _prefixo.get() else [prompt, *blobs],
+                    generation_config=config_simples,
+                    stream=stream,
+                    request_options=opcoes_requisicao
+                )
+
+            except Exception as e:
+                print(f"[GEMINI] Chave {i+1} falhou: {e}")
+                last_error = e
+                if prazo is not None and time.monotonic() >= prazo:
+                    break
+                if i < len(keys) - 1:
+                    print("Tentando próxima chave...")
+                    continue
+
+        raise last_error
+
+    def chamar(self, nome_modelo, prompt, img_codificada, prazo=None, chave=0):
+        return self._gerar(nome_modelo, prompt, img_codificada, prazo=prazo, chave=chave).text
+
+    def chamar_stream(self, nome_modelo, prompt, img_codificada):
+        for pedaco in self._gerar(nome_modelo, prompt, img_codificada, stream=True):
+            yield pedaco.text
+
+
+class ProvedorOpenAICompativel(Provedor):
+    """Qualquer servidor com a API chat-completions da OpenAI: NVIDIA, vLLM, llama.cpp, Ollama..."""
+
+    def __init__(self, nome, modelos, base_url, api_key, suporta_temperatura=True, parametro_tokens="max_tokens",
+                 prompt_sistema=PROMPT_SISTEMA_JSON, formato_resposta="json_schema", max_concorrencia=4, limite_rpm=None,
+                 max_imagens=1, cache_prefixo=False):
+        super().__init__(modelos)
+        self.nome = nome
+        self.max_concorrencia = max_concorrencia
+        self._max_imagens = max_imagens
+        self._cache_prefixo = cache_prefixo
+        self.limitar(limite_rpm)
+        self._suporta_temperatura = suporta_temperatura
+        self._parametro_tokens = parametro_tokens
+        self.prompt_sistema = prompt_sistema
+        self.formato_resposta = formato_resposta
+        self.base_url = base_url
+        self._api_key = api_key
+        self._cliente = None
+
+    @property
+    def cliente(self):
+        if self._cliente is None:
+            from openai import OpenAI
+
+            self._cliente = OpenAI(api_key=self._api_key, base_url=self.base_url)
+        return self._cliente
+
+    def preparar(self):
+        self.cliente
+
+    def suporta_temperatura(self, nome_modelo: str) -> bool:
+        return self._suporta_temperatura
+
+    def parametro_tokens(self, nome_modelo: str) -> str:
+        return self._parametro_tokens
+
+    def max_imagens(self, nome_modelo: str) -> int:
+        return self._max_imagens
+
+    def suporta_cache_prefixo(self, nome_modelo: str) -> bool:
+        return self._cache_prefixo
+
+    def _argumentos(self, nome_modelo, prompt, img_codificada) -> dict:
+        mensagens = []
+        if self.prompt_sistema:
+            mensagens.append({"role": "system", "content": self.prompt_sistema})
+        mensagens.append({"role": "user", "content": _conteudo_usuario(prompt, img_codificada)})
+
+        argumentos = {"model": nome_modelo, "messages": mensagens, **self.parametros_geracao(nome_modelo)}
+        if self.formato_resposta == "json_schema":
+            argumentos["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "AnaliseBiologica",
+                    "schema": AnaliseBiologica.model_json_schema()
+                }
+            }
+        elif self.formato_resposta == "json_object":
+            argumentos["response_format"] = {"type": "json_object"}
+        return argumentos
+
+    def chamar(self, nome_modelo, prompt, img_codificada, prazo=None, chave=0):
+        # Endpoint único: `chave` não muda nada, e num_chaves() = 1 desliga o hedge
+        cliente = self.cliente if prazo is None else self.cliente.with_options(timeout=tempo_restante(prazo), max_retries=0)
+        r = cliente.chat.completions.create(**self._argumentos(nome_modelo, prompt, img_codificada))
+        return r.choices[0].message.content
+
+    def chamar_stream(self, nome_modelo, prompt, img_codificada):
+        for pedaco in self.cliente.chat.completions.create(stream=True, **self._argumentos(nome_modelo, prompt, img_codificada)):
+            if pedaco.choices and pedaco.choices[0].delta.content:
+                yield pedaco.choices[0].delta.content
+
+
+class ProvedorLocal(ProvedorOpenAICompativel):
+    """Modelo de visão open-weight rodando em CPU na própria máquina, atrás de um servidor compatível
+    com a OpenAI (llama.cpp `llama-server`, ou um servidor ONNX Runtime com a mesma API).
+
+    - `comando`: se o servidor não estiver no ar, é iniciado uma vez por processo e encerrado na saída.
+    - `slots`: chamadas simultâneas admitidas (igual ao `--parallel` do llama-server); o servidor
+      agrupa as requisições em andamento em lotes contínuos, então o cliente só precisa mantê-lo cheio.
+    - O modelo é aquecido com uma chamada mínima ao montar o registro e mantido residente com pings
+      periódicos (`intervalo_keep_alive_s`), para que o primeiro duelo não pague o carregamento.
+    """
+
+    def __init__(self, nome, modelos, base_url="http://127.0.0.1:8081/v1", api_key="local", comando=None,
+                 slots=2, timeout_inicio_s=300, intervalo_keep_alive_s=240, aquecer=True, **opcoes):
+        opcoes.setdefault("max_concorrencia", slots)
+        super().__init__(nome, modelos, base_url, api_key, **opcoes)
+        self.base_url = base_url.rstrip("/")
+        self._slots = threading.BoundedSemaphore(slots)
+        self._processo = None
+
+        if comando and not self._servidor_no_ar():
+            self._iniciar_servidor(comando, timeout_inicio_s)
+        if aquecer and self.modelos:
+            threading.Thread(target=self._aquecer, args=(intervalo_keep_alive_s,), daemon=True).start()
+
+    def _servidor_no_ar(self) -> bool:
+        import urllib.request
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/models", timeout=2) as resposta:
+                return resposta.status == 200
+        except Exception:
+            return False
+
+    def _iniciar_servidor(self, comando, timeout_inicio_s):
+        import atexit
+        import subprocess
+
+        print(f"[LOCAL] Iniciando servidor do provedor '{self.nome}': {' '.join(comando)}")
+        self._processo = subprocess.Popen(list(comando), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        atexit.register(self._processo.terminate)
+
+        limite = time.time() + timeout_inicio_s
+        while time.time() < limite:
+            if self._processo.poll() is not None:
+                raise RuntimeError(f"Servidor local '{self.nome}' encerrou com código {self._processo.returncode}.")
+            if self._servidor_no_ar():
+                print(f"[LOCAL] Servidor '{self.nome}' pronto em {self.base_url}.")
+                return
+            time.sleep(1)
+        raise RuntimeError(f"Servidor local '{self.nome}' não respondeu em {timeout_inicio_s}s.")
+
+    def _aquecer(self, intervalo_keep_alive_s):
+        import base64
+        from io import BytesIO
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (32, 32), (90, 120, 60)).save(buffer, format="JPEG")
+        imagem_minima = base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+        while True:
+            try:
+                inicio = time.time()
+                self.cliente.chat.completions.create(
+                    model=self.modelos[0],
+                    messages=[{"role": "user", "content": [{"type": "text", "text": "ok"}, _url_imagem(imagem_minima)]}],
+                    max_tokens=1
+                )
+                print(f"[LOCAL] Modelo '{self.modelos[0]}' aquecido em {time.time() - inicio:.2f}s.")
+            except Exception as e:
+                print(f"[LOCAL] Falha ao aquecer '{self.nome}': {e}")
+            if not intervalo_keep_alive_s:
+                return
+            time.sleep(intervalo_keep_alive_s)
+
+    def chamar(self, nome_modelo, prompt, img_codificada, prazo=None, chave=0):
+        if not self._slots.acquire(timeout=tempo_restante(prazo)):
+            raise TimeoutError(f"Sem slot livre no provedor local '{self.nome}' dentro do prazo.")
+        try:
+            return super().chamar(nome_modelo, prompt, img_codificada, prazo, chave)
+        finally:
+            self._slots.release()
+
+    def chamar_stream(self, nome_modelo, prompt, img_codificada):
+        with self._slots:
+            yield from super().chamar_stream(nome_modelo, prompt, img_codificada)
+
+
+# Tipos aceitos em [provedores.<nome>] no secrets.toml
+TIPOS_PROVEDOR = {
+    "openai_compativel": ProvedorOpenAICompativel,
+    "local": ProvedorLocal,
+}
+
+
+def _provedores_embutidos():
+    # PROVEDORES_HABILITADOS no secrets.toml sobrescreve o padrão do config.py
+    habilitados = st.secrets.get("PROVEDORES_HABILITADOS", PROVEDORES_HABILITADOS)
+    provedores = []
+    if "openai" in habilitados and _chaves("OPENAI_API_KEY", "OPENAI_API_KEY_2"):
+        provedores.append(ProvedorOpenAI(MODELOS_OPENAI))
+    if "gemini" in habilitados and _chaves("GOOGLE_API_KEY", "GOOGLE_API_KEY_2"):
+        provedores.append(ProvedorGemini(MODELOS_GEMINI))
+    if "nvidia" in habilitados and "NVIDIA_API_KEY" in st.secrets:
+        provedores.append(ProvedorOpenAICompativel(
+            "nvidia", MODELOS_NVIDIA,
+            base_url=st.secrets.get("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1"),
+            api_key=st.secrets["NVIDIA_API_KEY"]
+        ))
+    return provedores
+
+
+def _provedores_configurados():
+    provedores = []
+    if "provedores" not in st.secrets:
+        return provedores
+    for nome, opcoes in st.secrets["provedores"].items():
+        opcoes = dict(opcoes)
+        classe = TIPOS_PROVEDOR.get(opcoes.pop("tipo", "openai_compativel"))
+        if classe is None:
+            print(f"[PROVEDORES] Tipo desconhecido para '{nome}', ignorando.")
+            continue
+        provedores.append(classe(nome, opcoes.pop("modelos", []), **opcoes))
+    return provedores
+
+
+class RegistroProvedores:
+    """Mapa modelo → provedor, montado uma única vez por processo."""
+
+    def __init__(self, provedores):
+        for provedor in provedores:
+            if provedor.nome in LIMITES_RPM:
+                provedor.limitar(LIMITES_RPM[provedor.nome])
+        self.provedores = {p.nome: p for p in provedores}
+        self.modelos = {}
+        for provedor in provedores:
+            for modelo in provedor.modelos:
+                self.modelos[modelo] = provedor.nome
+
+    def provedor(self, nome_provedor: str) -> Provedor:
+        return self.provedores[nome_provedor]
+
+    def provedor_do_modelo(self, nome_modelo: str) -> Provedor:
+        return self.provedores[self.modelos[nome_modelo]]
+
+
+@st.cache_resource
+def obter_registro() -> RegistroProvedores:
+    registro = RegistroProvedores(_provedores_embutidos() + _provedores_configurados())
+    print(f"[PROVEDORES] {len(registro.modelos)} modelos em {len(registro.provedores)} provedores: {', '.join(registro.provedores)}")
+    return registro
@@ -0,0 +1,138 @@
+import time
+import threading
+from collections import deque
+from config import (
+    DISJUNTOR_JANELA, DISJUNTOR_MIN_CHAMADAS, DISJUNTOR_TAXA_FALHA,
+    DISJUNTOR_FRACAO_LENTA, DISJUNTOR_ESPERA_S, DISJUNTOR_ESPERA_MAX_S
+)
+from ai.prazos import orcamento_latencia
+from utils.tracing import registrar_evento
+
+# Disjuntores (circuit breakers) por modelo. Um modelo degradado sai do sorteio de duelos em vez de
+# gastar retries e a chamada paga do adversário; depois da espera, uma única chamada de sondagem
+# (meio-aberto) decide se ele volta.
+#
+#   fechado ──(falhas/lentidão acima do limite)──▶ aberto ──(espera)──▶ meio_aberto
+#      ▲                                              ▲                      │
+#      └──────────────(sondagem ok)───────────────────┴──(sondagem falhou)───┘
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+class Disjuntor:
+    def __init__(self, nome_modelo: str):
+        self.nome_modelo = nome_modelo
+        self.estado = FECHADO
+        self.resultados = deque(maxlen=DISJUNTOR_JANELA)  # (sucesso, duracao_s)
+        self.espera_s = DISJUNTOR_ESPERA_S
+        self.aberto_ate = 0.0
+        self.sondagem_ate = 0.0  # sondagem em andamento no meio-aberto (expira no orçamento do modelo)
+        self.ultima_mudanca = time.time()
+
+    def _mudar(self, estado: str, motivo: str):
+        self.estado = estado
+        self.ultima_mudanca = time.time()
+        registrar_evento(f"disjuntor.{estado}", f"Disjuntor do modelo {self.nome_modelo}: {estado} ({motivo})",
+                         nivel="aviso" if estado != FECHADO else "info", modelo=self.nome_modelo, motivo=motivo)
+
+    def _avaliar_janela(self):
+        if len(self.resultados) < DISJUNTOR_MIN_CHAMADAS:
+            return
+        falhas = sum(not ok for ok, _ in self.resultados) / len(self.resultados)
+        if falhas >= DISJUNTOR_TAXA_FALHA:
+            self.aberto_ate = time.monotonic() + self.espera_s
+            self._mudar(ABERTO, f"{falhas:.0%} de falhas nas últimas {len(self.resultados)} chamadas")
+
+    def disponivel(self) -> bool:
+        # Aberto com a espera vencida passa a meio-aberto aqui mesmo (transição preguiçosa)
+        if self.estado == ABERTO and time.monotonic() >= self.aberto_ate:
+            self._mudar(MEIO_ABERTO, f"após {self.espera_s:.0f}s aberto")
+        if self.estado == MEIO_ABERTO:
+            return time.monotonic() >= self.sondagem_ate
+        return self.estado == FECHADO
+
+    def permitir(self) -> bool:
+        if not self.disponivel():
+            return False
+        if self.estado == MEIO_ABERTO:
+            self.sondagem_ate = time.monotonic() + orcamento_latencia(self.nome_modelo)
+        return True
+
+    def liberar(self):
+        # A chamada reservada não chegou ao provedor (resposta do cache): a sondagem fica para a próxima
+        if self.estado == MEIO_ABERTO:
+            self.sondagem_ate = 0.0
+
+    def registrar(self, sucesso: bool, duracao_s: float):
+        lenta = duracao_s > orcamento_latencia(self.nome_modelo) * DISJUNTOR_FRACAO_LENTA
+        ok = sucesso and not lenta
+
+        if self.estado == MEIO_ABERTO:
+            self.sondagem_ate = 0.0
+            if ok:
+                self.resultados.clear()
+                self.espera_s = DISJUNTOR_ESPERA_S
+                self._mudar(FECHADO, "sondagem ok")
+            else:
+                self.espera_s = min(self.espera_s * 2, DISJUNTOR_ESPERA_MAX_S)
+                self.aberto_ate = time.monotonic() + self.espera_s
+                self._mudar(ABERTO, "sondagem lenta" if sucesso else "sondagem falhou")
+            return
+
+        self.resultados.append((ok, duracao_s))
+        if self.estado == FECHADO:
+            self._avaliar_janela()
+
+    def resumo(self) -> dict:
+        self.disponivel()
+        total = len(self.resultados)
+        return {
+            "Modelo": self.nome_modelo,
+            "Estado": self.estado,
+            "Chamadas (janela)": total,
+            "Falhas (%)": round(sum(not ok for ok, _ in self.resultados) / total * 100, 1) if total else 0.0,
+            "Latência média (s)": round(sum(d for _, d in self.resultados) / total, 2) if total else None,
+            "Reabre em (s)": round(max(self.aberto_ate - time.monotonic(), 0), 0) if self.estado == ABERTO else None,
+            "Desde": time.strftime("%H:%M:%S", time.localtime(self.ultima_mudanca)),
+        }
+
+
+class PainelDisjuntores:
+    """Disjuntores de todos os modelos, compartilhados pelas sessões do processo."""
+
+    def __init__(self):
+        self._disjuntores = {}
+        self._trava = threading.Lock()
+
+    def _obter(self, nome_modelo: str) -> Disjuntor:
+        if nome_modelo not in self._disjuntores:
+            self._disjuntores[nome_modelo] = Disjuntor(nome_modelo)
+        return self._disjuntores[nome_modelo]
+
+    def disponivel(self, nome_modelo: str) -> bool:
+        """Pode entrar no sorteio de duelos (fechado, ou meio-aberto sem sondagem em andamento)."""
+        with self._trava:
+            return self._obter(nome_modelo).disponivel()
+
+    def permitir(self, nome_modelo: str) -> bool:
+        """Reserva a chamada; no meio-aberto, só a primeira (a sondagem) passa."""
+        with self._trava:
+            return self._obter(nome_modelo).permitir()
+
+    def liberar(self, nome_modelo: str):
+        """Devolve a reserva de permitir() sem resultado (ex.: cache hit), liberando a vaga de sondagem."""
+        with self._trava:
+            self._obter(nome_modelo).liberar()
+
+    def registrar(self, nome_modelo: str, sucesso: bool, duracao_s: float):
+        with self._trava:
+            self._obter(nome_modelo).registrar(sucesso, duracao_s)
+
+    def estados(self) -> list[dict]:
+        with self._trava:
+            return [d.resumo() for d in self._disjuntores.values()]
+
+
+disjuntores = PainelDisjuntores()
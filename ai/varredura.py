@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import random
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait
+import pandas as pd
+from ai.prompt import PROMPT_TEMPLATE, PROMPT_TEMPLATE_2
+from ai.provedores import obter_registro, prefixo_compartilhado
+from ai.models import executar_analise_cached
+from ai.saude import disjuntores
+from data.duplicatas import indice_perceptual
+from data.ranking import comparar_prompts
+from utils.image import codificar_imagem_id
+from utils.tracing import span, registrar_evento
+
+# Varredura de prompts: N variantes × M modelos × K imagens, em lote, fora da arena.
+#
+# Na arena cada duelo sorteia um dos prompts, então comparar prompts custa o dobro de avaliações e os dois
+# nunca se encontram na mesma imagem. Aqui cada (modelo, imagem) responde a todas as variantes, e o
+# relatório (data.ranking.comparar_prompts) compara os prompts aos pares nas mesmas imagens.
+#
+# - Cada imagem é baixada e codificada uma vez e servida a todas as chamadas.
+# - As chamadas passam pelo cache de inferência do backend compartilhado: rodar a varredura de novo, ou com
+#   um prompt a mais, só paga as combinações novas. Com a imagem antes do texto a requisição é outra, e a
+#   chave também (ai.models._chave_analise): essas respostas não se misturam com as da arena.
+# - As N variantes da mesma (modelo, imagem) saem em sequência no mesmo trabalhador; em provedores com
+#   cache de prefixo a imagem vai antes do texto (ai.provedores.prefixo_compartilhado) e só a primeira
+#   variante paga os tokens da imagem cheios.
+# - Um executor por provedor, do tamanho do max_concorrencia dele; limite de RPM, prazos e disjuntores
+#   são os mesmos da arena.
+#
+# Uso (lê o .streamlit/secrets.toml do diretório atual, como o app):
+#   python -m ai.varredura --imagens 60 --modelos gpt-4.1-mini gpt-4o --prompts template_1 prompts/novo.txt
+
+PROMPTS_PADRAO = {"template_1": PROMPT_TEMPLATE, "template_2": PROMPT_TEMPLATE_2}
+
+
+def amostrar_imagens(catalogo: dict, quantidade: int, semente: int = 0) -> list:
+    """`quantidade` imagens do catálogo em rodízio entre as espécies, uma por rajada: [{"id", "name", "especie"}].
+
+    A mesma semente sorteia as mesmas imagens, então uma varredura repetida reaproveita o cache de inferência.
+    """
+    rng = random.Random(semente)
+    filas = {}
+    for especie in sorted(catalogo):
+        # Fotos isoladas e o primeiro quadro de cada rajada (ver data/duplicatas.py)
+        imagens = sorted(catalogo[especie], key=lambda i: i["id"])
+        representantes = [i for i in imagens if indice_perceptual.rajadas.get(i["id"], i["id"]) == i["id"]]
+        rng.shuffle(representantes)
+        filas[especie] = representantes
+
+    amostra = []
+    while len(amostra) < quantidade and any(filas.values()):
+        for especie, fila in filas.items():
+            if fila and len(amostra) < quantidade:
+                amostra.append({**fila.pop(), "especie": especie})
+    return amostra
+
+
+def preparar_imagens(imagens: list, trabalhadores: int = 8) -> list:
+    """Baixa e codifica cada imagem uma vez, em paralelo. Devolve as que ficaram prontas, com "enc" e "hash"."""
+    from data.drive import get_drive_service, carregar_imagem
+
+    local = threading.local()
+
+    def _preparar(imagem):
+        # O service do Drive não é thread-safe (httplib2): um por thread
+        if getattr(local, "service", None) is None:
+            local.service = get_drive_service()
+        try:
+            ref_imagem = carregar_imagem(imagem["id"], local.service)
+            codificada = codificar_imagem_id(ref_imagem) if ref_imagem else None
+        except Exception as e:
+            registrar_evento("varredura.imagem_erro", f"Falha ao preparar a imagem {imagem['id']}: {e}", nivel="aviso",
+                             image_id=imagem["id"])
+            return None
+        if codificada is None:
+            return None
+        enc, img_hash = codificada
+        return {**imagem, "enc": enc, "hash": indice_perceptual.chave_inferencia(imagem["id"], img_hash)}
+
+    with span("varredura.imagens", imagens=len(imagens), trabalhadores=trabalhadores) as s:
+        with ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="ecollm-varredura-img") as executor:
+            prontas = [i for i in executor.map(_preparar, imagens) if i is not None]
+        s["attributes"]["prontas"] = len(prontas)
+    return prontas
+
+
+def executar_varredura(prompts: dict, modelos: list, imagens: list, registro=None) -> pd.DataFrame:
+    """Roda cada prompt ({rótulo: texto}) em cada modelo e imagem preparada. Uma linha por chamada."""
+    from data.snapshot import versao_prompt
+
+    registro = registro or obter_registro()
+    versoes = {rotulo: versao_prompt(texto) for rotulo, texto in prompts.items()}
+    por_provedor = {}
+    for modelo in modelos:
+        por_provedor.setdefault(registro.modelos[modelo], []).append(modelo)
+
+    linhas = []
+    trava = threading.Lock()
+    total = len(prompts) * len(modelos) * len(imagens)
+
+    def _variantes(modelo, provedor, imagem):
+        # Todas as variantes da (modelo, imagem) em seguida: da segunda em diante o prefixo já está no cache
+        cache_prefixo = registro.provedor(provedor).suporta_cache_prefixo(modelo)
+        for rotulo, texto in prompts.items():
+            if not disjuntores.permitir(modelo):
+                # Disjuntor aberto: falha na hora, como na arena (a combinação fica fora da comparação pareada)
+                sucesso, resposta, tempo = False, None, 0.0
+            else:
+                with prefixo_compartilhado(imagem["hash"]) if cache_prefixo else nullcontext():
+                    sucesso, resposta, tempo = executar_analise_cached(modelo, texto, imagem["hash"], imagem["enc"], provedor)
+            with trava:
+                linhas.append({
+                    "prompt": rotulo,
+                    "versao_prompt": versoes[rotulo],
+                    "modelo": modelo,
+                    "provedor": provedor,
+                    "image_id": imagem["id"],
+                    "image_name": imagem["name"],
+                    "species": imagem["especie"],
+                    "sucesso": sucesso,
+                    "model_response": resposta,
+                    "tempo": tempo,
+                    "cache_prefixo": cache_prefixo,
+                })
+                if len(linhas) % 100 == 0:
+                    print(f"[VARREDURA] {len(linhas)}/{total} chamadas.")
+
+    with span("varredura", prompts=len(prompts), modelos=len(modelos), imagens=len(imagens)):
+        executores = [
+            ThreadPoolExecutor(max_workers=registro.provedor(provedor).max_concorrencia, thread_name_prefix=f"ecollm-varredura-{provedor}")
+            for provedor in por_provedor
+        ]
+        try:
+            futuros = [
+                executor.submit(_variantes, modelo, provedor, imagem)
+                for executor, (provedor, modelos_provedor) in zip(executores, por_provedor.items())
+                for modelo in modelos_provedor
+                for imagem in imagens
+            ]
+            wait(futuros)
+            for futuro in futuros:
+                futuro.result()
+        finally:
+            for executor in executores:
+                executor.shutdown(wait=False)
+
+    return pd.DataFrame(linhas)
+
+
+def _ler_prompts(nomes: list) -> dict:
+    # Nomes embutidos (PROMPTS_PADRAO) ou arquivos de texto; o rótulo de um arquivo é o nome sem extensão
+    prompts = {}
+    for nome in nomes:
+        if nome in PROMPTS_PADRAO:
+            prompts[nome] = PROMPTS_PADRAO[nome]
+        else:
+            with open(nome, encoding="utf-8") as f:
+                prompts[os.path.splitext(os.path.basename(nome))[0]] = f.read()
+    return prompts
+
+
+if __name__ == "__main__":
+    import argparse
+    import streamlit as st
+    from data.drive import get_drive_service, obter_catalogo
+
+    parser = argparse.ArgumentParser(description="Roda N prompts × M modelos × K imagens e compara os prompts aos pares.")
+    parser.add_argument("--prompts", nargs="+", default=list(PROMPTS_PADRAO),
+                        help=f"Arquivos .txt ou prompts embutidos ({', '.join(PROMPTS_PADRAO)}). Padrão: os embutidos.")
+    parser.add_argument("--modelos", nargs="+", help="Padrão: todos os modelos dos provedores configurados.")
+    parser.add_argument("--imagens", type=int, default=40, help="Imagens, em rodízio entre as espécies.")
+    parser.add_argument("--semente", type=int, default=0, help="A mesma semente sorteia as mesmas imagens.")
+    parser.add_argument("--raiz", help="ID da pasta raiz (padrão: geral.DRIVE_FOLDER_ID do secrets.toml)")
+    parser.add_argument("--trabalhadores", type=int, default=8, help="Downloads em paralelo")
+    parser.add_argument("--saida", default="varredura", help="Diretório das respostas (CSV) e do relatório (JSON).")
+    args = parser.parse_args()
+
+    prompts = _ler_prompts(args.prompts)
+    if len(prompts) < 2:
+        raise SystemExit("São necessários pelo menos 2 prompts.")
+    registro = obter_registro()
+    modelos = args.modelos or list(registro.modelos)
+    desconhecidos = [m for m in modelos if m not in registro.modelos]
+    if desconhecidos:
+        raise SystemExit(f"Modelos fora dos provedores configurados: {', '.join(desconhecidos)}")
+
+    raiz = args.raiz or st.secrets["geral"]["DRIVE_FOLDER_ID"]
+    catalogo = obter_catalogo(get_drive_service(), raiz)
+    if not catalogo:
+        raise SystemExit(f"Catálogo do Drive vazio ou inacessível (raiz {raiz}).")
+
+    inicio = time.perf_counter()
+    imagens = preparar_imagens(amostrar_imagens(catalogo, args.imagens, args.semente), args.trabalhadores)
+    print(f"[VARREDURA] {len(imagens)} imagens prontas em {time.perf_counter() - inicio:.1f}s; "
+          f"{len(prompts) * len(modelos) * len(imagens)} chamadas ({len(prompts)} prompts × {len(modelos)} modelos).")
+
+    respostas = executar_varredura(prompts, modelos, imagens, registro)
+    # As respostas (já pagas) vão para o disco antes do relatório: um erro na análise não as perde
+    os.makedirs(args.saida, exist_ok=True)
+    respostas.to_csv(os.path.join(args.saida, "respostas.csv"), index=False)
+    print(f"[VARREDURA] Concluída em {time.perf_counter() - inicio:.1f}s.")
+
+    relatorio = comparar_prompts(respostas)
+    with open(os.path.join(args.saida, "relatorio.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "prompts": {rotulo: texto.strip() for rotulo, texto in prompts.items()},
+            "modelos": modelos,
+            "imagens": len(imagens),
+            "semente": args.semente,
+            **{nome: json.loads(tabela.to_json(orient="records", force_ascii=False)) for nome, tabela in relatorio.items()},
+        }, f, ensure_ascii=False, indent=2)
+
+    for nome, tabela in relatorio.items():
+        print(f"\n=== {nome} ===")
+        print(tabela.to_string(index=False) if not tabela.empty else "(vazio)")
+    print(f"\n[VARREDURA] Respostas e relatório em '{args.saida}/'.")
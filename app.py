@@ -2,10 +2,11 @@ import streamlit as st
 from config import CSS_STYLES
 from utils.session import init
 from ui.sidebar import renderizar_sidebar
-from ui.cadastro import form_cadastro
-from ui.arena import render_arena
-from ui.tables import renderizar_painel_rankings
-from data.database import verificar_perfil, carregar_dados_duelos
+from ui.admin import usuario_e_admin
+
+# Só o necessário para a tela de login fica no topo. Banco (sqlalchemy/pandas), arena (SDKs de IA, Drive,
+# Pillow) e rankings (plotly, numpy) são importados quando a etapa que os usa é alcançada; o Python guarda
+# o módulo em sys.modules, então os reruns seguintes não pagam de novo (ver benchmarks/bench_inicio.py).
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(layout="wide", page_title="EcoLLMDuel", page_icon=None)
@@ -13,6 +14,11 @@ st.set_page_config(layout="wide", page_title="EcoLLMDuel", page_icon=None)
 # --- CSS ---
 st.markdown(CSS_STYLES, unsafe_allow_html=True)
 
+# --- AQUECIMENTO ---
+# Normalmente já disparado pelo iniciar.py; aqui cobre quem roda `streamlit run app.py` (idempotente)
+from utils.aquecimento import iniciar_aquecimento
+iniciar_aquecimento()
+
 def main():
     init()
     
@@ -60,6 +66,7 @@ def main():
                     st.error("Falha na autenticação. Tente novamente.")
             st.stop()
         
+        from data.database import verificar_perfil
         with st.spinner("Verificando cadastro..."):
             perfil_existente = verificar_perfil(email)
 
@@ -67,27 +74,48 @@ def main():
             st.session_state.detalhes_usuario = perfil_existente
             st.rerun()
         else:
+            from ui.cadastro import form_cadastro
             st.title("Completar Perfil")
             form_cadastro()
             st.stop()
 
     # === APP PRINCIPAL ===
     # === CARREGAR DADOS GERAIS ===
-    # Carregamos aqui para passar para os rankings sem recarregar várias vezes
-    df_duelos = carregar_dados_duelos()
+    # Carregamos aqui para passar para os rankings sem recarregar várias vezes.
+    # Os duelos vêm do dataset compacto do processo (data/dataset.py): só os novos são buscados no banco.
+    from data.dataset import obter_dataset_duelos
+    df_duelos = obter_dataset_duelos()
 
     st.title("EcoLLM Arena")
 
-    tab_arena, tab_rankings = st.tabs([
-        "Arena de Duelo", 
-        "Estatísticas & Rankings"
-    ])
+    nomes_abas = ["Arena de Duelo", "Estatísticas & Rankings"]
+    if usuario_e_admin():
+        nomes_abas.append("Saúde & Latência (Admin)")
+    abas = st.tabs(nomes_abas)
 
-    with tab_arena:
+    with abas[0]:
+        from ui.arena import render_arena
         render_arena()
 
-    with tab_rankings:
+    with abas[1]:
+        from ui.tables import renderizar_painel_rankings
         renderizar_painel_rankings(df_duelos)
 
+    if len(abas) > 2:
+        with abas[2]:
+            from ui.admin import (
+                renderizar_painel_saude, renderizar_painel_latencia,
+                renderizar_concordancia_avaliadores, renderizar_correspondencia_taxonomica, renderizar_sequencias
+            )
+            renderizar_painel_saude()
+            st.divider()
+            renderizar_painel_latencia()
+            st.divider()
+            renderizar_concordancia_avaliadores(df_duelos)
+            st.divider()
+            renderizar_correspondencia_taxonomica(df_duelos)
+            st.divider()
+            renderizar_sequencias()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Benchmark de partida a frio: tempo de import dos módulos do app e latência da primeira renderização
+# da tela de login (AppTest do Streamlit, sem navegador). Cada medida roda num processo Python novo,
+# como num container recém-criado, e o resultado é o melhor de N repetições.
+#
+# Uso:
+#   python -m benchmarks.bench_inicio --repeticoes 5 --saida inicio.json
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS_PADRAO = [
+    "streamlit",
+    "app",
+    "utils.session",
+    "data.database",
+    "ui.cadastro",
+    "ui.arena",
+    "ui.tables",
+    "ai.models",
+    "data.drive",
+    "data.ranking",
+]
+
+# Dependências pesadas: o relatório mostra quais delas cada import arrastou
+PESADOS = ["pandas", "numpy", "sklearn", "plotly", "openai", "google.generativeai", "googleapiclient", "sqlalchemy", "pyarrow"]
+
+_CODIGO_IMPORT = """
+import io, sys, json, time, contextlib
+inicio = time.perf_counter()
+with contextlib.redirect_stderr(io.StringIO()):
+    import {modulo}
+print(json.dumps({{"tempo_s": time.perf_counter() - inicio, "pesados": [m for m in {pesados!r} if m in sys.modules]}}))
+"""
+
+_CODIGO_RENDER = """
+import io, json, time, contextlib
+inicio = time.perf_counter()
+with contextlib.redirect_stderr(io.StringIO()):
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file("app.py", default_timeout=60)
+    app.secrets["OPENAI_API_KEY"] = "bench"
+    app.run()
+print(json.dumps({"tempo_s": time.perf_counter() - inicio, "titulos": [t.value for t in app.title], "excecoes": len(app.exception)}))
+"""
+
+
+def _rodar(codigo: str) -> dict:
+    saida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "0"}
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def medir_imports(modulos, repeticoes: int) -> list:
+    resultados = []
+    for modulo in modulos:
+        medidas = [_rodar(_CODIGO_IMPORT.format(modulo=modulo, pesados=PESADOS)) for _ in range(repeticoes)]
+        melhor = min(medidas, key=lambda m: m["tempo_s"])
+        resultados.append({"modulo": modulo, "tempo_s": melhor["tempo_s"], "pesados": melhor["pesados"]})
+        print(f"[BENCH] import {modulo:<16} {melhor['tempo_s']:.3f}s  {', '.join(melhor['pesados']) or '-'}")
+    return resultados
+
+
+def medir_primeira_renderizacao(repeticoes: int) -> dict:
+    # Sem usuário logado o app para na tela de login: é a primeira tela de todo avaliador
+    medidas = [_rodar(_CODIGO_RENDER) for _ in range(repeticoes)]
+    melhor = min(medidas, key=lambda m: m["tempo_s"])
+    print(f"[BENCH] primeira renderização (login) {melhor['tempo_s']:.3f}s  títulos={melhor['titulos']}  exceções={melhor['excecoes']}")
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de partida a frio (imports e primeira renderização).")
+    parser.add_argument("--modulos", nargs="+", default=MODULOS_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-render", action="store_true", help="Mede só os imports.")
+    parser.add_argument("--saida", default="bench_inicio.json")
+    args = parser.parse_args()
+
+    relatorio = {"python": sys.version.split()[0], "imports": medir_imports(args.modulos, args.repeticoes)}
+    if not args.sem_render:
+        relatorio["primeira_renderizacao"] = medir_primeira_renderizacao(args.repeticoes)
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"[BENCH] Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from data.nomes_especies import NOMES_COMUNS_ESPECIES
+from data import ranking
+
+# Benchmark de escalabilidade das funções de data/ranking.py sobre duelos sintéticos.
+# Uso:
+#   python -m benchmarks.bench_ranking --tamanhos 1000 10000 100000 --saida bench.json
+#   python -m benchmarks.bench_ranking --comparar base.json novo.json --tolerancia 0.2
+
+CODIGOS_VITORIA = np.array(["A>B", "A<B"], dtype=object)
+CODIGOS_EMPATE = np.array(["A=B_GOOD", "!A!B"], dtype=object)
+
+
+def gerar_duelos_sinteticos(linhas: int, modelos: int = 12, especies: int = 8, taxa_empate: float = 0.2,
+                            taxa_json_invalido: float = 0.05, taxa_acerto: float = 0.6, semente: int = 42) -> pd.DataFrame:
+    # Gera um dataframe no formato da tabela `evaluations`, de forma vetorizada (escala até ~10M linhas).
+    # As respostas são sorteadas de um pequeno conjunto de strings pré-montadas, então o custo de memória
+    # é o de um array de referências, não o de milhões de JSONs distintos.
+    rng = np.random.default_rng(semente)
+
+    nomes_modelos = np.array([f"modelo-{i:02d}" for i in range(modelos)], dtype=object)
+    catalogo = [c for c in NOMES_COMUNS_ESPECIES.keys() if " " in c or c == "background"]
+    catalogo += [f"Genus species{i}" for i in range(max(especies - len(catalogo), 0))]
+    nomes_especies = np.array(catalogo[:especies], dtype=object)
+
+    # Respostas possíveis: uma correta por espécie, uma alucinação e um JSON malformado
+    respostas_corretas = np.array(
+        [json.dumps({"deteccao": "Sim", "nome_cientifico": e, "nome_comum": "x"}, ensure_ascii=False) for e in nomes_especies],
+        dtype=object
+    )
+    resposta_alucinada = json.dumps({"deteccao": "Sim", "nome_cientifico": "Canis lupus", "nome_comum": "Lobo"})
+    resposta_invalida = '{"deteccao": "Sim", "nome_cientifico": "Panthera'
+
+    indice_a = rng.integers(0, modelos, linhas)
+    deslocamento = rng.integers(1, max(modelos, 2), linhas)
+    indice_b = (indice_a + deslocamento) % max(modelos, 2) if modelos > 1 else indice_a
+    indice_especie = rng.integers(0, len(nomes_especies), linhas)
+
+    def _respostas():
+        sorteio = rng.random(linhas)
+        respostas = np.full(linhas, resposta_alucinada, dtype=object)
+        acerto = sorteio < taxa_acerto
+        respostas[acerto] = respostas_corretas[indice_especie[acerto]]
+        respostas[sorteio >= 1.0 - taxa_json_invalido] = resposta_invalida
+        return respostas
+
+    empate = rng.random(linhas) < taxa_empate
+    resultado = np.where(
+        empate,
+        CODIGOS_EMPATE[rng.integers(0, 2, linhas)],
+        CODIGOS_VITORIA[rng.integers(0, 2, linhas)]
+    )
+
+    return pd.DataFrame({
+        "model_a": nomes_modelos[indice_a],
+        "model_b": nomes_modelos[indice_b],
+        "result_code": resultado,
+        "species": nomes_especies[indice_especie],
+        "model_response_a": _respostas(),
+        "model_response_b": _respostas(),
+        "image_id": np.char.add("img-", (rng.integers(0, max(linhas // 5, 1), linhas)).astype(str)).astype(object),
+    })
+
+
+def _casos(dados_brutos: pd.DataFrame):
+    # Lista (nome, função sem argumentos) de tudo que é medido; o pool longo é preparado uma vez fora da medição.
+    pool = ranking.preparar_dados_analise(dados_brutos)
+    contagens = ranking.construir_contagens_confusao(pool)
+    especie = pool["verdade"].iloc[0] if not pool.empty else "background"
+    modelo = pool["modelo"].iloc[0] if not pool.empty else ""
+    respostas = dados_brutos["model_response_a"]
+    especies = dados_brutos["species"]
+
+    return [
+        ("normalizar_label", lambda: especies.map(ranking.normalizar_label)),
+        ("normalizar_labels", lambda: ranking.normalizar_labels(especies)),
+        ("parsear_resposta", lambda: respostas.map(ranking.parsear_resposta)),
+        ("preparar_dados_analise", lambda: ranking.preparar_dados_analise(dados_brutos)),
+        ("construir_contagens_confusao", lambda: ranking.construir_contagens_confusao(pool)),
+        ("calcular_metricas_globais", lambda: ranking.calcular_metricas_globais(pool)),
+        ("calcular_metricas_globais[contagens]", lambda: ranking.calcular_metricas_globais(pool, contagens)),
+        ("calcular_metricas_binarias", lambda: ranking.calcular_metricas_binarias(pool, especie)),
+        ("calcular_matriz_confusao", lambda: ranking.calcular_matriz_confusao(pool, modelo)),
+        ("calcular_bradley_terry", lambda: ranking.calcular_bradley_terry(dados_brutos)),
+        ("calcular_elo_rating", lambda: ranking.calcular_elo_rating(dados_brutos)),
+    ]
+
+
+def _medir(funcao, repeticoes: int) -> dict:
+    # Tempo: melhor de N execuções (perf_counter). Memória: pico do tracemalloc numa execução separada,
+    # para que o overhead do tracemalloc não contamine a medição de tempo.
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "tempo_min_s": min(tempos),
+        "tempo_mediana_s": float(np.median(tempos)),
+        "memoria_pico_mb": pico / (1024 * 1024),
+    }
+
+
+def _commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "desconhecido"
+
+
+def executar_benchmark(tamanhos, modelos: int, especies: int, taxa_empate: float, taxa_json_invalido: float,
+                       repeticoes: int, filtro: str = None) -> dict:
+    resultados = []
+    for linhas in tamanhos:
+        dados = gerar_duelos_sinteticos(linhas, modelos, especies, taxa_empate, taxa_json_invalido)
+        for nome, funcao in _casos(dados):
+            if filtro and filtro not in nome:
+                continue
+            medicao = _medir(funcao, repeticoes)
+            medicao.update({"funcao": nome, "linhas": linhas})
+            resultados.append(medicao)
+            print(f"[BENCH] {nome:<38} {linhas:>10} linhas  {medicao['tempo_min_s']:>9.4f}s  {medicao['memoria_pico_mb']:>9.1f} MB")
+
+    return {
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "parametros": {
+            "modelos": modelos, "especies": especies, "taxa_empate": taxa_empate,
+            "taxa_json_invalido": taxa_json_invalido, "repeticoes": repeticoes,
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar_resultados(base: dict, novo: dict, tolerancia: float = 0.2) -> list:
+    # Compara dois arquivos de resultado e devolve as regressões de tempo acima da tolerância relativa.
+    indice_base = {(r["funcao"], r["linhas"]): r for r in base["resultados"]}
+    regressoes = []
+    for r in novo["resultados"]:
+        anterior = indice_base.get((r["funcao"], r["linhas"]))
+        if not anterior or anterior["tempo_min_s"] <= 0:
+            continue
+        razao = r["tempo_min_s"] / anterior["tempo_min_s"]
+        print(f"[BENCH] {r['funcao']:<38} {r['linhas']:>10} linhas  {razao:>6.2f}x")
+        if razao > 1.0 + tolerancia:
+            regressoes.append({"funcao": r["funcao"], "linhas": r["linhas"], "razao": razao})
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das funções de ranking do EcoLLMDuel.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--modelos", type=int, default=12)
+    parser.add_argument("--especies", type=int, default=8)
+    parser.add_argument("--taxa-empate", type=float, default=0.2)
+    parser.add_argument("--taxa-json-invalido", type=float, default=0.05)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--filtro", help="Mede só as funções cujo nome contém este texto.")
+    parser.add_argument("--saida", default="bench_ranking.json")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NOVO"))
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0], encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.comparar[1], encoding="utf-8") as f:
+            novo = json.load(f)
+        regressoes = comparar_resultados(base, novo, args.tolerancia)
+        for r in regressoes:
+            print(f"[REGRESSÃO] {r['funcao']} ({r['linhas']} linhas): {r['razao']:.2f}x mais lento")
+        sys.exit(1 if regressoes else 0)
+
+    relatorio = executar_benchmark(
+        args.tamanhos, args.modelos, args.especies, args.taxa_empate,
+        args.taxa_json_invalido, args.repeticoes, args.filtro
+    )
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"[BENCH] Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
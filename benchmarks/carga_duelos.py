@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Driver de carga: N avaliadores concorrentes executando duelos completos contra o servidor mock
+# (benchmarks/mock_provedores.py). Cada duelo percorre o mesmo caminho da arena: registro da imagem
+# no cache compartilhado, base64 + hash, chamada dos dois modelos via executar_analise_cached
+# (com retries) e parse do JSON.
+#
+# Uso:
+#   python -m benchmarks.carga_duelos --avaliadores 20 --duelos 10 --mock-embutido --taxa-429 0.05
+#   python -m benchmarks.carga_duelos --url http://localhost:8900 --modelos gpt-4o:openai gemini-2.5-flash:gemini
+
+MODELOS_PADRAO = ["gpt-4o:openai", "gpt-5-mini:openai", "gemini-2.5-flash:gemini", "meta/llama-3.2-11b-vision-instruct:nvidia"]
+
+
+def _preparar_secrets(url: str) -> str:
+    # st.secrets lê .streamlit/secrets.toml do diretório atual: geramos um diretório temporário
+    # apontando todos os provedores para o mock, sem tocar nos secrets reais do projeto.
+    diretorio = tempfile.mkdtemp(prefix="ecollm-carga-")
+    os.makedirs(os.path.join(diretorio, ".streamlit"))
+    with open(os.path.join(diretorio, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        f.write(
+            'OPENAI_API_KEY = "mock"\n'
+            f'OPENAI_BASE_URL = "{url}/v1"\n'
+            'GOOGLE_API_KEY = "mock"\n'
+            f'GEMINI_API_ENDPOINT = "{url}"\n'
+            'NVIDIA_API_KEY = "mock"\n'
+            f'NVIDIA_BASE_URL = "{url}/v1"\n'
+            'PROVEDORES_HABILITADOS = ["openai", "gemini", "nvidia"]\n'
+        )
+    return diretorio
+
+
+def _jpeg_sintetico(semente: int, largura: int, altura: int) -> bytes:
+    from io import BytesIO
+    from PIL import Image
+
+    rng = np.random.default_rng(semente)
+    pixels = rng.integers(0, 256, (altura, largura, 3), dtype=np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels, "RGB").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def _percentis(valores) -> dict:
+    if not valores:
+        return {}
+    arr = np.asarray(valores)
+    return {
+        "p50_s": float(np.percentile(arr, 50)),
+        "p90_s": float(np.percentile(arr, 90)),
+        "p99_s": float(np.percentile(arr, 99)),
+        "max_s": float(arr.max()),
+    }
+
+
+def executar_carga(modelos: dict, avaliadores: int, duelos_por_avaliador: int, imagens_distintas: int,
+                   largura: int, altura: int) -> dict:
+    from ai.prompt import PROMPT_TEMPLATE, PROMPT_TEMPLATE_2
+    from ai.models import executar_analise_cached
+    from utils.image import registrar_imagem, codificar_imagem_id
+    from utils.json_utils import extrair_json
+
+    trava = threading.Lock()
+    duelos = []
+    chamadas = {m: [] for m in modelos}
+    nomes = list(modelos)
+
+    def avaliador(indice: int):
+        rng = random.Random(indice)
+        for _ in range(duelos_por_avaliador):
+            inicio = time.perf_counter()
+            modelo_a, modelo_b = rng.sample(nomes, 2)
+            # imagens_distintas = 0 → toda imagem é nova (sem cache hit), como no pior caso de produção
+            semente = rng.randrange(imagens_distintas) if imagens_distintas else rng.getrandbits(48)
+            ref_imagem = registrar_imagem(f"sintetica-{semente}", _jpeg_sintetico(semente, largura, altura))
+            enc, img_hash = codificar_imagem_id(ref_imagem)
+            prompt = rng.choice([PROMPT_TEMPLATE, PROMPT_TEMPLATE_2])
+
+            resultados = []
+            for modelo in (modelo_a, modelo_b):
+                sucesso, resposta, tempo = executar_analise_cached(modelo, prompt, img_hash, enc, modelos[modelo])
+                json_ok = bool(sucesso and resposta and extrair_json(resposta))
+                resultados.append(json_ok)
+                with trava:
+                    chamadas[modelo].append({"tempo_s": tempo, "sucesso": sucesso, "json_ok": json_ok})
+
+            with trava:
+                duelos.append({"tempo_s": time.perf_counter() - inicio, "completo": all(resultados)})
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=avaliadores) as executor:
+        list(executor.map(avaliador, range(avaliadores)))
+    duracao = time.perf_counter() - inicio
+
+    completos = [d for d in duelos if d["completo"]]
+    return {
+        "avaliadores": avaliadores,
+        "duelos": len(duelos),
+        "duelos_completos": len(completos),
+        "duracao_total_s": duracao,
+        "vazao_duelos_por_min": len(completos) / duracao * 60 if duracao else 0.0,
+        "latencia_duelo": _percentis([d["tempo_s"] for d in duelos]),
+        "por_modelo": {
+            m: {
+                "chamadas": len(c),
+                "falhas": sum(not x["sucesso"] for x in c),
+                "json_invalido": sum(x["sucesso"] and not x["json_ok"] for x in c),
+                **_percentis([x["tempo_s"] for x in c]),
+            }
+            for m, c in chamadas.items() if c
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do pipeline de duelos contra provedores simulados.")
+    parser.add_argument("--url", default="http://127.0.0.1:8900", help="URL do servidor mock.")
+    parser.add_argument("--mock-embutido", action="store_true", help="Sobe o servidor mock no próprio processo.")
+    parser.add_argument("--latencia-mediana", type=float, default=2.0)
+    parser.add_argument("--latencia-sigma", type=float, default=0.5)
+    parser.add_argument("--taxa-429", type=float, default=0.0)
+    parser.add_argument("--taxa-json-invalido", type=float, default=0.0)
+    parser.add_argument("--modelos", nargs="+", default=MODELOS_PADRAO, help="nome:provedor (openai, gemini, nvidia ou um [provedores.*]).")
+    parser.add_argument("--avaliadores", type=int, default=10)
+    parser.add_argument("--duelos", type=int, default=5, help="Duelos por avaliador.")
+    parser.add_argument("--imagens-distintas", type=int, default=0, help="0 = toda imagem é nova (sem cache).")
+    parser.add_argument("--largura", type=int, default=1280)
+    parser.add_argument("--altura", type=int, default=720)
+    parser.add_argument("--saida", default="carga_duelos.json")
+    args = parser.parse_args()
+
+    modelos = {}
+    for item in args.modelos:
+        nome, _, provedor = item.rpartition(":")
+        modelos[nome] = provedor
+    if len(modelos) < 2:
+        sys.exit("São necessários pelo menos 2 modelos.")
+
+    saida = os.path.abspath(args.saida)
+
+    if args.mock_embutido:
+        from urllib.parse import urlparse
+        from benchmarks.mock_provedores import ConfiguracaoMock, iniciar_servidor
+
+        endereco = urlparse(args.url)
+        iniciar_servidor(
+            ConfiguracaoMock(args.latencia_mediana, args.latencia_sigma, args.taxa_429, args.taxa_json_invalido),
+            endereco.hostname, endereco.port
+        )
+
+    os.chdir(_preparar_secrets(args.url.rstrip("/")))
+
+    relatorio = executar_carga(modelos, args.avaliadores, args.duelos, args.imagens_distintas, args.largura, args.altura)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    print(f"[CARGA] Resultados gravados em {saida}")
+
+
+if __name__ == "__main__":
+    main()
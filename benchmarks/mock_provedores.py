@@ -0,0 +1,225 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data.nomes_especies import NOMES_COMUNS_ESPECIES
+
+# Servidor local que imita os provedores de inferência, para testes de carga e profiling offline.
+# Fala dois protocolos:
+#   POST /v1/chat/completions                       → OpenAI (e NVIDIA, que é compatível)
+#   POST /v1beta/models/<modelo>:generateContent    → Gemini (transporte REST)
+#   GET  /v1/models                                 → checagem de saúde (servidores compatíveis)
+#   GET  /stats                                     → contadores por modelo
+#
+# Para apontar o app para ele, no secrets.toml:
+#   OPENAI_API_KEY = "mock"
+#   OPENAI_BASE_URL = "http://localhost:8900/v1"
+#   GOOGLE_API_KEY = "mock"
+#   GEMINI_API_ENDPOINT = "http://localhost:8900"
+#   NVIDIA_API_KEY = "mock"
+#   NVIDIA_BASE_URL = "http://localhost:8900/v1"
+#
+# Config opcional por modelo (--config), sobrescrevendo os padrões da linha de comando:
+#   {"modelos": {"gpt-5": {"mediana_s": 8.0, "sigma": 0.8, "taxa_429": 0.1, "taxa_json_invalido": 0.02}}}
+
+ROTA_GEMINI = re.compile(r"^/v1beta/models/([^:]+):generateContent")
+
+ESPECIES = [(c, n) for c, n in NOMES_COMUNS_ESPECIES.items() if " " in c]
+
+
+class ConfiguracaoMock:
+    def __init__(self, mediana_s: float, sigma: float, taxa_429: float, taxa_json_invalido: float,
+                 por_modelo: dict = None, semente: int = None):
+        self.padrao = {
+            "mediana_s": mediana_s,
+            "sigma": sigma,
+            "taxa_429": taxa_429,
+            "taxa_json_invalido": taxa_json_invalido,
+        }
+        self.por_modelo = por_modelo or {}
+        self.rng = random.Random(semente)
+        self.trava = threading.Lock()
+        self.estatisticas = {}
+
+    def parametros(self, modelo: str) -> dict:
+        return {**self.padrao, **self.por_modelo.get(modelo, {})}
+
+    def sortear(self, modelo: str):
+        # Latência log-normal (cauda longa, como nas APIs reais) e sorteio dos erros injetados.
+        p = self.parametros(modelo)
+        with self.trava:
+            latencia = self.rng.lognormvariate(0.0, p["sigma"]) * p["mediana_s"]
+            limite_excedido = self.rng.random() < p["taxa_429"]
+            malformado = self.rng.random() < p["taxa_json_invalido"]
+            especie = self.rng.choice(ESPECIES)
+        return latencia, limite_excedido, malformado, especie
+
+    def contar(self, modelo: str, chave: str):
+        with self.trava:
+            contadores = self.estatisticas.setdefault(modelo, {"requisicoes": 0, "429": 0, "malformados": 0})
+            contadores[chave] += 1
+
+
+def _corpo_analise(especie, malformado: bool) -> str:
+    cientifico, comum = especie
+    corpo = json.dumps({
+        "deteccao": "Sim",
+        "nome_cientifico": cientifico,
+        "nome_comum": comum,
+        "numero_individuos": "1",
+        "descricao_imagem": "Resposta sintética do servidor mock.",
+        "razao": "Gerada para teste de carga.",
+    }, ensure_ascii=False)
+    # JSON truncado no meio, como acontece quando o modelo estoura tokens
+    return corpo[: len(corpo) // 2] if malformado else corpo
+
+
+def criar_handler(config: ConfiguracaoMock):
+    class HandlerMock(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, status: int, corpo: dict):
+            dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            try:
+                self.wfile.write(dados)
+            except (BrokenPipeError, ConnectionResetError):
+                # Cliente desistiu (prazo vencido ou hedge perdedor)
+                pass
+
+        def _ler_corpo(self) -> dict:
+            tamanho = int(self.headers.get("Content-Length") or 0)
+            bruto = self.rfile.read(tamanho) if tamanho else b"{}"
+            try:
+                return json.loads(bruto)
+            except json.JSONDecodeError:
+                return {}
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                with config.trava:
+                    self._responder(200, config.estatisticas)
+            elif self.path.rstrip("/") == "/v1/models":
+                with config.trava:
+                    modelos = sorted(set(config.por_modelo) | set(config.estatisticas))
+                self._responder(200, {"object": "list", "data": [{"id": m, "object": "model"} for m in modelos]})
+            else:
+                self._responder(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            pedido = self._ler_corpo()
+            rota_gemini = ROTA_GEMINI.match(self.path)
+
+            if self.path.rstrip("/").endswith("/chat/completions"):
+                modelo = pedido.get("model", "desconhecido")
+                self._processar(modelo, self._resposta_openai, self._erro_openai)
+            elif rota_gemini:
+                modelo = rota_gemini.group(1)
+                self._processar(modelo, self._resposta_gemini, self._erro_gemini)
+            else:
+                self._responder(404, {"error": {"message": f"rota desconhecida: {self.path}"}})
+
+        def _processar(self, modelo, montar_resposta, montar_erro):
+            latencia, limite_excedido, malformado, especie = config.sortear(modelo)
+            config.contar(modelo, "requisicoes")
+            time.sleep(latencia)
+
+            if limite_excedido:
+                config.contar(modelo, "429")
+                self._responder(429, montar_erro())
+                return
+
+            if malformado:
+                config.contar(modelo, "malformados")
+            self._responder(200, montar_resposta(modelo, _corpo_analise(especie, malformado)))
+
+        @staticmethod
+        def _resposta_openai(modelo, conteudo):
+            return {
+                "id": f"chatcmpl-mock-{time.time_ns()}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": modelo,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": conteudo, "refusal": None},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 1000, "completion_tokens": len(conteudo) // 4, "total_tokens": 1000 + len(conteudo) // 4},
+            }
+
+        @staticmethod
+        def _erro_openai():
+            return {"error": {"message": "Rate limit reached (mock 429).", "type": "requests", "code": "rate_limit_exceeded"}}
+
+        @staticmethod
+        def _resposta_gemini(modelo, conteudo):
+            return {
+                "candidates": [{
+                    "content": {"parts": [{"text": conteudo}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {"promptTokenCount": 1000, "candidatesTokenCount": len(conteudo) // 4,
+                                  "totalTokenCount": 1000 + len(conteudo) // 4},
+                "modelVersion": modelo,
+            }
+
+        @staticmethod
+        def _erro_gemini():
+            return {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota). (mock)",
+                              "status": "RESOURCE_EXHAUSTED"}}
+
+    return HandlerMock
+
+
+def iniciar_servidor(config: ConfiguracaoMock, host: str = "127.0.0.1", porta: int = 8900) -> ThreadingHTTPServer:
+    # Sobe o servidor numa thread daemon e devolve a instância (use .shutdown() para parar).
+    servidor = ThreadingHTTPServer((host, porta), criar_handler(config))
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor mock dos provedores de IA (OpenAI/NVIDIA e Gemini).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8900)
+    parser.add_argument("--latencia-mediana", type=float, default=2.0, help="Mediana da latência log-normal (s).")
+    parser.add_argument("--latencia-sigma", type=float, default=0.5, help="Desvio do log da latência (cauda).")
+    parser.add_argument("--taxa-429", type=float, default=0.0)
+    parser.add_argument("--taxa-json-invalido", type=float, default=0.0)
+    parser.add_argument("--config", help="JSON com parâmetros por modelo.")
+    parser.add_argument("--semente", type=int)
+    args = parser.parse_args()
+
+    por_modelo = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            por_modelo = json.load(f).get("modelos", {})
+
+    config = ConfiguracaoMock(
+        args.latencia_mediana, args.latencia_sigma, args.taxa_429,
+        args.taxa_json_invalido, por_modelo, args.semente
+    )
+    servidor = ThreadingHTTPServer((args.host, args.porta), criar_handler(config))
+    servidor.daemon_threads = True
+    print(f"[MOCK] Provedores simulados em http://{args.host}:{args.porta} (Ctrl+C para parar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
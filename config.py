@@ -1,6 +1,180 @@
 # --- CONSTANTES ---
 TEMPERATURA_FIXA = 0.5
 LIMITE_TOKENS = 16384
+# Orçamento do cache compartilhado de bytes JPEG (todas as sessões do processo)
+LIMITE_CACHE_IMAGENS_MB = 256
+
+# --- AQUECIMENTO (warm-up na partida do processo, ver utils/aquecimento.py) ---
+# Imagens já sorteadas, baixadas e codificadas à espera do próximo duelo (0 desliga)
+TAMANHO_BUFFER_IMAGENS = 3
+# Índice das pastas/imagens do Drive; imagens novas no Drive aparecem no sorteio depois deste tempo
+TTL_CATALOGO_DRIVE_S = 600
+# Porta do endpoint de prontidão (GET /pronto → 200 só depois do aquecimento) para o balanceador
+PORTA_PRONTIDAO = 8502
+
+# --- RAJADAS E DUPLICATAS (data/duplicatas.py, índice gerado por `python -m data.duplicatas`) ---
+# Distância de Hamming máxima (de 64 bits) do pHash entre quadros da mesma rajada, dentro de uma pasta
+LIMIAR_RAJADA_BITS = 10
+# ... e disparados a até JANELA_RAJADA_S segundos um do outro (data do EXIF). Sem data no EXIF, só quadros
+# vizinhos na ordem dos nomes de arquivo se ligam: a cena da armadilha é fixa e o pHash sozinho emenda disparos distintos
+JANELA_RAJADA_S = 60
+# Até esta distância no dHash (de 256 bits) é a mesma foto com outros bytes: compartilham o cache de inferência
+LIMIAR_DUPLICATA_BITS = 4
+# Sorteio dentro da pasta: "um_por_rajada" (rajada sorteada, depois um quadro dela), "representante"
+# (sempre o primeiro quadro de cada rajada) ou "todas" (ignora o índice, como antes)
+MODO_RAJADAS = "um_por_rajada"
+
+# --- DUELOS EM SEQUÊNCIA (rajadas, ver README) ---
+# Fração dos duelos em que uma rajada inteira (quadros do mesmo disparo, pelo índice perceptual) vai para os
+# dois modelos numa só requisição. 0 desliga; ligar só depois de migrar as colunas de sequência do banco.
+FRACAO_DUELOS_SEQUENCIA = 0.0
+# "multi_imagem" (um anexo por quadro) ou "mosaico" (quadros lado a lado numa imagem só, menos tokens).
+# Se algum dos modelos sorteados não aceita tantas imagens, o duelo usa o mosaico.
+MODO_SEQUENCIA = "multi_imagem"
+MIN_QUADROS_SEQUENCIA = 2
+MAX_QUADROS_SEQUENCIA = 4
+# Orçamento de imagem por requisição (bytes JPEG somados, antes do base64). Acima dele os quadros são
+# reduzidos (lado maior e qualidade JPEG) até caber; se nem a menor redução cabe, saem quadros (até
+# MIN_QUADROS_SEQUENCIA) e, por fim, o duelo vai só com o primeiro quadro.
+ORCAMENTO_BYTES_SEQUENCIA = 4 * 1024 * 1024
+LADO_MAXIMO_QUADRO = 1280
+LADO_MOSAICO = 2048
+
+# --- CORRESPONDÊNCIA TAXONÔMICA (data/nomes_especies.py) ---
+# Predições fora do inventário exato são resolvidas por nome comum, erro de grafia (trigramas + distância de
+# edição) e gênero. Desligado, só vale o nome científico exato (ou sinônimo conhecido), como antes.
+CORRESPONDENCIA_APROXIMADA = True
+# Distância de edição máxima como fração do tamanho do nome (mínimo de 1 letra)
+DISTANCIA_RELATIVA_MAXIMA = 0.2
+# Resposta só no nível de gênero ('Leopardus', 'Leopardus sp.') conta como a única espécie do gênero no inventário.
+# Outra espécie nomeada do mesmo gênero ('Leopardus pardalis') continua errada.
+CORRESPONDENCIA_POR_GENERO = True
+
+# --- RANKINGS SEGMENTADOS (data/segmentos.py) ---
+# Janelas de tempo oferecidas no painel, em dias
+JANELAS_RANKING_DIAS = [7, 30]
+# Intervalo mínimo entre duas buscas de duelos novos no banco (o painel roda a cada interação)
+INTERVALO_SINCRONIA_SEGMENTOS_S = 10
+# O mesmo para o dataset compacto dos rankings principais (data/dataset.py)
+INTERVALO_SINCRONIA_DUELOS_S = 2
+
+# --- FIGURAS DO PAINEL (ui/figuras.py) ---
+# Figuras Plotly prontas guardadas no processo (LRU), por versão dos dados, gráfico e seleção
+LIMITE_CACHE_FIGURAS = 256
+# A cada versão nova dos dados, monta em segundo plano as figuras de todas as espécies e modelos
+PRECOMPUTAR_FIGURAS = True
+
+# --- CONCORDÂNCIA DOS AVALIADORES (data/ranking.py) ---
+# Prior Beta (concordâncias, discordâncias) da confiabilidade: quem ainda tem poucos duelos decisivos fica perto de 0.8
+PRIOR_CONCORDANCIA = (4, 1)
+
+# --- ESTADO COMPARTILHADO (várias réplicas) ---
+# sqlite:///arquivo (padrão, réplicas na mesma máquina), redis://host:6379/0 ou memoria:// (ver utils/estado.py)
+ESTADO_BACKEND_URL = "sqlite:///.estado/ecollm.db"
+TTL_CACHE_ANALISE_S = 3600
+TTL_CACHE_IMAGENS_S = 3600
+TTL_CACHE_RANKINGS_S = 300
+# Backend SQLite: a cada INTERVALO_LIMPEZA_ESTADO_S, numa escrita, apaga as chaves vencidas e, acima do
+# limite, as que vencem primeiro
+LIMITE_ESTADO_SQLITE_MB = 512
+INTERVALO_LIMPEZA_ESTADO_S = 300
+# Bytes das imagens do Drive no backend compartilhado (além do LRU do processo). Vale a pena com Redis entre
+# máquinas; desligado, cada réplica baixa do Drive as imagens que ainda não tem.
+IMAGENS_NO_BACKEND = False
+# Requisições por minuto por provedor, somadas entre as réplicas (ausente = sem limite).
+# Provedores de [provedores.<nome>] aceitam `limite_rpm` no secrets.toml.
+LIMITES_RPM = {}
+
+# --- MODELOS ---
+# Modelos de cada provedor embutido (ai/provedores.py). Provedores extras, como servidores locais
+# compatíveis com a OpenAI, são configurados no secrets.toml em [provedores.<nome>].
+MODELOS_OPENAI = [
+    "gpt-4.1",
+    "gpt-4.1-mini",
+    "gpt-4.1-nano",
+    "gpt-4o",
+    "gpt-4o-mini",
+    "gpt-5",
+    "gpt-5-chat-latest",
+    "gpt-5-mini",
+    "gpt-5-nano",
+    # "gpt-5-search-api",  # API vision indisponível (Erro 500)
+    "gpt-5.1",
+    "gpt-5.1-chat-latest",
+    "gpt-5.2",
+    "gpt-5.2-chat-latest",
+]
+
+MODELOS_GEMINI = [
+    "gemini-3-flash-preview",
+    "gemini-2.5-flash",
+    "gemini-2.5-flash-lite",
+]
+
+MODELOS_NVIDIA = [
+    # Meta (Vision)
+    "meta/llama-3.2-90b-vision-instruct",
+    "meta/llama-3.2-11b-vision-instruct",
+    "meta/llama-4-maverick-17b-128e-instruct",
+    "meta/llama-4-scout-17b-16e-instruct",
+    # Mistral (Vision)
+    "mistralai/mistral-large-3-675b-instruct-2512",
+    "mistralai/ministral-14b-instruct-2512",
+    "mistralai/mistral-medium-3-instruct",
+    # Microsoft (Vision)
+    "microsoft/phi-4-multimodal-instruct",
+    "microsoft/phi-3.5-vision-instruct",
+    # Google (Vision via NVIDIA)
+    "google/gemma-3-27b-it",
+    # Kimi (via NVIDIA API)
+    "moonshotai/kimi-k2.5",
+]
+
+# Provedores embutidos ativos (Gemini e NVIDIA desativados por enquanto)
+PROVEDORES_HABILITADOS = ["openai"]
+
+# --- RASTREAMENTO (utils/tracing.py) ---
+# Passado este tamanho, logs/spans.jsonl vira spans.jsonl.1 (o .1 vira .2, ...) e guardamos COPIAS_ARQUIVO_SPANS antigos
+LIMITE_ARQUIVO_SPANS_MB = 64
+COPIAS_ARQUIVO_SPANS = 3
+
+# --- PRAZOS E HEDGING ---
+# Orçamento de latência por chamada (s), incluindo retries. Casa pelo prefixo mais longo do nome do modelo.
+ORCAMENTO_LATENCIA_PADRAO_S = 90
+ORCAMENTOS_LATENCIA_S = {
+    "gpt-5": 180,          # raciocínio com max_completion_tokens alto
+    "gpt-4": 60,
+    "gemini": 90,
+    "meta/": 60,
+}
+# Passado o p90 da latência do modelo, dispara uma requisição duplicada por outra chave; vale a primeira que voltar
+HEDGE_HABILITADO = True
+HEDGE_PERCENTIL = 90
+HEDGE_MIN_AMOSTRAS = 20
+
+# --- ADJUDICAÇÃO PELO GABARITO (ui/arena.py) ---
+# Duelos em que só uma IA acerta a espécie (pasta) são julgados pelo gabarito, sem voto humano, e gravados
+# em auto_evaluations; o avaliador recebe os ambíguos. Roda no pré-sorteio, em segundo plano.
+# Limite de duelos automáticos por sorteio do avaliador.
+ADJUDICACAO_AUTOMATICA = True
+MAX_ADJUDICACOES_POR_SORTEIO = 3
+# Fração dos duelos decisivos que vai ao avaliador mesmo assim (controle): é deles que sai a concordância
+# dos avaliadores e o peso de cada um no Bradley-Terry ponderado
+FRACAO_DUELOS_CONTROLE = 0.1
+
+# Quantas vezes um lado do duelo que falhou é substituído por outro modelo (mesma imagem e prompt)
+MAX_SUBSTITUICOES_DUELO = 2
+
+# --- DISJUNTORES (circuit breakers por modelo) ---
+# Abre quando, nas últimas DISJUNTOR_JANELA chamadas (mínimo DISJUNTOR_MIN_CHAMADAS), a fração de falhas
+# passa de DISJUNTOR_TAXA_FALHA. Chamadas que gastam mais que DISJUNTOR_FRACAO_LENTA do orçamento contam como falha.
+DISJUNTOR_JANELA = 20
+DISJUNTOR_MIN_CHAMADAS = 5
+DISJUNTOR_TAXA_FALHA = 0.5
+DISJUNTOR_FRACAO_LENTA = 0.8
+# Tempo aberto antes da sondagem (meio-aberto); dobra a cada sondagem que falha, até o máximo
+DISJUNTOR_ESPERA_S = 60
+DISJUNTOR_ESPERA_MAX_S = 900
 
 # --- CSS ---
 CSS_STYLES = """
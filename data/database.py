@@ -1,16 +1,35 @@
 import streamlit as st
 from sqlalchemy import text
-from typing import Dict, Any
-import pandas as pd
+from typing import Dict, Any, TYPE_CHECKING
+from utils.tracing import span, marcar_erro
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _tabela_vazia():
+    # pandas só é importado quando alguém pede uma tabela (a tela de login não precisa dele)
+    import pandas as pd
+    return pd.DataFrame()
 
 def _get_conn():
     """Conexão lazy — só conecta quando realmente precisar."""
-    try:
-        return st.connection("evaluations_db", type="sql", url=st.secrets["DATABASE_URL"])
-    except Exception as e:
-        print(f"[ERRO BD] Falha na conexão: {e}")
-        return None
+    with span("bd.conexao"):
+        try:
+            return st.connection("evaluations_db", type="sql", url=st.secrets["DATABASE_URL"])
+        except Exception as e:
+            marcar_erro(e)
+            print(f"[ERRO BD] Falha na conexão: {e}")
+            return None
+
+def verificar_conexao() -> bool:
+    """Abre o pool e faz um SELECT 1 (aquecimento): o primeiro login não paga a conexão TCP/TLS."""
+    conn = _get_conn()
+    if not conn:
+        return False
+    with conn.session as session:
+        session.execute(text("SELECT 1"))
+    return True
 
 def verificar_perfil(email):
     email_tratado = email.lower().strip()
@@ -78,29 +97,36 @@ def salvar_perfil_novo(dados):
              st.error("Erro ao salvar perfil. Verifique sua conexão.")
         return False
 
+# Colunas dos duelos em sequência (rajada num só duelo). Só entram no INSERT quando o duelo é uma
+# sequência, então bancos ainda sem a migração do README continuam gravando os duelos de imagem única.
+COLUNAS_SEQUENCIA = ["frame_ids", "sequence_mode", "payload_bytes"]
+
+def _com_sequencia(colunas: str, valores: str, dados: Dict[str, Any]) -> tuple[str, str]:
+    if dados.get("frame_ids") is None:
+        return colunas, valores
+    return (colunas + ", " + ", ".join(COLUNAS_SEQUENCIA),
+            valores + ", " + ", ".join(f":{c}" for c in COLUNAS_SEQUENCIA))
+
 def salvar_avaliacao(dados: Dict[str, Any]) -> bool:
     conn = _get_conn()
     if not conn:
         st.error("Erro de conexão com o banco de dados.")
         return False
     try:
-        query = text("""
-            INSERT INTO evaluations (
+        colunas, valores = _com_sequencia("""
                 evaluator_email, image_path, image_id, species,
                 model_a, model_b,
                 time_a, time_b, text_len_a, text_len_b,
                 model_response_a, model_response_b,
                 result_code, comments,
-                prompt, temperature
-            ) VALUES (
+                prompt, temperature""", """
                 :evaluator_email, :image_path, :image_id, :species,
                 :model_a, :model_b,
                 :time_a, :time_b, :text_len_a, :text_len_b,
                 :model_response_a, :model_response_b,
                 :result_code, :comments,
-                :prompt, :temperature
-            )
-        """)
+                :prompt, :temperature""", dados)
+        query = text(f"INSERT INTO evaluations ({colunas}) VALUES ({valores})")
 
         parametros = {
             "evaluator_email": dados["evaluator_email"],
@@ -118,12 +144,14 @@ def salvar_avaliacao(dados: Dict[str, Any]) -> bool:
             "result_code": dados["result_code"],
             "comments": dados["comments"],
             "prompt": dados["prompt"],
-            "temperature": dados["temperature"]
+            "temperature": dados["temperature"],
+            **{c: dados.get(c) for c in COLUNAS_SEQUENCIA}
         }
 
-        with conn.session as s:
-            s.execute(query, parametros)
-            s.commit()
+        with span("bd.insert_avaliacao", model_a=parametros["model_a"], model_b=parametros["model_b"]):
+            with conn.session as s:
+                s.execute(query, parametros)
+                s.commit()
         return True
     except Exception as e:
         erro = str(e).lower()
@@ -139,15 +167,224 @@ def salvar_avaliacao(dados: Dict[str, Any]) -> bool:
              st.error("Erro ao salvar avaliação. Tente novamente.")
         return False
 
-def carregar_dados_duelos():
+def salvar_falha_modelo(dados: Dict[str, Any]) -> bool:
+    """Registra uma tentativa de modelo que falhou num duelo (erro, prazo ou JSON inválido), com a latência.
+    Roda no meio do duelo: falhas aqui só vão para o log, sem mensagem na interface."""
+    conn = _get_conn()
+    if not conn:
+        return False
+    try:
+        query = text("""
+            INSERT INTO model_failures (
+                evaluator_email, image_id, model, prompt, time_s, reason
+            ) VALUES (
+                :evaluator_email, :image_id, :model, :prompt, :time_s, :reason
+            )
+        """)
+        with span("bd.insert_falha", model=dados["model"], reason=dados["reason"]):
+            with conn.session as s:
+                s.execute(query, dados)
+                s.commit()
+        return True
+    except Exception as e:
+        print(f"[ERRO SALVAR FALHA] {e}")
+        return False
+
+def salvar_duelo_automatico(dados: Dict[str, Any]) -> bool:
+    """Grava um duelo julgado pelo gabarito (sem avaliador humano) em auto_evaluations.
+    Roda no meio do sorteio: falhas aqui só vão para o log, e o duelo segue para o avaliador."""
+    conn = _get_conn()
+    if not conn:
+        return False
+    try:
+        colunas, valores = _com_sequencia(
+            "image_path, image_id, species, model_a, model_b, time_a, time_b, "
+            "model_response_a, model_response_b, result_code, prompt, temperature, adjudicator",
+            ":image_path, :image_id, :species, :model_a, :model_b, :time_a, :time_b, "
+            ":model_response_a, :model_response_b, :result_code, :prompt, :temperature, :adjudicator",
+            dados
+        )
+        query = text(f"INSERT INTO auto_evaluations ({colunas}) VALUES ({valores})")
+        with span("bd.insert_automatico", model_a=dados["model_a"], model_b=dados["model_b"]):
+            with conn.session as s:
+                s.execute(query, dados)
+                s.commit()
+        return True
+    except Exception as e:
+        print(f"[ERRO SALVAR AUTOMATICO] {e}")
+        return False
+
+def carregar_resultados_sequencias():
+    """Respostas e tempos por duelo (humanos e automáticos), com as colunas de sequência, para comparar
+    imagem única × rajada. Sem a migração do README a consulta falha e o relatório fica vazio."""
+    conn = _get_conn()
+    if not conn:
+        return _tabela_vazia()
+    try:
+        colunas = "model_a, model_b, species, model_response_a, model_response_b, time_a, time_b, " + ", ".join(COLUNAS_SEQUENCIA)
+        query = f"SELECT {colunas} FROM evaluations UNION ALL SELECT {colunas} FROM auto_evaluations"
+        with span("bd.carregar_sequencias") as s:
+            df = conn.query(query, ttl=0, show_spinner=False)
+            s["attributes"]["linhas"] = len(df)
+        return df
+    except Exception as e:
+        print(f"[ERRO BD] Falha ao carregar resultados por sequência: {e}")
+        return _tabela_vazia()
+
+def carregar_falhas_modelos():
+    conn = _get_conn()
+    if not conn:
+        return _tabela_vazia()
+    try:
+        with span("bd.carregar_falhas") as s:
+            df = conn.query("SELECT model, time_s, reason, prompt FROM model_failures", ttl=0, show_spinner=False)
+            s["attributes"]["linhas"] = len(df)
+        return df
+    except Exception as e:
+        print(f"[ERRO BD] Falha ao carregar falhas dos modelos: {e}")
+        return _tabela_vazia()
+
+def carregar_perfis_avaliadores():
+    """Perfil técnico de cada avaliador (sem nome, idade ou gênero), para cruzar com a concordância."""
+    conn = _get_conn()
+    if not conn:
+        return _tabela_vazia()
+    try:
+        query = """
+            SELECT email, institution, profession, works_environmental_area, has_forest_management_exp,
+                   has_animal_monitoring_exp, has_camera_trap_exp
+            FROM user_profiles
+        """
+        return conn.query(query, ttl=0, show_spinner=False)
+    except Exception as e:
+        print(f"[ERRO BD] Falha ao carregar perfis dos avaliadores: {e}")
+        return _tabela_vazia()
+
+# Tabelas de duelos lidas pelo dataset e pelos segmentos: votos humanos e duelos julgados pelo gabarito.
+# Os ids são de cada tabela (podem coincidir entre as duas).
+TABELAS_DUELOS = ("evaluations", "auto_evaluations")
+
+def carregar_lote_duelos(ultimo_id: int = 0, tamanho_lote: int = 20000, tabela: str = "evaluations") -> "pd.DataFrame":
+    """Duelos com id > ultimo_id, em ordem de id, para o dataset compacto dos rankings (data/dataset.py).
+    As respostas vêm só para serem parseadas na chegada; o dataset não guarda o texto.
+    Em auto_evaluations não há avaliador: evaluator_email vem nulo."""
+    if tabela not in TABELAS_DUELOS:
+        raise ValueError(f"Tabela de duelos desconhecida: {tabela}")
     conn = _get_conn()
     if not conn:
         print("[ERRO BD] Sem conexão para carregar duelos.")
-        return pd.DataFrame()
+        return _tabela_vazia()
     try:
-        query = "SELECT model_a, model_b, result_code, species, model_response_a, model_response_b, image_id FROM evaluations"
-        df = conn.query(query, ttl=0, show_spinner=False)
+        avaliador = "evaluator_email" if tabela == "evaluations" else "NULL AS evaluator_email"
+        query = f"""
+            SELECT id, {avaliador}, model_a, model_b, result_code, species, image_id, prompt,
+                   model_response_a, model_response_b
+            FROM {tabela}
+            WHERE id > :ultimo_id
+            ORDER BY id
+            LIMIT :tamanho_lote
+        """
+        with span("bd.carregar_duelos", ultimo_id=int(ultimo_id), tabela=tabela) as s:
+            df = conn.query(
+                query,
+                params={"ultimo_id": int(ultimo_id), "tamanho_lote": int(tamanho_lote)},
+                ttl=0,
+                show_spinner=False
+            )
+            s["attributes"]["linhas"] = len(df)
         return df
     except Exception as e:
         print(f"[ERRO BD] Falha ao carregar duelos: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return _tabela_vazia()
+
+def carregar_respostas_duelos(ids: list, tabela: str = "evaluations") -> "pd.DataFrame":
+    """Textos das respostas dos duelos pedidos (armazenamento sob demanda do dataset compacto)."""
+    import pandas as pd
+    from sqlalchemy import bindparam
+
+    if tabela not in TABELAS_DUELOS:
+        raise ValueError(f"Tabela de duelos desconhecida: {tabela}")
+    conn = _get_conn()
+    if not conn or not ids:
+        return _tabela_vazia()
+    try:
+        query = text(
+            f"SELECT id, model_response_a, model_response_b FROM {tabela} WHERE id IN :ids"
+        ).bindparams(bindparam("ids", expanding=True))
+        with span("bd.carregar_respostas", duelos=len(ids), tabela=tabela):
+            with conn.session as s:
+                linhas = s.execute(query, {"ids": [int(i) for i in ids]}).mappings().all()
+        return pd.DataFrame(linhas, columns=["id", "model_response_a", "model_response_b"])
+    except Exception as e:
+        print(f"[ERRO BD] Falha ao carregar respostas: {e}")
+        return _tabela_vazia()
+
+def carregar_lote_avaliacoes(ultimo_id: int = 0, tamanho_lote: int = 50000) -> "pd.DataFrame":
+    """Lê um lote de avaliações com id > ultimo_id, em ordem de id (paginação por chave, sem varredura completa)."""
+    conn = _get_conn()
+    if not conn:
+        print("[ERRO BD] Sem conexão para exportar avaliações.")
+        return _tabela_vazia()
+    try:
+        query = """
+            SELECT id, created_at, evaluator_email, image_path, image_id, species,
+                   model_a, model_b, time_a, time_b, text_len_a, text_len_b,
+                   model_response_a, model_response_b, result_code, comments,
+                   prompt, temperature
+            FROM evaluations
+            WHERE id > :ultimo_id
+            ORDER BY id
+            LIMIT :tamanho_lote
+        """
+        return conn.query(
+            query,
+            params={"ultimo_id": int(ultimo_id), "tamanho_lote": int(tamanho_lote)},
+            ttl=0,
+            show_spinner=False
+        )
+    except Exception as e:
+        print(f"[ERRO BD] Falha ao carregar lote de avaliações: {e}")
+        return _tabela_vazia()
+
+def carregar_lote_segmentos(ultimo_id: int = 0, tamanho_lote: int = 20000, tabela: str = "evaluations") -> "pd.DataFrame":
+    """Duelos com id > ultimo_id e o perfil de experiência de quem avaliou, para o motor de rankings segmentados.
+    Os de auto_evaluations vêm sem perfil (não há avaliador)."""
+    if tabela not in TABELAS_DUELOS:
+        raise ValueError(f"Tabela de duelos desconhecida: {tabela}")
+    conn = _get_conn()
+    if not conn:
+        return _tabela_vazia()
+    try:
+        colunas = """e.id, e.created_at, e.prompt, e.species, e.model_a, e.model_b, e.result_code,
+                   e.model_response_a, e.model_response_b"""
+        if tabela == "evaluations":
+            query = f"""
+                SELECT {colunas},
+                       p.works_environmental_area, p.has_forest_management_exp,
+                       p.has_animal_monitoring_exp, p.has_camera_trap_exp
+                FROM evaluations e
+                LEFT JOIN user_profiles p ON p.email = e.evaluator_email
+                WHERE e.id > :ultimo_id
+                ORDER BY e.id
+                LIMIT :tamanho_lote
+            """
+        else:
+            query = f"""
+                SELECT {colunas}
+                FROM auto_evaluations e
+                WHERE e.id > :ultimo_id
+                ORDER BY e.id
+                LIMIT :tamanho_lote
+            """
+        with span("bd.carregar_segmentos", ultimo_id=int(ultimo_id), tabela=tabela) as s:
+            df = conn.query(
+                query,
+                params={"ultimo_id": int(ultimo_id), "tamanho_lote": int(tamanho_lote)},
+                ttl=0,
+                show_spinner=False
+            )
+            s["attributes"]["linhas"] = len(df)
+        return df
+    except Exception as e:
+        print(f"[ERRO BD] Falha ao carregar duelos para os segmentos: {e}")
+        return _tabela_vazia()
@@ -0,0 +1,251 @@
+import time
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from config import INTERVALO_SINCRONIA_DUELOS_S
+from data.ranking import parsear_resposta, mapear_unicos
+from utils.tracing import span
+
+# Duelos em memória num formato colunar compacto, compartilhado pelas sessões do processo.
+#
+# O quadro de `evaluations` carregado a cada rerun tinha as respostas completas dos modelos (KBs por duelo)
+# em colunas object. Aqui cada texto repetido vira categoria (códigos int8/int16 + uma cópia de cada valor):
+# avaliador, modelos, resultado, espécie, versão do prompt e as predições já parseadas. As respostas em si
+# não ficam em memória: `respostas()` busca no banco, por id, só quando alguém precisa do texto.
+#
+# O conjunto cresce pelo id (WHERE id > ultimo_id), como o motor de segmentos; cada sincronia com duelos
+# novos gera um DatasetDuelos novo, e as visões filtradas de um dataset são calculadas uma vez e reaproveitadas
+# por todas as sessões até a próxima sincronia.
+#
+# Entram os votos humanos (evaluations) e os duelos julgados pelo gabarito (auto_evaluations), marcados na
+# coluna `origem`. As métricas de predição (Macro F1, confusão, espécies, confiabilidade) usam todas as
+# respostas; Elo, Bradley-Terry e a concordância dos avaliadores usam só `humanos()`.
+
+TAMANHO_LOTE = 20000
+
+# origem → tabela do banco (cada uma com o seu cursor de id)
+ORIGENS = {"humano": "evaluations", "gabarito": "auto_evaluations"}
+
+COLUNAS_CATEGORICAS = [
+    "origem", "evaluator_email", "model_a", "model_b", "result_code", "species", "image_id",
+    "versao_prompt", "predicao_a", "predicao_b",
+]
+
+
+def compactar_duelos(df: pd.DataFrame) -> pd.DataFrame:
+    """Quadro compacto a partir de linhas de `evaluations` (ou de um snapshot com predicao_a/predicao_b)."""
+    from data.snapshot import versao_prompt
+
+    compacto = pd.DataFrame(index=pd.RangeIndex(len(df)))
+    compacto["id"] = df["id"].to_numpy(dtype=np.int64) if "id" in df.columns else np.arange(len(df), dtype=np.int64)
+
+    # Predições parseadas uma vez por resposta distinta; depois disso o texto não é mais necessário
+    for lado in ("a", "b"):
+        if f"predicao_{lado}" in df.columns:
+            compacto[f"predicao_{lado}"] = df[f"predicao_{lado}"].to_numpy(dtype=object)
+        elif f"model_response_{lado}" in df.columns:
+            compacto[f"predicao_{lado}"] = mapear_unicos(df[f"model_response_{lado}"], parsear_resposta)
+
+    if "prompt" in df.columns:
+        compacto["versao_prompt"] = mapear_unicos(df["prompt"], versao_prompt)
+    if "evaluator_email" in df.columns:
+        # Duelos do gabarito não têm avaliador: o email fica nulo
+        emails = df["evaluator_email"]
+        compacto["evaluator_email"] = emails.astype(str).str.lower().str.strip().where(emails.notna().to_numpy()).to_numpy(dtype=object)
+    for coluna in ("origem", "model_a", "model_b", "result_code", "species", "image_id"):
+        if coluna in df.columns:
+            compacto[coluna] = df[coluna].to_numpy(dtype=object)
+
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in compacto.columns:
+            compacto[coluna] = compacto[coluna].astype("category")
+    return compacto
+
+
+def _concatenar(quadros: list) -> pd.DataFrame:
+    # pd.concat transformaria categorias diferentes em object; union_categoricals mantém os códigos
+    quadros = [q for q in quadros if not q.empty]
+    if len(quadros) <= 1:
+        return quadros[0] if quadros else pd.DataFrame()
+    colunas = {}
+    for coluna in quadros[0].columns:
+        partes = [q[coluna] for q in quadros]
+        if isinstance(partes[0].dtype, pd.CategoricalDtype):
+            if len({p.cat.categories.dtype for p in partes}) > 1:
+                # Coluna toda nula num bloco (email nos duelos do gabarito) tem categorias de outro tipo
+                partes = [p.cat.set_categories(p.cat.categories.astype(object)) for p in partes]
+            colunas[coluna] = union_categoricals(partes, ignore_order=True)
+        else:
+            colunas[coluna] = np.concatenate([p.to_numpy() for p in partes])
+    return pd.DataFrame(colunas)
+
+
+class DatasetDuelos:
+    """Duelos em colunas compactas (`quadro`) com as respostas num armazenamento à parte, lido sob demanda.
+
+    Aceito por todas as funções de data/ranking.py. Para leitura, se comporta como o quadro (`empty`,
+    `columns`, `len`, `df[coluna]`). É imutável: filtros devolvem outro DatasetDuelos e ficam memorizados.
+    """
+
+    def __init__(self, quadro: pd.DataFrame, prompts: dict = None, carregar_respostas=None):
+        self.quadro = quadro
+        # versão do prompt → texto (primeiro visto), para exibir os prompts personalizados
+        self.prompts = prompts or {}
+        self._carregar_respostas = carregar_respostas
+        self._visoes = {}
+        self._trava = threading.Lock()
+
+    @classmethod
+    def de_quadro(cls, df: pd.DataFrame, carregar_respostas=None):
+        prompts = {}
+        if "prompt" in df.columns and not df.empty:
+            from data.snapshot import versao_prompt
+            for texto in df["prompt"].dropna().unique():
+                if str(texto).strip():
+                    prompts.setdefault(versao_prompt(texto), str(texto).strip())
+        return cls(compactar_duelos(df) if not df.empty else pd.DataFrame(), prompts, carregar_respostas)
+
+    # --- Leitura, como um DataFrame ---
+    @property
+    def empty(self) -> bool:
+        return self.quadro.empty
+
+    @property
+    def columns(self):
+        return self.quadro.columns
+
+    def __len__(self):
+        return len(self.quadro)
+
+    def __getitem__(self, coluna):
+        return self.quadro[coluna]
+
+    # --- Visões ---
+    def visao(self, chave, calcular):
+        """Resultado derivado deste dataset (filtro, tabela longa...), calculado uma vez e compartilhado."""
+        with self._trava:
+            if chave in self._visoes:
+                return self._visoes[chave]
+        resultado = calcular()
+        with self._trava:
+            return self._visoes.setdefault(chave, resultado)
+
+    def filtrar(self, mascara: np.ndarray) -> "DatasetDuelos":
+        # Só os códigos são copiados; categorias, prompts e o acesso às respostas são compartilhados
+        return DatasetDuelos(self.quadro[mascara].reset_index(drop=True), self.prompts, self._carregar_respostas)
+
+    def humanos(self) -> "DatasetDuelos":
+        """Só os duelos com voto humano (Elo, Bradley-Terry, concordância). Sem a coluna origem, todos são."""
+        if self.empty or "origem" not in self.columns:
+            return self
+        return self.visao("humanos", lambda: self.filtrar((self.quadro["origem"] == "humano").to_numpy()))
+
+    def gabarito(self) -> "DatasetDuelos":
+        """Só os duelos julgados pelo gabarito (auto_evaluations). Sem a coluna origem, nenhum."""
+        if self.empty or "origem" not in self.columns:
+            return self.visao("gabarito", lambda: self.filtrar(np.zeros(len(self), dtype=bool)))
+        return self.visao("gabarito", lambda: self.filtrar((self.quadro["origem"] == "gabarito").to_numpy()))
+
+    def por_prompt(self, versao: str | None) -> "DatasetDuelos":
+        if versao is None or self.empty or "versao_prompt" not in self.columns:
+            return self
+        return self.visao(("prompt", versao), lambda: self.filtrar((self.quadro["versao_prompt"] == versao).to_numpy()))
+
+    # --- Respostas ---
+    def respostas(self) -> pd.DataFrame:
+        """Textos das respostas (id, model_response_a, model_response_b) destes duelos, buscados agora no banco."""
+        colunas = ["id", "model_response_a", "model_response_b"]
+        if self.empty or self._carregar_respostas is None:
+            return pd.DataFrame(columns=colunas)
+        ids = self.quadro["id"].to_numpy()
+        # Os ids são de cada tabela: busca por origem e junta por (origem, id)
+        if "origem" in self.columns:
+            origens = self.quadro["origem"].to_numpy(dtype=object)
+        else:
+            origens = np.full(len(ids), "humano", dtype=object)
+        lotes = []
+        with span("dataset.respostas", duelos=len(ids)):
+            for origem in pd.unique(origens):
+                ids_origem = ids[origens == origem]
+                for i in range(0, len(ids_origem), TAMANHO_LOTE):
+                    lote = self._carregar_respostas(ids_origem[i:i + TAMANHO_LOTE].tolist(), ORIGENS[origem])
+                    if not lote.empty:
+                        lotes.append(lote.assign(origem=origem))
+        respostas = pd.concat(lotes or [pd.DataFrame(columns=colunas + ["origem"])], ignore_index=True)
+        # Mesma ordem do quadro
+        return pd.DataFrame({"id": ids, "origem": origens}).merge(respostas, on=["origem", "id"], how="left")[colunas]
+
+    def impressao(self) -> str:
+        """Identifica o conjunto de duelos (chave dos caches de rankings e figuras), calculada uma vez por dataset.
+
+        As respostas não entram no hash (uma avaliação nunca muda depois de gravada); a ordem entra, pois o Elo depende dela.
+        A assinatura do parser de espécies entra também: as métricas de predição mudam com a correspondência taxonômica.
+        """
+        def _calcular():
+            from data.nomes_especies import assinatura_correspondencia
+
+            colunas = [c for c in ("origem", "evaluator_email", "model_a", "model_b", "result_code", "species", "image_id") if c in self.columns]
+            hashes = pd.util.hash_pandas_object(self.quadro[colunas], index=False).to_numpy()
+            return f"{len(self)}:{hashlib.sha1(hashes.tobytes()).hexdigest()}:{assinatura_correspondencia()}"
+        return self.visao("impressao", _calcular)
+
+    def memoria_bytes(self) -> int:
+        return int(self.quadro.memory_usage(index=True, deep=True).sum())
+
+
+class ColecaoDuelos:
+    """Dataset do processo, atualizado com os duelos novos do banco a cada INTERVALO_SINCRONIA_DUELOS_S."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        # Último id lido de cada tabela (ORIGENS)
+        self.ultimos_ids = dict.fromkeys(ORIGENS, 0)
+        self._ultima_sincronia = None
+        self._blocos = []
+        self._prompts = {}
+        self.dataset = None
+
+    def sincronizar(self, carregar_lote=None, carregar_respostas=None, forcar: bool = False) -> DatasetDuelos:
+        from data.database import carregar_lote_duelos, carregar_respostas_duelos
+
+        carregar_lote = carregar_lote or carregar_lote_duelos
+        carregar_respostas = carregar_respostas or carregar_respostas_duelos
+        with self._trava:
+            agora = time.monotonic()
+            if not forcar and self.dataset is not None and agora - self._ultima_sincronia < INTERVALO_SINCRONIA_DUELOS_S:
+                return self.dataset
+            self._ultima_sincronia = agora
+
+            novos = 0
+            with span("dataset.sincronia", **{f"ultimo_id_{origem}": i for origem, i in self.ultimos_ids.items()}) as s:
+                for origem, tabela in ORIGENS.items():
+                    while True:
+                        lote = carregar_lote(self.ultimos_ids[origem], TAMANHO_LOTE, tabela)
+                        if lote is None or lote.empty:
+                            break
+                        novo = DatasetDuelos.de_quadro(lote.assign(origem=origem))
+                        self._blocos.append(novo.quadro)
+                        for versao, texto in novo.prompts.items():
+                            self._prompts.setdefault(versao, texto)
+                        self.ultimos_ids[origem] = int(lote["id"].max())
+                        novos += len(lote)
+                        if len(lote) < TAMANHO_LOTE:
+                            break
+                s["attributes"]["novos"] = novos
+
+            if novos or self.dataset is None:
+                # Um bloco só: a próxima concatenação não repete o trabalho
+                self._blocos = [_concatenar(self._blocos)] if self._blocos else []
+                self.dataset = DatasetDuelos(
+                    self._blocos[0] if self._blocos else pd.DataFrame(), dict(self._prompts), carregar_respostas
+                )
+            return self.dataset
+
+
+colecao_duelos = ColecaoDuelos()
+
+
+def obter_dataset_duelos() -> DatasetDuelos:
+    return colecao_duelos.sincronizar()
@@ -1,21 +1,37 @@
+import json
 import random
+import threading
+from collections import deque
 import streamlit as st
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 import io
-from PIL import Image
+from config import TAMANHO_BUFFER_IMAGENS, TTL_CATALOGO_DRIVE_S
+from data.duplicatas import indice_perceptual
+from utils.image import registrar_imagem, obter_bytes_imagem, codificar_imagem_id
+from utils.estado import obter_backend
+from utils.tracing import span, marcar_erro, registrar_evento
+
+@st.cache_resource(show_spinner=False)
+def _credenciais_drive():
+    # Credenciais da conta de serviço, uma vez por processo (o token é renovado pela própria google-auth)
+    return service_account.Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=['https://www.googleapis.com/auth/drive.readonly']
+    )
 
 def get_drive_service():
+    with span("drive.autenticacao"):
+        return _get_drive_service()
+
+def _get_drive_service():
     try:
-        creds_dict = st.secrets["gcp_service_account"]
-        creds = service_account.Credentials.from_service_account_info(
-            creds_dict,
-            scopes=['https://www.googleapis.com/auth/drive.readonly']
-        )
-        return build('drive', 'v3', credentials=creds)
+        # O service não é thread-safe (httplib2): um por chamada, mas com as credenciais já carregadas
+        return build('drive', 'v3', credentials=_credenciais_drive(), cache_discovery=False)
     except Exception as e:
         erro = str(e).lower()
+        marcar_erro(e)
         print(f"[ERRO DRIVE] Falha na autenticação: {e}")
         if "invalid_grant" in erro or "unauthorized" in erro:
             st.error("Erro de Autenticação Google: Credenciais inválidas ou expiradas.")
@@ -26,19 +42,23 @@ def get_drive_service():
         return None
 
 def listar_arquivos(service, folder_id):
-    try:
-        results = service.files().list(
-            q=f"'{folder_id}' in parents and trashed=false",
-            fields="files(id, name, mimeType)",
-            pageSize=1000
-        ).execute()
-        return results.get('files', [])
-    except Exception as e:
-        print(f"[LOG] Erro ao listar arquivos: {e}")
-        return []
+    with span("drive.listagem", folder_id=folder_id) as s:
+        try:
+            results = service.files().list(
+                q=f"'{folder_id}' in parents and trashed=false",
+                fields="files(id, name, mimeType)",
+                pageSize=1000
+            ).execute()
+            arquivos = results.get('files', [])
+            s["attributes"]["itens"] = len(arquivos)
+            return arquivos
+        except Exception as e:
+            marcar_erro(e)
+            registrar_evento("drive.listagem.erro", f"Erro ao listar arquivos: {e}", nivel="erro", folder_id=folder_id)
+            return []
 
 def baixar_imagem_drive(service, file_id):
-    try:
+    with span("drive.download", file_id=file_id) as s:
         request = service.files().get_media(fileId=file_id)
         file_io = io.BytesIO()
         downloader = MediaIoBaseDownload(file_io, request)
@@ -47,56 +67,181 @@ def baixar_imagem_drive(service, file_id):
         while done is False:
             status, done = downloader.next_chunk()
 
-        file_io.seek(0)
-        return Image.open(file_io)
-    except Exception as e:
-        raise e
+        s["attributes"]["bytes"] = file_io.tell()
+        return file_io.getvalue()
+
+def carregar_imagem(file_id, service=None):
+    """Garante os bytes da imagem no cache compartilhado (baixando só se necessário) e devolve o handle."""
+    if obter_bytes_imagem(file_id) is not None:
+        return file_id
+    service = service or get_drive_service()
+    if not service:
+        return None
+    return registrar_imagem(file_id, baixar_imagem_drive(service, file_id))
+
+def construir_catalogo(service, root_id):
+    """Índice {espécie: [{"id", "name"}, ...]} das imagens de cada pasta. None se a raiz está vazia ou inacessível."""
+    itens_raiz = listar_arquivos(service, root_id)
+    if not itens_raiz:
+        return None
+
+    pastas = [i for i in itens_raiz if i['mimeType'] == 'application/vnd.google-apps.folder']
+    with span("drive.catalogo", pastas=len(pastas)) as s:
+        catalogo = {
+            pasta['name']: [
+                {"id": i['id'], "name": i['name']}
+                for i in listar_arquivos(service, pasta['id']) if 'image' in i['mimeType']
+            ]
+            for pasta in pastas
+        }
+        s["attributes"]["imagens"] = sum(len(imagens) for imagens in catalogo.values())
+    return catalogo
+
+def obter_catalogo(service, root_id):
+    """Catálogo do backend compartilhado (montado por qualquer réplica) ou, na falta, listado no Drive."""
+    # O índice de rajadas/duplicatas mora ao lado do catálogo e é relido no mesmo ritmo
+    indice_perceptual.atualizar(root_id)
+    chave = f"drive:catalogo:{root_id}"
+    guardado = obter_backend().obter(chave)
+    if guardado is not None:
+        return json.loads(guardado)
+
+    catalogo = construir_catalogo(service, root_id)
+    if catalogo:
+        obter_backend().definir(chave, json.dumps(catalogo, ensure_ascii=False).encode("utf-8"), TTL_CATALOGO_DRIVE_S)
+    return catalogo
+
+def _sortear(catalogo):
+    # Sorteio hierárquico (espécie, depois imagem): espécies raras têm a mesma chance das comuns.
+    # Dentro da pasta, cada rajada da armadilha conta como uma foto (ver data/duplicatas.py)
+    nome_especie = random.choice(list(catalogo))
+    imagens = catalogo[nome_especie]
+    return nome_especie, (indice_perceptual.sortear_imagem(imagens) if imagens else None)
+
+
+class BufferImagens:
+    """Imagens já sorteadas, baixadas e codificadas (base64 + hash), prontas para os próximos duelos.
+
+    Compartilhado pelas sessões do processo; cada imagem é entregue a um único duelo. A reposição roda
+    numa thread própria, então o avaliador só espera o Drive quando o buffer está vazio.
+    """
+
+    def __init__(self, tamanho: int):
+        self.tamanho = tamanho
+        self._prontas = deque()
+        self._trava = threading.Lock()
+        self._reabastecendo = False
+        # Vagas já tomadas por downloads em andamento (o aquecimento e a reposição podem rodar juntos)
+        self._reservadas = 0
+
+    def __len__(self):
+        return len(self._prontas)
+
+    def retirar(self):
+        with self._trava:
+            return self._prontas.popleft() if self._prontas else None
+
+    def reabastecer(self):
+        """Completa o buffer (bloqueante). Devolve quantas imagens foram adicionadas."""
+        service = get_drive_service()
+        root_id = st.secrets.get("geral", {}).get("DRIVE_FOLDER_ID")
+        if not service or not root_id:
+            return 0
+        catalogo = obter_catalogo(service, root_id)
+        if not catalogo:
+            return 0
+
+        adicionadas = 0
+        tentativas = 0
+        while tentativas < self.tamanho * 3:
+            tentativas += 1
+            nome_especie, imagem = _sortear(catalogo)
+            if imagem is None:
+                continue
+            # Confere a capacidade e reserva a vaga de uma vez só, antes do download
+            with self._trava:
+                if len(self._prontas) + self._reservadas >= self.tamanho:
+                    break
+                self._reservadas += 1
+            pronta = None
+            try:
+                with span("drive.buffer", especie=nome_especie):
+                    ref_imagem = carregar_imagem(imagem['id'], service)
+                    codificar_imagem_id(ref_imagem)
+                pronta = (ref_imagem, imagem['name'], nome_especie, imagem['id'])
+            except Exception as e:
+                registrar_evento("drive.buffer.erro", f"Falha ao pré-carregar imagem {imagem['id']}: {e}", nivel="aviso")
+            finally:
+                with self._trava:
+                    self._reservadas -= 1
+                    if pronta:
+                        self._prontas.append(pronta)
+            if pronta:
+                adicionadas += 1
+        return adicionadas
+
+    def reabastecer_em_segundo_plano(self):
+        with self._trava:
+            if self._reabastecendo or len(self._prontas) + self._reservadas >= self.tamanho:
+                return
+            self._reabastecendo = True
+
+        def _tarefa():
+            try:
+                self.reabastecer()
+            except Exception as e:
+                print(f"[ERRO DRIVE] Falha ao reabastecer o buffer de imagens: {e}")
+            finally:
+                self._reabastecendo = False
+
+        threading.Thread(target=_tarefa, daemon=True, name="ecollm-buffer-imagens").start()
+
+
+buffer_imagens = BufferImagens(TAMANHO_BUFFER_IMAGENS)
 
 def obter_imagem_aleatoria():
+    # Caminho rápido: imagem pré-carregada pelo aquecimento ou por uma reposição anterior
+    pronta = buffer_imagens.retirar()
+    if buffer_imagens.tamanho:
+        buffer_imagens.reabastecer_em_segundo_plano()
+    if pronta:
+        print(f"Sorteio Hierárquico (buffer): {pronta[2]} -> {pronta[1]}")
+        return pronta
+
     service = get_drive_service()
     if not service: return None
 
     try:
         root_id = st.secrets["geral"]["DRIVE_FOLDER_ID"]
     except KeyError:
-        print(f"[LOG] Configuração ausente: 'DRIVE_FOLDER_ID' não encontrado no secrets.toml")
+        registrar_evento("drive.configuracao_ausente", "Configuração ausente: 'DRIVE_FOLDER_ID' não encontrado no secrets.toml", nivel="erro")
         st.error("Configuração ausente: 'DRIVE_FOLDER_ID' não encontrado no secrets.toml")
         return None
 
-    # Listar pastas de espécies
-    itens_raiz = listar_arquivos(service, root_id)
-    if not itens_raiz:
-        print(f"[LOG] A pasta raiz do Drive está vazia ou inacessível. ID: {root_id}")
+    # Índice de pastas de espécies e suas imagens (cacheado; não lista o Drive a cada duelo)
+    catalogo = obter_catalogo(service, root_id)
+    if catalogo is None:
+        registrar_evento("drive.raiz_vazia", f"A pasta raiz do Drive está vazia ou inacessível. ID: {root_id}", nivel="erro", root_id=root_id)
         st.error("A pasta raiz do Drive está vazia ou inacessível.")
         return None
 
-    pastas = [i for i in itens_raiz if i['mimeType'] == 'application/vnd.google-apps.folder']
-
-    if not pastas:
-        print(f"[LOG] Erro de Dados: Não existem subpastas (espécies) na raiz {root_id}.")
+    if not catalogo:
+        registrar_evento("drive.sem_especies", f"Erro de Dados: Não existem subpastas (espécies) na raiz {root_id}.", nivel="erro", root_id=root_id)
         st.error("Erro de Dados: Não existem subpastas (espécies).")
         return None
 
-    # Sorteio: Espécie
-    pasta_sorteada = random.choice(pastas)
-    nome_especie = pasta_sorteada['name']
-    id_pasta = pasta_sorteada['id']
-
-    # Sorteio: Imagem
-    conteudo_pasta = listar_arquivos(service, id_pasta)
-    imagens_validas = [i for i in conteudo_pasta if 'image' in i['mimeType']]
+    # Sorteio: Espécie, depois Imagem
+    nome_especie, imagem_sorteada = _sortear(catalogo)
 
-    if not imagens_validas:
-        print(f"[LOG] Sorteio Inválido: A espécie '{nome_especie}' foi sorteada, mas a pasta dela está vazia.")
+    if imagem_sorteada is None:
+        registrar_evento("drive.especie_vazia", f"Sorteio Inválido: A espécie '{nome_especie}' foi sorteada, mas a pasta dela está vazia.", nivel="erro", especie=nome_especie)
         st.error(f"Sorteio Inválido: A espécie '{nome_especie}' foi sorteada, mas a pasta dela está vazia.")
         return None
 
-    imagem_sorteada = random.choice(imagens_validas)
     print(f"Sorteio Hierárquico: {nome_especie} -> {imagem_sorteada['name']}")
-
     try:
-        img_pil = baixar_imagem_drive(service, imagem_sorteada['id'])
-        return img_pil, imagem_sorteada['name'], nome_especie, imagem_sorteada['id']
+        ref_imagem = carregar_imagem(imagem_sorteada['id'], service)
+        return ref_imagem, imagem_sorteada['name'], nome_especie, imagem_sorteada['id']
     except Exception as e:
         erro = str(e).lower()
         print(f"[ERRO DOWNLOAD] {e}")
@@ -109,4 +254,35 @@ def obter_imagem_aleatoria():
              st.error("Tempo limite esgotado ao baixar imagem.")
         else:
              st.error("Erro ao baixar a imagem. Detalhes no terminal.")
-        return None
\ No newline at end of file
+        return None
+
+def obter_sequencia_aleatoria(minimo: int, maximo: int):
+    """Rajada sorteada para um duelo em sequência: ([ids], [nomes], espécie), ou None se o índice
+    perceptual não tem rajada com `minimo` quadros (o duelo segue com uma imagem só)."""
+    service = get_drive_service()
+    root_id = st.secrets.get("geral", {}).get("DRIVE_FOLDER_ID")
+    if not service or not root_id:
+        return None
+    catalogo = obter_catalogo(service, root_id)
+    if not catalogo:
+        return None
+
+    # Mesmo sorteio hierárquico (espécie, depois rajada), só entre as espécies com rajadas no índice
+    especies = list(catalogo)
+    random.shuffle(especies)
+    for nome_especie in especies:
+        quadros = indice_perceptual.sortear_rajada(catalogo[nome_especie], minimo, maximo)
+        if quadros:
+            break
+    else:
+        return None
+
+    print(f"Sorteio de Sequência: {nome_especie} -> {len(quadros)} quadros a partir de {quadros[0]['name']}")
+    try:
+        with span("drive.sequencia", especie=nome_especie, quadros=len(quadros)):
+            ids = [carregar_imagem(q["id"], service) for q in quadros]
+    except Exception as e:
+        registrar_evento("drive.sequencia.erro", f"Falha ao baixar a sequência de {nome_especie}: {e}", nivel="aviso", especie=nome_especie)
+        return None
+    return ids, [q["name"] for q in quadros], nome_especie
+
@@ -0,0 +1,296 @@
+import io
+import json
+import time
+import random
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from config import LIMIAR_RAJADA_BITS, JANELA_RAJADA_S, LIMIAR_DUPLICATA_BITS, MODO_RAJADAS, TTL_CATALOGO_DRIVE_S
+from utils.estado import obter_backend
+from utils.tracing import span, registrar_evento
+
+# Índice perceptual das imagens do Drive: rajadas e duplicatas.
+#
+# Armadilhas fotográficas disparam em rajada, então cada pasta de espécie tem sequências de quadros
+# quase iguais; duelos em quadros da mesma rajada custam a inferência inteira e informam pouco.
+# Um job offline (python -m data.duplicatas) baixa cada imagem uma vez, calcula pHash (64 bits) e
+# dHash (256 bits) e agrupa, dentro de cada espécie:
+#   rajadas     → pHash a até LIMIAR_RAJADA_BITS bits e disparo a até JANELA_RAJADA_S (data do EXIF), ou
+#                 vizinhos na ordem dos nomes quando falta a data: quadros do mesmo disparo (o sorteio pega
+#                 um por rajada). Só o pHash não basta: a câmera fotografa sempre a mesma cena.
+#   duplicatas  → dHash a até LIMIAR_DUPLICATA_BITS: a mesma foto com bytes diferentes (recompressão,
+#                 cópia), que passa a compartilhar o cache de inferência. O dHash de 256 bits separa bem
+#                 cópias (0–4 bits) de quadros vizinhos da rajada (10+), o que o pHash de 64 bits não faz.
+# O índice fica no backend compartilhado, ao lado do catálogo do Drive, e é incremental: rodar de novo
+# só baixa as imagens que ainda não têm hash.
+
+# 2: data do EXIF guardada com os hashes e rajadas limitadas no tempo
+VERSAO_INDICE = 2
+
+
+def _chave_indice(root_id: str) -> str:
+    return f"drive:perceptual:{root_id}"
+
+
+# --- HASHES PERCEPTUAIS ---
+
+def _matriz_dct(n: int) -> np.ndarray:
+    # Matriz da DCT-II ortonormal: dct(x) = C @ x
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matriz = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matriz[0] /= np.sqrt(2)
+    return matriz
+
+
+_DCT_32 = _matriz_dct(32)
+
+
+def _para_inteiro(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def _cinza(imagem: Image.Image, tamanho: tuple) -> np.ndarray:
+    # draft() deixa o decodificador JPEG reduzir a imagem já na leitura (fotos de armadilha têm vários MP)
+    imagem.draft("L", (tamanho[0] * 4, tamanho[1] * 4))
+    return np.asarray(imagem.convert("L").resize(tamanho, Image.Resampling.LANCZOS), dtype=np.float64)
+
+
+def phash(imagem: Image.Image) -> int:
+    """pHash de 64 bits: sinal dos coeficientes de baixa frequência da DCT em relação à mediana."""
+    pixels = _cinza(imagem, (32, 32))
+    baixas = (_DCT_32 @ pixels @ _DCT_32.T)[:8, :8]
+    # O termo DC (brilho médio) fica fora da mediana para não puxá-la
+    return _para_inteiro(baixas > np.median(baixas.ravel()[1:]))
+
+
+def dhash(imagem: Image.Image, lado: int = 16) -> int:
+    """dHash de lado² bits: gradiente horizontal numa miniatura (lado+1)x(lado)."""
+    pixels = _cinza(imagem, (lado + 1, lado))
+    return _para_inteiro(pixels[:, 1:] > pixels[:, :-1])
+
+
+def instante_exif(imagem: Image.Image) -> float | None:
+    """Momento do disparo (DateTimeOriginal do EXIF, ou DateTime) em segundos, ou None se a imagem não tem data."""
+    try:
+        exif = imagem.getexif()
+        texto = exif.get_ifd(0x8769).get(36867) or exif.get(306)
+        return datetime.strptime(str(texto).strip("\x00 "), "%Y:%m:%d %H:%M:%S").timestamp() if texto else None
+    except Exception:
+        return None
+
+
+def hashes_imagem(dados: bytes) -> tuple[str, str, float | None]:
+    # (pHash, dHash) em hexadecimal e a data do EXIF, o formato guardado no índice
+    imagem = Image.open(io.BytesIO(dados))
+    return f"{phash(imagem):016x}", f"{dhash(imagem):064x}", instante_exif(imagem)
+
+
+def _palavras(hashes_hex: list[str]) -> np.ndarray:
+    # Hashes hexadecimais (mesmo tamanho) → matriz (n, palavras de 64 bits) para o XOR vetorizado
+    return np.array([[int(h[k:k + 16], 16) for k in range(0, len(h), 16)] for h in hashes_hex], dtype=np.uint64)
+
+
+def _agrupar(ids: list, palavras: np.ndarray, limiar: int, ligaveis=None) -> dict:
+    # Componentes conexas do grafo "hashes a até `limiar` bits"; devolve {id: representante} só para
+    # ids em grupos de 2 ou mais. O representante é o primeiro id do grupo na ordem recebida.
+    # `ligaveis(i)`: máscara dos ids seguintes que podem se ligar a i (além da distância), ou None para todos.
+    pai = list(range(len(ids)))
+
+    def raiz(x):
+        while pai[x] != x:
+            pai[x] = pai[pai[x]]
+            x = pai[x]
+        return x
+
+    for i in range(len(ids) - 1):
+        # Hamming de i contra todos os seguintes
+        perto = np.bitwise_count(palavras[i + 1:] ^ palavras[i]).sum(axis=1) <= limiar
+        if ligaveis is not None:
+            perto &= ligaveis(i)
+        for j in np.flatnonzero(perto) + i + 1:
+            ri, rj = raiz(i), raiz(int(j))
+            if ri != rj:
+                pai[max(ri, rj)] = min(ri, rj)
+
+    grupos = {}
+    for i in range(len(ids)):
+        grupos.setdefault(raiz(i), []).append(i)
+    return {ids[i]: ids[r] for r, membros in grupos.items() if len(membros) > 1 for i in membros}
+
+
+def agrupar_especie(imagens: list, hashes: dict) -> tuple[dict, dict]:
+    """Rajadas e duplicatas de uma pasta: ({id: representante da rajada}, {id: canônico da duplicata})."""
+    # Ordem do nome do arquivo: nas armadilhas é a ordem de disparo, então o representante é o primeiro quadro
+    ids = [i["id"] for i in sorted(imagens, key=lambda i: i["name"]) if i["id"] in hashes]
+    if len(ids) < 2:
+        return {}, {}
+    # Data do disparo (NaN quando o EXIF não tem)
+    instantes = np.array([hashes[i][2] if hashes[i][2] is not None else np.nan for i in ids], dtype=float)
+
+    def _mesmo_disparo(i):
+        # Com as duas datas: disparos a até JANELA_RAJADA_S. Sem uma delas: só o quadro seguinte na ordem dos nomes
+        seguintes = instantes[i + 1:]
+        perto_no_tempo = np.abs(seguintes - instantes[i]) <= JANELA_RAJADA_S
+        sem_data = np.isnan(seguintes) | np.isnan(instantes[i])
+        vizinho = np.zeros(len(seguintes), dtype=bool)
+        vizinho[:1] = True
+        return perto_no_tempo | (sem_data & vizinho)
+
+    rajadas = _agrupar(ids, _palavras([hashes[i][0] for i in ids]), LIMIAR_RAJADA_BITS, _mesmo_disparo)
+    duplicatas = _agrupar(ids, _palavras([hashes[i][1] for i in ids]), LIMIAR_DUPLICATA_BITS)
+    return rajadas, duplicatas
+
+
+# --- JOB OFFLINE ---
+
+def construir_indice(catalogo: dict, trabalhadores: int = 8, anterior: dict = None) -> dict:
+    """Calcula os hashes que faltam (download em paralelo, um service do Drive por thread) e reagrupa."""
+    from data.drive import get_drive_service, baixar_imagem_drive
+
+    hashes = {}
+    if anterior and anterior.get("versao") == VERSAO_INDICE:
+        hashes = dict(anterior.get("imagens", {}))
+    ids_catalogo = {i["id"] for imagens in catalogo.values() for i in imagens}
+    # Imagens apagadas do Drive saem do índice
+    hashes = {i: h for i, h in hashes.items() if i in ids_catalogo}
+    pendentes = [i for i in ids_catalogo if i not in hashes]
+
+    local = threading.local()
+
+    def _calcular(id_imagem):
+        # O service do Drive não é thread-safe (httplib2): um por thread
+        if getattr(local, "service", None) is None:
+            local.service = get_drive_service()
+        try:
+            return id_imagem, hashes_imagem(baixar_imagem_drive(local.service, id_imagem))
+        except Exception as e:
+            registrar_evento("perceptual.erro", f"Falha ao indexar imagem {id_imagem}: {e}", nivel="aviso", image_id=id_imagem)
+            return id_imagem, None
+
+    with span("perceptual.hashes", pendentes=len(pendentes), trabalhadores=trabalhadores) as s:
+        with ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="ecollm-perceptual") as executor:
+            for n, (id_imagem, par) in enumerate(executor.map(_calcular, pendentes), 1):
+                if par is not None:
+                    hashes[id_imagem] = list(par)
+                if n % 500 == 0:
+                    print(f"[PERCEPTUAL] {n}/{len(pendentes)} imagens processadas.")
+        s["attributes"]["calculados"] = len(hashes) - (len(ids_catalogo) - len(pendentes))
+
+    rajadas, duplicatas = {}, {}
+    with span("perceptual.agrupamento", especies=len(catalogo)):
+        for imagens in catalogo.values():
+            r, d = agrupar_especie(imagens, hashes)
+            rajadas.update(r)
+            duplicatas.update(d)
+
+    return {
+        "versao": VERSAO_INDICE,
+        "criado_em": time.time(),
+        "limiares": {"rajada": LIMIAR_RAJADA_BITS, "janela_rajada_s": JANELA_RAJADA_S, "duplicata": LIMIAR_DUPLICATA_BITS},
+        "imagens": hashes,
+        "rajadas": rajadas,
+        "duplicatas": duplicatas,
+    }
+
+
+def indexar_drive(root_id: str, trabalhadores: int = 8) -> dict:
+    """Atualiza o índice perceptual da pasta raiz no backend compartilhado (sempre com o catálogo recém-listado)."""
+    from data.drive import get_drive_service, construir_catalogo
+
+    service = get_drive_service()
+    catalogo = construir_catalogo(service, root_id) if service else None
+    if not catalogo:
+        raise RuntimeError(f"Catálogo do Drive vazio ou inacessível (raiz {root_id}).")
+
+    guardado = obter_backend().obter(_chave_indice(root_id))
+    anterior = json.loads(guardado) if guardado is not None else None
+    indice = construir_indice(catalogo, trabalhadores, anterior)
+    # Sem TTL: o índice só muda quando o job roda de novo
+    obter_backend().definir(_chave_indice(root_id), json.dumps(indice).encode("utf-8"))
+    return indice
+
+
+# --- USO NO APP ---
+
+class IndicePerceptual:
+    """Índice carregado do backend no processo, relido a cada TTL_CATALOGO_DRIVE_S (junto com o catálogo)."""
+
+    def __init__(self, modo: str):
+        self.modo = modo
+        self.rajadas = {}
+        self.duplicatas = {}
+        self._root_id = None
+        self._lido_em = 0.0
+        self._trava = threading.Lock()
+
+    def atualizar(self, root_id: str, forcar: bool = False):
+        with self._trava:
+            if not forcar and root_id == self._root_id and time.time() - self._lido_em < TTL_CATALOGO_DRIVE_S:
+                return
+            self._root_id, self._lido_em = root_id, time.time()
+        guardado = obter_backend().obter(_chave_indice(root_id))
+        indice = json.loads(guardado) if guardado is not None else {}
+        if indice and indice.get("versao") != VERSAO_INDICE:
+            print(f"[PERCEPTUAL] Índice na versão {indice.get('versao')}, esperado {VERSAO_INDICE}: ignorado até rodar o job.")
+            indice = {}
+        self.rajadas = indice.get("rajadas", {})
+        self.duplicatas = indice.get("duplicatas", {})
+
+    def sortear_imagem(self, imagens: list):
+        """Uma imagem da pasta, cada rajada com a mesma chance de uma foto isolada."""
+        if self.modo == "todas" or not self.rajadas:
+            return random.choice(imagens)
+        if self.modo == "representante":
+            # Só o primeiro quadro de cada rajada (e as fotos isoladas)
+            representantes = [i for i in imagens if self.rajadas.get(i["id"], i["id"]) == i["id"]]
+            return random.choice(representantes or imagens)
+        grupos = {}
+        for imagem in imagens:
+            grupos.setdefault(self.rajadas.get(imagem["id"], imagem["id"]), []).append(imagem)
+        return random.choice(random.choice(list(grupos.values())))
+
+    def sortear_rajada(self, imagens: list, minimo: int, maximo: int) -> list | None:
+        """Quadros de uma rajada da pasta (na ordem de disparo), ou None se a pasta não tem rajada com `minimo` quadros.
+
+        Rajadas longas são amostradas em `maximo` quadros espaçados, cobrindo a sequência do começo ao fim.
+        """
+        grupos = {}
+        for imagem in sorted(imagens, key=lambda i: i["name"]):
+            if imagem["id"] in self.rajadas:
+                grupos.setdefault(self.rajadas[imagem["id"]], []).append(imagem)
+        candidatas = [g for g in grupos.values() if len(g) >= minimo]
+        if not candidatas:
+            return None
+        quadros = random.choice(candidatas)
+        if len(quadros) > maximo:
+            passo = (len(quadros) - 1) / max(maximo - 1, 1)
+            quadros = [quadros[round(k * passo)] for k in range(maximo)]
+        return quadros
+
+    def chave_inferencia(self, id_imagem: str, img_hash: str) -> str:
+        # Cópias da mesma foto compartilham o cache de inferência pelo id canônico do grupo
+        canonico = self.duplicatas.get(id_imagem)
+        return f"dup:{canonico}" if canonico else img_hash
+
+
+indice_perceptual = IndicePerceptual(MODO_RAJADAS)
+
+
+if __name__ == "__main__":
+    import argparse
+    import streamlit as st
+
+    parser = argparse.ArgumentParser(description="Atualiza o índice perceptual (rajadas e duplicatas) das imagens do Drive.")
+    parser.add_argument("--raiz", help="ID da pasta raiz (padrão: geral.DRIVE_FOLDER_ID do secrets.toml)")
+    parser.add_argument("--trabalhadores", type=int, default=8, help="Downloads em paralelo")
+    args = parser.parse_args()
+
+    raiz = args.raiz or st.secrets["geral"]["DRIVE_FOLDER_ID"]
+    inicio = time.perf_counter()
+    indice = indexar_drive(raiz, args.trabalhadores)
+    print(f"[PERCEPTUAL] {len(indice['imagens'])} imagens indexadas em {time.perf_counter() - inicio:.1f}s: "
+          f"{len(set(indice['rajadas'].values()))} rajadas ({len(indice['rajadas'])} quadros), "
+          f"{len(indice['duplicatas']) - len(set(indice['duplicatas'].values()))} duplicatas.")
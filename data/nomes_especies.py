@@ -1,3 +1,10 @@
+import re
+import json
+import hashlib
+import unicodedata
+from typing import NamedTuple
+from config import CORRESPONDENCIA_APROXIMADA, CORRESPONDENCIA_POR_GENERO, DISTANCIA_RELATIVA_MAXIMA
+
 # Dicionário de mapeamento: Nome da Pasta (Científico) -> Nome Comum
 NOMES_COMUNS_ESPECIES = {
     "Crax globulosa": "Mutum-de-fava",
@@ -12,23 +19,244 @@ NOMES_COMUNS_ESPECIES = {
     "background": "Esta foto não contém nenhum animal !"
 }
 
+# Outros nomes que os modelos costumam devolver para as espécies do inventário → nome da pasta.
+# Sinônimos taxonômicos (gêneros antigos) e grafias erradas vistas nas respostas.
+SINONIMOS_ESPECIES = {
+    "Mitu tuberosum": "Pauxi tuberosa",
+    "Mitu tuberosa": "Pauxi tuberosa",
+    "Cebus macrocephalus": "Sapajus macrocephalus",
+    "Cebus apella macrocephalus": "Sapajus macrocephalus",
+    "Urosciurus spadiceus": "Sciurus spadiceus",
+    "Tupinambis nigropunctatus": "Tupinambis teguixin",
+    "Tupinambis teguixim": "Tupinambis teguixin",
+    "Leopardus wiedi": "Leopardus wiedii",
+    "Felis wiedii": "Leopardus wiedii",
+    "Didelphis albiventer": "Didelphis albiventris",
+}
+
+# Sinônimos de ausência → tudo que significa "sem animal"
+SINONIMOS_AUSENCIA = {
+    "null", "none", "absent", "vazio", "empty", "",
+    "nan", "background", "nenhum", "nenhuma", "n/a", "na",
+}
+
+# Qualificadores de uma resposta só no nível de gênero ('Leopardus sp.', 'Leopardus cf.')
+QUALIFICADORES_GENERO = {"sp", "spp", "cf", "aff"}
+
+# Muda quando as regras de correspondência mudam: predições guardadas com outra versão (snapshots, caches
+# de rankings) são recalculadas. Ver assinatura_correspondencia().
+VERSAO_CORRESPONDENCIA = 2
+
+# Rótulos que parsear_resposta (data/ranking.py) usa para respostas fora do inventário
+ROTULOS_ERRO = {
+    "erro_ou_desconhecido": "Erro (Inventou Especie)",
+    "erro_formatacao": "Erro (Formato Invalido)",
+}
+
+
+def _ausente(valor) -> bool:
+    # Mesmo critério do pd.isna para escalares (None, NaN, pd.NA, NaT), sem importar o pandas na tela de login
+    return valor is None or type(valor).__name__ in ("NAType", "NaTType") or (isinstance(valor, float) and valor != valor)
+
+
+def chave_especie(texto_bruto) -> str:
+    # Forma normalizada de um nome (sem espaços, sublinhados nem maiúsculas; 'Sciurus spadiceus.' vira 'sciurusspadiceus').
+    # Não resolve sinônimos: é a chave de busca do índice abaixo.
+    if _ausente(texto_bruto):
+        return "background"
+
+    limpo = str(texto_bruto).lower().strip().rstrip(".,;:!?")
+
+    if limpo in SINONIMOS_AUSENCIA:
+        return "background"
+
+    return limpo.replace(" ", "").replace("_", "")
+
+
+def assinatura_correspondencia() -> str:
+    """Identifica o parser de espécies em uso: versão das regras, configuração e inventário."""
+    inventario = json.dumps([NOMES_COMUNS_ESPECIES, SINONIMOS_ESPECIES], sort_keys=True).encode("utf-8")
+    return (f"v{VERSAO_CORRESPONDENCIA}:{int(CORRESPONDENCIA_APROXIMADA)}:{DISTANCIA_RELATIVA_MAXIMA}:"
+            f"{int(CORRESPONDENCIA_POR_GENERO)}:{hashlib.sha1(inventario).hexdigest()[:8]}")
+
+
+def _so_genero(texto: str) -> bool:
+    # 'Leopardus', 'Leopardus sp.', 'Leopardus spp': o modelo não nomeou espécie nenhuma
+    partes = texto.split()
+    return len(partes) == 1 or (len(partes) == 2 and partes[1].lower().rstrip(".") in QUALIFICADORES_GENERO)
+
+
+def chave_aproximada(texto: str) -> str:
+    # Só letras, sem acentos e em minúsculas: 'Onça pintada' e 'Onça-pintada' viram 'oncapintada'
+    sem_acentos = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z]", "", sem_acentos.lower())
+
+
+def _trigramas(texto: str) -> set:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)} if len(texto) > 2 else {texto}
+
+
+def distancia_edicao(a: str, b: str, limite: int) -> int:
+    # Levenshtein com corte: devolve limite + 1 assim que a distância certamente passa do limite
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(atual) > limite:
+            return limite + 1
+        anterior = atual
+    return anterior[-1]
+
+
+class Especie(NamedTuple):
+    chave: str
+    cientifico: str
+    comum: str
+
+
+class IndiceTaxonomico:
+    """Índice único das espécies: chave normalizada (da pasta, de sinônimos e de grafias erradas) → espécie canônica.
+
+    Montado uma vez na importação. As buscas são consultas a dicionário; as versões para pd.Series
+    normalizam cada valor distinto uma única vez (factorize) e espalham o resultado pelos códigos.
+    """
+
+    def __init__(self, nomes_comuns: dict, sinonimos: dict):
+        self._por_chave = {}
+        for cientifico, comum in nomes_comuns.items():
+            # Chaves repetidas ("Pauxituberosa"): vale a primeira grafia, com espaço
+            self._por_chave.setdefault(chave_especie(cientifico), Especie(chave_especie(cientifico), cientifico, comum))
+        for sinonimo, cientifico in sinonimos.items():
+            self._por_chave.setdefault(chave_especie(sinonimo), self._por_chave[chave_especie(cientifico)])
+        self.chaves_validas = {especie.chave for especie in self._por_chave.values()}
+        self._normalizados = {}
+        self._montar_aproximado(nomes_comuns, sinonimos)
+
+    def _montar_aproximado(self, nomes_comuns: dict, sinonimos: dict):
+        # Índice da correspondência aproximada: nomes científicos, sinônimos e nomes comuns na forma
+        # chave_aproximada, trigramas desses nomes e gêneros com uma única espécie no inventário
+        nomes = {}
+        ambiguos = set()
+        generos = {}
+        for cientifico, comum in nomes_comuns.items():
+            chave = chave_especie(cientifico)
+            candidatos = [cientifico] + ([comum] if chave != "background" else [])
+            candidatos += [s for s, c in sinonimos.items() if chave_especie(c) == chave]
+            for nome in candidatos:
+                aproximado = chave_aproximada(nome)
+                if nomes.setdefault(aproximado, chave) != chave:
+                    ambiguos.add(aproximado)
+            # Gêneros só dos nomes das pastas (um sinônimo como 'Felis wiedii' não faz de Felis um gênero do inventário)
+            partes = cientifico.split()
+            if len(partes) >= 2:
+                generos.setdefault(chave_aproximada(partes[0]), set()).add(chave)
+        self._aproximados = {nome: chave for nome, chave in nomes.items() if nome not in ambiguos}
+        self._generos = {genero: chaves.pop() for genero, chaves in generos.items() if len(chaves) == 1}
+        self._por_trigrama = {}
+        for nome in self._aproximados:
+            for trigrama in _trigramas(nome):
+                self._por_trigrama.setdefault(trigrama, set()).add(nome)
+        self._resolvidos = {}
+
+    def _mais_proximo(self, aproximado: str, nomes) -> str | None:
+        # Nome do índice a menor distância de edição, dentro de DISTANCIA_RELATIVA_MAXIMA do tamanho
+        limite = max(1, int(len(aproximado) * DISTANCIA_RELATIVA_MAXIMA))
+        melhor, melhor_distancia = None, limite + 1
+        for nome in nomes:
+            distancia = distancia_edicao(aproximado, nome, limite)
+            if distancia < melhor_distancia:
+                melhor, melhor_distancia = nome, distancia
+        return melhor
+
+    def _resolver_aproximado(self, texto: str) -> str | None:
+        aproximado = chave_aproximada(texto)
+        if not aproximado:
+            return None
+        if aproximado in self._aproximados:
+            return self._aproximados[aproximado]
+
+        # Erros de grafia: só compara com os nomes que dividem algum trigrama
+        candidatos = set()
+        for trigrama in _trigramas(aproximado):
+            candidatos |= self._por_trigrama.get(trigrama, set())
+        nome = self._mais_proximo(aproximado, candidatos)
+        if nome is not None:
+            return self._aproximados[nome]
+
+        # Resposta só no nível de gênero ('Didelphis sp.'): vale a única espécie do gênero no inventário.
+        # Outra espécie do gênero ('Didelphis marsupialis') é outra espécie, e fica errada.
+        if CORRESPONDENCIA_POR_GENERO and _so_genero(texto):
+            genero = self._mais_proximo(chave_aproximada(texto.split()[0]), self._generos)
+            if genero is not None:
+                return self._generos[genero]
+        return None
+
+    def resolver(self, texto_bruto, aproximada: bool = CORRESPONDENCIA_APROXIMADA) -> str | None:
+        """Chave da espécie do inventário que o texto nomeia, ou None. Com `aproximada`, aceita nomes comuns,
+        erros de grafia e respostas só no nível de gênero (memorizado por texto)."""
+        chave = self.normalizar(texto_bruto)
+        if chave in self.chaves_validas:
+            return chave
+        if not aproximada or not isinstance(texto_bruto, str):
+            return None
+        if texto_bruto not in self._resolvidos:
+            resolvido = self._resolver_aproximado(texto_bruto)
+            if len(self._resolvidos) < 100_000:
+                self._resolvidos[texto_bruto] = resolvido
+            return resolvido
+        return self._resolvidos[texto_bruto]
+
+    def buscar(self, texto_bruto) -> Especie | None:
+        return self._por_chave.get(chave_especie(texto_bruto))
+
+    def normalizar(self, texto_bruto) -> str:
+        # Chave canônica (sinônimos viram a espécie da pasta); nomes fora do inventário ficam só normalizados
+        if isinstance(texto_bruto, str):
+            normalizado = self._normalizados.get(texto_bruto)
+            if normalizado is None:
+                especie = self.buscar(texto_bruto)
+                normalizado = especie.chave if especie else chave_especie(texto_bruto)
+                # Memória limitada: nomes vindos dos modelos são variados, mas se repetem muito
+                if len(self._normalizados) < 100_000:
+                    self._normalizados[texto_bruto] = normalizado
+            return normalizado
+        return chave_especie(texto_bruto)
+
+    def normalizar_serie(self, serie: "pd.Series") -> "np.ndarray":
+        import numpy as np
+        import pandas as pd
+
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+        return np.array([self.normalizar(valor) for valor in unicos], dtype=object)[codigos]
+
+    def nome_comum(self, texto_bruto) -> str:
+        especie = self.buscar(texto_bruto)
+        return especie.comum if especie else texto_bruto
+
+    def nome_exibicao(self, especie_raw: str, incluir_cientifico: bool = False) -> str:
+        if especie_raw in ROTULOS_ERRO:
+            return ROTULOS_ERRO[especie_raw]
+        especie = self.buscar(especie_raw)
+        if especie is None or especie.comum == especie.cientifico:
+            return especie_raw
+        if incluir_cientifico:
+            return f"{especie.comum} ({especie.cientifico})"
+        return especie.comum
+
+    def nomes_exibicao(self, serie: "pd.Series", incluir_cientifico: bool = False) -> "pd.Series":
+        import numpy as np
+        import pandas as pd
+
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+        nomes = np.array([self.nome_exibicao(valor, incluir_cientifico) for valor in unicos], dtype=object)
+        return pd.Series(nomes[codigos], index=serie.index)
+
+
+taxonomia = IndiceTaxonomico(NOMES_COMUNS_ESPECIES, SINONIMOS_ESPECIES)
+
+
 def obter_nome_exibicao(especie_raw: str, incluir_cientifico: bool = False) -> str:
-    # Casos especiais de erro
-    if especie_raw == "erro_ou_desconhecido":
-        return "Erro (Inventou Especie)"
-    if especie_raw == "erro_formatacao":
-        return "Erro (Formato Invalido)"
-
-    nome_comum = especie_raw
-    cientifico_formatado = especie_raw
-
-    for chave, valor in NOMES_COMUNS_ESPECIES.items():
-        if chave.replace(" ", "").lower() == especie_raw.replace(" ", "").lower():
-            nome_comum = valor
-            cientifico_formatado = chave
-            break
-
-    if incluir_cientifico and nome_comum != cientifico_formatado:
-        return f"{nome_comum} ({cientifico_formatado})"
-    
-    return nome_comum
+    return taxonomia.nome_exibicao(especie_raw, incluir_cientifico)
@@ -2,123 +2,206 @@ import json
 import warnings
 import numpy as np
 import pandas as pd
-from sklearn.metrics import classification_report, confusion_matrix, precision_recall_fscore_support, accuracy_score
-from data.nomes_especies import NOMES_COMUNS_ESPECIES
+from data.nomes_especies import taxonomia, SINONIMOS_AUSENCIA  # noqa: F401 (reexportado)
+from ai.parsing import analisar_resposta
+from config import PRIOR_CONCORDANCIA, CORRESPONDENCIA_APROXIMADA
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
-# Sinônimos de ausência → tudo que significa "sem animal"
-SINONIMOS_AUSENCIA = {
-    "null", "none", "absent", "vazio", "empty", "",
-    "nan", "background", "nenhum", "nenhuma", "n/a", "na",
-}
-
 # Espécies válidas (normalizadas: sem espaços, lowercase)
-ESPECIES_VALIDAS = {
-    chave.replace(" ", "").lower()
-    for chave in NOMES_COMUNS_ESPECIES.keys()
-}
+ESPECIES_VALIDAS = taxonomia.chaves_validas
 
 
 def normalizar_label(texto_bruto: str) -> str:
     # Recebe o nome vindo do dataset ou do modelo e padroniza para um formato rigoroso sem espaços nem maiúsculas.
     # Garante que comparações mínimas não resultem em erros (Ex: 'Sciurus spadiceus.' vira 'sciurusspadiceus').
-    if pd.isna(texto_bruto):
-        return "background"
+    # Sinônimos e grafias conhecidas viram a espécie da pasta (índice em data/nomes_especies.py, consulta a dicionário).
+    return taxonomia.normalizar(texto_bruto)
+
 
-    limpo = str(texto_bruto).lower().strip().rstrip(".,;:!?")
+def _como_quadro(dados_brutos) -> pd.DataFrame:
+    # As funções daqui aceitam um DataFrame de duelos ou um DatasetDuelos (data/dataset.py), que traz o quadro compacto
+    return getattr(dados_brutos, "quadro", dados_brutos)
 
-    if limpo in SINONIMOS_AUSENCIA:
-        return "background"
 
-    return limpo.replace(" ", "").replace("_", "")
+def normalizar_labels(serie: pd.Series) -> np.ndarray:
+    # normalizar_label vetorizado: uma normalização por valor distinto da coluna
+    return taxonomia.normalizar_serie(serie)
 
 
-def parsear_resposta(resposta_bruta: str) -> str:
-    # Tenta decodificar o JSON originário da predição do modelo e extrai a chave do animal.
+def parsear_resposta(resposta_bruta: str, aproximada: bool = CORRESPONDENCIA_APROXIMADA) -> str:
+    # Decodifica o JSON da predição pela mesma camada usada na UI (ai/parsing.py, memorizada) e extrai a chave do animal.
     # Em seguida, valida se o animal extraído faz parte do inventário oficial de espécies permitidas.
-    try:
-        dados = resposta_bruta if isinstance(resposta_bruta, dict) else json.loads(resposta_bruta)
-        predicao = dados.get("scientific_name") or dados.get("nome_cientifico") or "background"
-        label = normalizar_label(str(predicao))
-
-        if label in ESPECIES_VALIDAS:
-            return label
-        return "erro_ou_desconhecido"
-    except Exception:
+    # Com `aproximada`, nomes comuns, erros de grafia e respostas no nível de gênero também valem, e o
+    # nome_comum é tentado quando o científico não bate (ver IndiceTaxonomico.resolver).
+    return _label_dos_nomes(_nomes_previstos(resposta_bruta), aproximada)
+
+
+def _nomes_previstos(resposta_bruta: str) -> tuple | None:
+    # (nome científico, nome comum) da resposta, ou None se o JSON é inválido
+    registro = analisar_resposta(resposta_bruta)
+    if not registro.json_valido:
+        return None
+    predicao = registro.dados.get("scientific_name") or registro.dados.get("nome_cientifico") or "background"
+    return str(predicao), registro.dados.get("nome_comum")
+
+
+def _label_dos_nomes(nomes: tuple | None, aproximada: bool) -> str:
+    if nomes is None:
         return "erro_formatacao"
+    cientifico, comum = nomes
+    label = taxonomia.resolver(cientifico, aproximada)
+    if label is None and aproximada and comum:
+        label = taxonomia.resolver(str(comum), aproximada)
+    return label if label is not None else "erro_ou_desconhecido"
+
+
+def comparar_correspondencia(dados_brutos: pd.DataFrame) -> pd.DataFrame:
+    # Quantas respostas guardadas mudam de categoria entre a correspondência exata e a aproximada, por transição
+    # (ex.: erro_ou_desconhecido → pantheraonca). Cada resposta distinta é parseada uma vez; os dois modos
+    # rodam uma vez por par de nomes distinto (as respostas variam muito, os nomes previstos pouco).
+    if "model_response_a" not in dados_brutos.columns and hasattr(dados_brutos, "respostas"):
+        # DatasetDuelos: as respostas não ficam em memória, são buscadas agora
+        dados_brutos = dados_brutos.respostas()
+    colunas = [c for c in ("model_response_a", "model_response_b") if c in dados_brutos.columns]
+    if dados_brutos.empty or not colunas:
+        return pd.DataFrame(columns=["Antes", "Depois", "Respostas"])
+
+    respostas = pd.concat([dados_brutos[c] for c in colunas], ignore_index=True)
+    codigos, unicos = pd.factorize(respostas, use_na_sentinel=False)
+    ocorrencias = np.bincount(codigos, minlength=len(unicos))
+    categorias = {}
+    antes, depois = np.empty(len(unicos), dtype=object), np.empty(len(unicos), dtype=object)
+    for i, resposta in enumerate(unicos):
+        nomes = _nomes_previstos(resposta)
+        if nomes not in categorias:
+            categorias[nomes] = (_label_dos_nomes(nomes, False), _label_dos_nomes(nomes, True))
+        antes[i], depois[i] = categorias[nomes]
+
+    mudou = antes != depois
+    transicoes = pd.DataFrame({"Antes": antes[mudou], "Depois": depois[mudou], "Respostas": ocorrencias[mudou]})
+    return (
+        transicoes.groupby(["Antes", "Depois"], as_index=False)["Respostas"].sum()
+        .sort_values("Respostas", ascending=False)
+        .reset_index(drop=True)
+    )
+
 
 def preparar_dados_analise(dados_brutos: pd.DataFrame) -> pd.DataFrame:
     # Desestrutura a tabela pareada (duelos A contra B) para um formato longo e "achatado" (1 avaliação por linha).
     # Mantém intencionalmente predições repetidas do mesmo modelo para a mesma imagem, 
     # já que LLMs usando Temperatura > 0.0 podem iterar predições estocásticas em avaliações subsequentes.
+    dados_brutos = _como_quadro(dados_brutos)
     if dados_brutos.empty:
         return pd.DataFrame(columns=["modelo", "imagem", "verdade", "predicao"])
 
-    registros = []
-    for _, linha in dados_brutos.iterrows():
-        especie_verdadeira = normalizar_label(linha["species"])
-        imagem = linha.get("image_id") or linha.get("image_path") or ""
-
-        registros.append({
-            "modelo": linha["model_a"],
-            "imagem": imagem,
-            "verdade": especie_verdadeira,
-            "predicao": parsear_resposta(linha["model_response_a"])
-        })
-        registros.append({
-            "modelo": linha["model_b"],
-            "imagem": imagem,
-            "verdade": especie_verdadeira,
-            "predicao": parsear_resposta(linha["model_response_b"])
-        })
+    # Snapshots Parquet já trazem as predições parseadas (predicao_a/predicao_b); nesse caso não relemos as respostas
+    ja_parseado = "predicao_a" in dados_brutos.columns and "predicao_b" in dados_brutos.columns
+
+    verdade = normalizar_labels(dados_brutos["species"])
+    if ja_parseado:
+        predicao_a, predicao_b = dados_brutos["predicao_a"].to_numpy(dtype=object), dados_brutos["predicao_b"].to_numpy(dtype=object)
+    else:
+        predicao_a = mapear_unicos(dados_brutos["model_response_a"], parsear_resposta)
+        predicao_b = mapear_unicos(dados_brutos["model_response_b"], parsear_resposta)
+
+    # Imagem: image_id, ou image_path na falta dele
+    imagem = np.full(len(dados_brutos), "", dtype=object)
+    for coluna in ("image_path", "image_id"):
+        if coluna in dados_brutos.columns:
+            valores = dados_brutos[coluna].to_numpy(dtype=object)
+            imagem = np.where(pd.notna(valores) & (valores != ""), valores, imagem)
+
+    # Linhas A e B de cada duelo intercaladas, na ordem dos duelos
+    return pd.DataFrame({
+        "modelo": _intercalar(dados_brutos["model_a"].to_numpy(dtype=object), dados_brutos["model_b"].to_numpy(dtype=object)),
+        "imagem": np.repeat(imagem, 2),
+        "verdade": np.repeat(verdade, 2),
+        "predicao": _intercalar(predicao_a, predicao_b),
+    })
 
-    df = pd.DataFrame(registros)
 
-    return df
+def _intercalar(lado_a: np.ndarray, lado_b: np.ndarray) -> np.ndarray:
+    resultado = np.empty(2 * len(lado_a), dtype=object)
+    resultado[0::2] = lado_a
+    resultado[1::2] = lado_b
+    return resultado
 
 
 
-def calcular_metricas_globais(pool_normalizado: pd.DataFrame) -> pd.DataFrame:
-    # Calcula métricas globais: Macro F1-Score, Acurácia e Recall Médio usando scikit-learn.
-    # Esta função consolida os acertos de forma agrupada por modelo.
+def construir_contagens_confusao(pool_normalizado: pd.DataFrame):
+    # Motor único de contagens: monta o tensor (modelo × verdade × predição) numa só passada com np.bincount.
+    # Todas as métricas por modelo e por espécie (Macro F1, acurácia, recall, One-Vs-Rest e matrizes de confusão)
+    # são derivadas deste tensor, sem refiltrar o dataframe longo nem chamar o sklearn uma vez por modelo.
     if pool_normalizado.empty:
+        return np.zeros((0, 0, 0), dtype=np.int64), [], []
+
+    codigos_modelo, modelos = pd.factorize(pool_normalizado["modelo"])
+    classes = sorted(
+        set(pool_normalizado["verdade"].unique()) | set(pool_normalizado["predicao"].unique())
+    )
+
+    indice_classes = pd.Index(classes)
+    codigos_verdade = indice_classes.get_indexer(pool_normalizado["verdade"])
+    codigos_predicao = indice_classes.get_indexer(pool_normalizado["predicao"])
+
+    numero_modelos = len(modelos)
+    numero_classes = len(classes)
+    validos = codigos_modelo >= 0
+
+    # Índice linear de cada célula do tensor; bincount faz a contagem inteira de uma vez
+    posicoes = (codigos_modelo[validos] * numero_classes + codigos_verdade[validos]) * numero_classes + codigos_predicao[validos]
+    contagens = np.bincount(
+        posicoes, minlength=numero_modelos * numero_classes * numero_classes
+    ).reshape(numero_modelos, numero_classes, numero_classes)
+
+    return contagens, list(modelos), classes
+
+
+def _dividir_ou_zero(numerador, denominador):
+    # Divisão elemento a elemento com o mesmo comportamento do zero_division=0 do sklearn.
+    numerador = np.asarray(numerador, dtype=np.float64)
+    denominador = np.asarray(denominador, dtype=np.float64)
+    resultado = np.zeros(np.broadcast(numerador, denominador).shape, dtype=np.float64)
+    np.divide(numerador, denominador, out=resultado, where=denominador != 0)
+    return resultado
+
+
+def calcular_metricas_globais(pool_normalizado: pd.DataFrame, contagens=None) -> pd.DataFrame:
+    # Calcula métricas globais: Macro F1-Score, Acurácia e Recall Médio a partir do tensor de contagens.
+    # Reproduz exatamente o classification_report do scikit-learn, consolidando os acertos por modelo.
+    if contagens is None and pool_normalizado.empty:
+        return pd.DataFrame()
+
+    tensor, modelos, _ = contagens if contagens is not None else construir_contagens_confusao(pool_normalizado)
+    if not modelos:
         return pd.DataFrame()
 
     lista_ranking = []
 
-    # Itera de forma independente sobre o subset de predições de cada modelo
-    for nome_modelo in pool_normalizado["modelo"].unique():
-        subconjunto = pool_normalizado[pool_normalizado["modelo"] == nome_modelo]
-
-        # Mapeia dinamicamente apenas as espécies que este modelo realmente avaliou ou tentou prever.
-        # Isso impede que o sklearn derrube as notas do modelo usando espécies ausentes no subconjunto.
-        categorias_do_modelo = sorted(
-            set(subconjunto["verdade"].unique()) | set(subconjunto["predicao"].unique())
-        )
-
-        # classification_report gera as métricas detalhadas (F1, Precision, Recall) numa única tacada.
-        # labels=categorias_do_modelo restringe o escopo de penalizações às classes que ele de fato viu.
-        # zero_division=0 evita warnings do sklearn se a divisão precisar ser resolvida em casos de zero suporte.
-        relatorio = classification_report(
-            subconjunto["verdade"],
-            subconjunto["predicao"],
-            labels=categorias_do_modelo,
-            output_dict=True,
-            zero_division=0
-        )
-
-        # O classification_report traz o campo especial "accuracy" no diretório primário do dict.
-        # accuracy_score atua apenas como fallback seguro caso a chave do dict falhar.
-        acuracia = relatorio.get("accuracy", accuracy_score(subconjunto["verdade"], subconjunto["predicao"]))
+    for indice, nome_modelo in enumerate(modelos):
+        matriz = tensor[indice]
+
+        suporte_real = matriz.sum(axis=1)
+        suporte_predito = matriz.sum(axis=0)
+        acertos = np.diag(matriz)
+        amostras = int(matriz.sum())
+
+        # Considera apenas as espécies que este modelo realmente avaliou ou tentou prever.
+        # Isso impede que espécies ausentes no subconjunto derrubem as notas do modelo.
+        categorias_do_modelo = (suporte_real + suporte_predito) > 0
+
+        recall = _dividir_ou_zero(acertos, suporte_real)[categorias_do_modelo]
+        f1 = _dividir_ou_zero(2 * acertos, suporte_real + suporte_predito)[categorias_do_modelo]
+        acuracia = acertos.sum() / amostras if amostras else 0.0
 
         # Armazena e arredonda os dados processados para ranqueamento final
         lista_ranking.append({
             "Modelo":              nome_modelo,
-            "Macro F1-Score":      round(relatorio["macro avg"]["f1-score"], 3),
-            "Acurácia Global (%)": round(acuracia * 100, 1),
-            "Recall Médio":        round(relatorio["macro avg"]["recall"], 3),
-            "Amostras":            len(subconjunto)
+            "Macro F1-Score":      round(float(np.average(f1)), 3),
+            "Acurácia Global (%)": round(float(acuracia) * 100, 1),
+            "Recall Médio":        round(float(np.average(recall)), 3),
+            "Amostras":            amostras
         })
 
     # Converte para DataFrame e ordena decrescentemente pelo melhor F1-Score
@@ -131,65 +214,62 @@ def calcular_metricas_globais(pool_normalizado: pd.DataFrame) -> pd.DataFrame:
     return tabela
 
 
-def calcular_matriz_confusao(pool_normalizado: pd.DataFrame, modelo_alvo: str):
+def calcular_matriz_confusao(pool_normalizado: pd.DataFrame, modelo_alvo: str, contagens=None):
     # Entrega a Matriz de Confusão 2D avaliando exclusivamente as classes preditas e as classes reais para o modelo.
     # A união dos 2 sets garante que omissões ('background') ou alucinações ("predição" x ausente) entrem na matriz perfeitamente.
-    if pool_normalizado.empty:
+    if contagens is None and pool_normalizado.empty:
         return None, []
 
-    subconjunto = pool_normalizado[pool_normalizado["modelo"] == modelo_alvo]
-    if subconjunto.empty:
-        return None, []
-
-    # União das classes reais e preditas para não omitir categorias como erro_ou_desconhecido
-    todas_especies = sorted(
-        set(pool_normalizado["verdade"].unique()) | set(pool_normalizado["predicao"].unique())
-    )
+    tensor, modelos, todas_especies = contagens if contagens is not None else construir_contagens_confusao(pool_normalizado)
 
-    matriz = confusion_matrix(
-        subconjunto["verdade"],
-        subconjunto["predicao"],
-        labels=todas_especies
-    )
+    if modelo_alvo not in modelos:
+        return None, []
 
-    return matriz, todas_especies
+    return tensor[modelos.index(modelo_alvo)], todas_especies
 
 
-def calcular_metricas_binarias(pool_normalizado: pd.DataFrame, especie_alvo: str) -> pd.DataFrame:
+def calcular_metricas_binarias(pool_normalizado: pd.DataFrame, especie_alvo: str, contagens=None) -> pd.DataFrame:
     # Recalcula as estatísticas globais num formato taxonômico binário "One-Vs-Rest" focado estritamente num animal que o avaliador escolha.
     # Revelando assim o raio-x exato de precisão, positivos verdadeiros e falso positivos queletivos daquela classe alvo, contra as outras espécies.
-    if pool_normalizado.empty:
+    if contagens is None and pool_normalizado.empty:
         return pd.DataFrame()
 
-    especie_normalizada = normalizar_label(especie_alvo)
-    lista_resultados = []
+    tensor, modelos, classes = contagens if contagens is not None else construir_contagens_confusao(pool_normalizado)
+    if not modelos:
+        return pd.DataFrame()
 
-    for nome_modelo in pool_normalizado["modelo"].unique():
-        subconjunto = pool_normalizado[pool_normalizado["modelo"] == nome_modelo]
+    especie_normalizada = normalizar_label(especie_alvo)
+    total_por_modelo = tensor.sum(axis=(1, 2))
 
-        rotulo_verdadeiro = (subconjunto["verdade"] == especie_normalizada).astype(int)
-        rotulo_predito    = (subconjunto["predicao"] == especie_normalizada).astype(int)
+    # Fatias do tensor para a classe alvo: acertos, total real e total predito, todos vetorizados por modelo
+    if especie_normalizada in classes:
+        indice_especie = classes.index(especie_normalizada)
+        verdadeiros_positivos = tensor[:, indice_especie, indice_especie]
+        falsos_negativos = tensor[:, indice_especie, :].sum(axis=1) - verdadeiros_positivos
+        falsos_positivos = tensor[:, :, indice_especie].sum(axis=1) - verdadeiros_positivos
+    else:
+        verdadeiros_positivos = falsos_negativos = falsos_positivos = np.zeros(len(modelos), dtype=np.int64)
 
-        verdadeiros_negativos, falsos_positivos, falsos_negativos, verdadeiros_positivos = confusion_matrix(
-            rotulo_verdadeiro, rotulo_predito, labels=[0, 1]
-        ).ravel()
+    verdadeiros_negativos = total_por_modelo - verdadeiros_positivos - falsos_positivos - falsos_negativos
 
-        precisao, revocacao, pontuacao_f1, _ = precision_recall_fscore_support(
-            rotulo_verdadeiro, rotulo_predito, average="binary", zero_division=0
-        )
+    precisao = _dividir_ou_zero(verdadeiros_positivos, verdadeiros_positivos + falsos_positivos)
+    revocacao = _dividir_ou_zero(verdadeiros_positivos, verdadeiros_positivos + falsos_negativos)
+    pontuacao_f1 = _dividir_ou_zero(2 * verdadeiros_positivos, 2 * verdadeiros_positivos + falsos_positivos + falsos_negativos)
+    acuracia = _dividir_ou_zero(verdadeiros_positivos + verdadeiros_negativos, total_por_modelo)
 
-        acuracia = accuracy_score(rotulo_verdadeiro, rotulo_predito)
+    lista_resultados = []
 
+    for indice, nome_modelo in enumerate(modelos):
         lista_resultados.append({
             "Modelo":           nome_modelo,
-            "Acurácia (%)":     round(acuracia * 100, 1),
-            "F1-Score":         round(pontuacao_f1, 3),
-            "Recall":           round(revocacao, 3),
-            "Precision":        round(precisao, 3),
-            "Taxa de Erro (%)": round((1.0 - acuracia) * 100, 1),
-            "Verdadeiros Positivos": int(verdadeiros_positivos),
-            "Falsos Positivos": int(falsos_positivos),
-            "Falsos Negativos": int(falsos_negativos)
+            "Acurácia (%)":     round(float(acuracia[indice]) * 100, 1),
+            "F1-Score":         round(float(pontuacao_f1[indice]), 3),
+            "Recall":           round(float(revocacao[indice]), 3),
+            "Precision":        round(float(precisao[indice]), 3),
+            "Taxa de Erro (%)": round((1.0 - float(acuracia[indice])) * 100, 1),
+            "Verdadeiros Positivos": int(verdadeiros_positivos[indice]),
+            "Falsos Positivos": int(falsos_positivos[indice]),
+            "Falsos Negativos": int(falsos_negativos[indice])
         })
 
     return pd.DataFrame(lista_resultados).sort_values(
@@ -203,58 +283,76 @@ def calcular_metricas_binarias(pool_normalizado: pd.DataFrame, especie_alvo: str
 #    seguindo a metodologia Chatbot Arena (LMSYS).
 # ══════════════════════════════════════════════════════════════════════════════
 
-def calcular_bradley_terry(dados_brutos: pd.DataFrame) -> pd.DataFrame:
+# Pontos de cada resultado para o modelo A (empates técnicos valem meia vitória para cada lado)
+PONTOS_RESULTADO = {"A>B": 1.0, "A<B": 0.0, "A=B_GOOD": 0.5, "!A!B": 0.5}
+
+
+def _pontos_resultado(resultados: pd.Series) -> np.ndarray:
+    # Pontos do modelo A por duelo (NaN para resultado inválido); em object para a coluna categórica virar float
+    return resultados.astype(object).map(PONTOS_RESULTADO).to_numpy(dtype=np.float64)
+
+
+def construir_pontos_pares(dados_brutos: pd.DataFrame, pesos=None):
+    # Estatística suficiente do Bradley-Terry: pontos[i, j] = vitórias de i sobre j (meia vitória nos empates).
+    # A ordem dos duelos não importa para o BT, então o ajuste só precisa desta matriz (ver data/segmentos.py).
+    # `pesos` (um por duelo) escala cada voto, ex.: pela confiabilidade de quem votou.
+    dados_brutos = _como_quadro(dados_brutos)
+    lista_modelos = sorted(set(dados_brutos["model_a"].unique()) | set(dados_brutos["model_b"].unique()))
+    indice_modelo = pd.Index(lista_modelos)
+    pontos = np.zeros((len(lista_modelos), len(lista_modelos)), dtype=np.float64)
+
+    pontos_a = _pontos_resultado(dados_brutos["result_code"])
+    pesos = np.ones(len(dados_brutos)) if pesos is None else np.asarray(pesos, dtype=np.float64)
+    validos = ~np.isnan(pontos_a)
+    indices_a = indice_modelo.get_indexer(dados_brutos["model_a"])[validos]
+    indices_b = indice_modelo.get_indexer(dados_brutos["model_b"])[validos]
+    np.add.at(pontos, (indices_a, indices_b), pontos_a[validos] * pesos[validos])
+    np.add.at(pontos, (indices_b, indices_a), (1.0 - pontos_a[validos]) * pesos[validos])
+
+    return pontos, lista_modelos
+
+
+def calcular_bradley_terry(dados_brutos: pd.DataFrame, pesos_avaliadores: pd.Series = None) -> pd.DataFrame:
     # Modela as vitórias relativas entre 2 modelos assumindo o framework matemático de Bradley-Terry (utilizado no Xadrez ou em Ratings Glicko).
-    # Em vez de mle (manual iterativo propenso ao L-BFGS-B min/max throw), usamos um classificador Linear via Regressão Logística L2 no Sklearn,
-    # garantindo penalidade em pontuações imensas e convergência exata, transformando duelos em samples de Loss Funciona Binario (-1 e 1).
+    # As vitórias são agregadas por par de modelos antes do ajuste; o resultado é o mesmo de um ajuste duelo a duelo.
+    # Com `pesos_avaliadores` (email → peso, ver pesos_avaliadores) cada voto vale o peso de quem votou.
+    dados_brutos = _como_quadro(dados_brutos)
     if dados_brutos.empty:
         return pd.DataFrame()
 
-    from sklearn.linear_model import LogisticRegression
-
-    lista_modelos = sorted(set(dados_brutos["model_a"].unique()) | set(dados_brutos["model_b"].unique()))
-    numero_modelos = len(lista_modelos)
-    indice_modelo = {modelo: indice for indice, modelo in enumerate(lista_modelos)}
+    pesos = None
+    if pesos_avaliadores is not None:
+        pesos = _peso_de_cada_voto(dados_brutos, pesos_avaliadores)
 
-    X = []
-    y = []
-    pesos = []
+    pontos, lista_modelos = construir_pontos_pares(dados_brutos, pesos)
+    return bradley_terry_de_pares(pontos, lista_modelos)
 
-    for _, linha in dados_brutos.iterrows():
-        resultado = linha.get("result_code", "")
-        if not isinstance(resultado, str) or not resultado:
-            continue
 
-        indice_a = indice_modelo[linha["model_a"]]
-        indice_b = indice_modelo[linha["model_b"]]
-
-        x_vec = np.zeros(numero_modelos)
-        x_vec[indice_a] = 1.0
-        x_vec[indice_b] = -1.0
-
-        if resultado == "A>B":
-            X.append(x_vec)
-            y.append(1)
-            pesos.append(1.0)
-        elif resultado == "A<B":
-            X.append(x_vec)
-            y.append(0)
-            pesos.append(1.0)
-        elif resultado in ["A=B_GOOD", "!A!B"]:
-            # Empate técnico: meias vitórias
-            X.append(x_vec)
-            y.append(1)
-            pesos.append(0.5)
-            X.append(x_vec)
-            y.append(0)
-            pesos.append(0.5)
-
-    if not X:
+def bradley_terry_de_pares(pontos: np.ndarray, lista_modelos: list) -> pd.DataFrame:
+    # Em vez de mle (manual iterativo propenso ao L-BFGS-B min/max throw), usamos um classificador Linear via Regressão Logística L2 no Sklearn,
+    # garantindo penalidade em pontuações imensas e convergência exata. Cada par (i, j) com vitórias de i vira
+    # uma amostra "i venceu j", pesada pelos pontos acumulados: a mesma função de perda do ajuste duelo a duelo.
+    numero_modelos = len(lista_modelos)
+    if numero_modelos == 0:
         return pd.DataFrame()
 
-    X = np.array(X)
-    y = np.array(y)
-    pesos = np.array(pesos)
+    from sklearn.linear_model import LogisticRegression
+
+    vencedores, perdedores = np.nonzero(pontos * ~np.eye(numero_modelos, dtype=bool) > 0)
+    if len(vencedores) == 0:
+        return pd.DataFrame()
+    vitorias = pontos[vencedores, perdedores]
+
+    # Cada amostra entra também espelhada ("j perdeu para i": linha negada, classe trocada), com metade do peso.
+    # Sem intercepto a perda logística é simétrica, então o ajuste não muda; mas as duas classes sempre
+    # existem, mesmo quando só um lado venceu (um duelo, um gabarito, um recorte estreito ou pesos zerados).
+    amostras = len(vencedores)
+    X = np.zeros((amostras, numero_modelos))
+    X[np.arange(amostras), vencedores] = 1.0
+    X[np.arange(amostras), perdedores] = -1.0
+    X = np.vstack([X, -X])
+    y = np.concatenate([np.ones(amostras), np.zeros(amostras)])
+    pesos = np.concatenate([vitorias, vitorias]) / 2
 
     # Treina o modelo logístico; a regularização L2 (C=1.0) evita coeficientes 
     # infinitos (erros L-BFGS-B min/max) garantindo que o ranking sempre convirja
@@ -281,41 +379,416 @@ def calcular_bradley_terry(dados_brutos: pd.DataFrame) -> pd.DataFrame:
 def calcular_elo_rating(dados_brutos: pd.DataFrame, fator_k=32) -> pd.DataFrame:
     # Ratings Elo Dinâmicos — Cada modelo ganha e perde pontos com base na expectativa estatística do confronto (como em Campeonatos).
     # O valor padrão k=32 garante flutuação normal da taxa. Caso um competidor (IA inferior) abata um de alta qualificação, o payout é alto.
+    dados_brutos = _como_quadro(dados_brutos)
     if dados_brutos.empty:
         return pd.DataFrame()
 
     lista_modelos = sorted(set(dados_brutos["model_a"].unique()) | set(dados_brutos["model_b"].unique()))
     pontuacoes = {modelo: 1000.0 for modelo in lista_modelos}
 
-    for _, linha in dados_brutos.iterrows():
-        resultado = linha.get("result_code", "")
-
-        if resultado == "A>B":
-            resultado_real_a = 1.0
-        elif resultado == "A<B":
-            resultado_real_a = 0.0
-        elif resultado in ["A=B_GOOD", "!A!B"]:
-            resultado_real_a = 0.5
-        else:
+    # O Elo é sequencial, mas só precisa de três colunas: percorre os arrays em vez de montar uma Series por linha
+    pontos_a = _pontos_resultado(dados_brutos["result_code"]) if "result_code" in dados_brutos.columns else np.full(len(dados_brutos), np.nan)
+    for modelo_a, modelo_b, resultado_real_a in zip(
+        dados_brutos["model_a"].to_numpy(dtype=object), dados_brutos["model_b"].to_numpy(dtype=object), pontos_a.tolist()
+    ):
+        if resultado_real_a != resultado_real_a:
             # Ignora resultados nulos ou strings inválidas
             continue
+        atualizar_elo(pontuacoes, modelo_a, modelo_b, resultado_real_a, fator_k)
+
+    return tabela_elo(pontuacoes)
+
+
+def atualizar_elo(pontuacoes: dict, modelo_a: str, modelo_b: str, resultado_real_a: float, fator_k=32):
+    # Um passo do Elo. O Elo depende da ordem dos duelos, então o motor segmentado guarda o estado de cada fatia
+    # e aplica só os duelos novos, com este mesmo passo.
+    rating_modelo_a = pontuacoes.setdefault(modelo_a, 1000.0)
+    rating_modelo_b = pontuacoes.setdefault(modelo_b, 1000.0)
 
-        rating_modelo_a = pontuacoes[linha["model_a"]]
-        rating_modelo_b = pontuacoes[linha["model_b"]]
+    resultado_esperado_a = 1 / (1 + 10 ** ((rating_modelo_b - rating_modelo_a) / 400))
 
-        resultado_esperado_a = 1 / (1 + 10 ** ((rating_modelo_b - rating_modelo_a) / 400))
+    pontuacoes[modelo_a] += fator_k * (resultado_real_a - resultado_esperado_a)
+    pontuacoes[modelo_b] += fator_k * ((1 - resultado_real_a) - (1 - resultado_esperado_a))
 
-        pontuacoes[linha["model_a"]] += fator_k * (resultado_real_a - resultado_esperado_a)
-        pontuacoes[linha["model_b"]] += fator_k * ((1 - resultado_real_a) - (1 - resultado_esperado_a))
+
+def tabela_elo(pontuacoes: dict) -> pd.DataFrame:
+    # Converte o dicionário de ratings na tabela exibida no painel (ordenada, índice começando em 1)
+    if not pontuacoes:
+        return pd.DataFrame()
 
     lista_elo = [
         {"Modelo": modelo, "Elo Rating": int(round(pontuacoes[modelo]))}
-        for modelo in lista_modelos
+        for modelo in sorted(pontuacoes)
     ]
 
-    tabela_elo = pd.DataFrame(lista_elo).sort_values(
+    tabela = pd.DataFrame(lista_elo).sort_values(
         "Elo Rating", ascending=False
     ).reset_index(drop=True)
-    tabela_elo.index += 1
+    tabela.index += 1
+
+    return tabela
+
+
+def calcular_confiabilidade(dados_brutos: pd.DataFrame, falhas: pd.DataFrame) -> pd.DataFrame:
+    # Confiabilidade por modelo — respostas aproveitadas em duelos avaliados contra tentativas que falharam
+    # (erro, prazo excedido ou JSON inválido) e foram substituídas na arena. Um modelo que só aparece no
+    # Elo quando responde bem pode ser pouco confiável; esta tabela mostra o que ficou de fora.
+    dados_brutos = _como_quadro(dados_brutos)
+    if dados_brutos.empty and (falhas is None or falhas.empty):
+        return pd.DataFrame()
+
+    if dados_brutos.empty:
+        respostas = pd.Series(dtype=int)
+    else:
+        respostas = pd.concat([dados_brutos["model_a"].astype(object), dados_brutos["model_b"].astype(object)]).value_counts()
+
+    if falhas is None or falhas.empty:
+        falhas = pd.DataFrame({"model": pd.Series(dtype=str), "time_s": pd.Series(dtype=float), "reason": pd.Series(dtype=str)})
+
+    por_motivo = pd.crosstab(falhas["model"], falhas["reason"])
+    tabela = pd.DataFrame({
+        "Respostas Válidas": respostas,
+        "Falhas": falhas.groupby("model").size(),
+        "Latência Média das Falhas (s)": falhas.groupby("model")["time_s"].mean().round(2),
+    })
+    tabela[["Respostas Válidas", "Falhas"]] = tabela[["Respostas Válidas", "Falhas"]].fillna(0).astype(int)
+    for motivo, coluna in [("prazo", "Prazo Excedido"), ("erro", "Erro da API"), ("json_invalido", "JSON Inválido")]:
+        tabela[coluna] = por_motivo[motivo].reindex(tabela.index).fillna(0).astype(int) if motivo in por_motivo else 0
+
+    tabela["Confiabilidade (%)"] = (tabela["Respostas Válidas"] / (tabela["Respostas Válidas"] + tabela["Falhas"]) * 100).round(1)
+
+    tabela_confiabilidade = tabela.rename_axis("Modelo").reset_index()[[
+        "Modelo", "Confiabilidade (%)", "Respostas Válidas", "Falhas",
+        "Prazo Excedido", "Erro da API", "JSON Inválido", "Latência Média das Falhas (s)"
+    ]].sort_values(["Confiabilidade (%)", "Respostas Válidas"], ascending=False).reset_index(drop=True)
+    tabela_confiabilidade.index += 1
+
+    return tabela_confiabilidade
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#    CONCORDÂNCIA DOS AVALIADORES
+#    A espécie real de cada imagem é conhecida (pasta do Drive). Num duelo "decisivo"
+#    (só um dos modelos acertou a espécie), o voto esperado é no modelo que acertou;
+#    a concordância de um avaliador é a fração dos seus duelos decisivos em que votou assim.
+#    Empates (A=B_GOOD, !A!B) não entram: não apontam modelo nenhum, e contá-los como
+#    discordância puniria quem só não quis escolher entre duas descrições parecidas.
+# ══════════════════════════════════════════════════════════════════════════════
+
+def mapear_unicos(serie: pd.Series, funcao) -> np.ndarray:
+    # Aplica `funcao` uma vez por valor distinto (respostas e espécies se repetem muito) e espalha com os códigos
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    return np.array([funcao(valor) for valor in unicos], dtype=object)[codigos]
+
+
+def marcar_acertos(dados_brutos: pd.DataFrame) -> pd.DataFrame:
+    # Colunas booleanas acerto_a / acerto_b: o modelo daquele lado nomeou a espécie real da imagem.
+    # Snapshots Parquet já trazem predicao_a/predicao_b; senão as respostas são parseadas (uma vez por resposta distinta).
+    dados_brutos = _como_quadro(dados_brutos)
+    verdade = normalizar_labels(dados_brutos["species"])
+    if "predicao_a" in dados_brutos.columns and "predicao_b" in dados_brutos.columns:
+        predicao_a, predicao_b = dados_brutos["predicao_a"].to_numpy(dtype=object), dados_brutos["predicao_b"].to_numpy(dtype=object)
+    else:
+        predicao_a = mapear_unicos(dados_brutos["model_response_a"], parsear_resposta)
+        predicao_b = mapear_unicos(dados_brutos["model_response_b"], parsear_resposta)
+
+    return pd.DataFrame({"acerto_a": predicao_a == verdade, "acerto_b": predicao_b == verdade}, index=dados_brutos.index)
+
+
+def veredito_gabarito(especie: str, resposta_a: str, resposta_b: str) -> str | None:
+    # Resultado objetivo de um duelo: "A>B" ou "A<B" quando só um lado nomeou a espécie real; None quando o
+    # gabarito não decide (ambos certos, ambos errados, ou espécie fora do inventário) e o voto humano é necessário.
+    verdade = normalizar_label(especie)
+    acerto_a = parsear_resposta(resposta_a) == verdade
+    acerto_b = parsear_resposta(resposta_b) == verdade
+    if acerto_a == acerto_b:
+        return None
+    return "A>B" if acerto_a else "A<B"
+
+
+def calcular_concordancia_avaliadores(dados_brutos: pd.DataFrame) -> pd.DataFrame:
+    # Uma linha por avaliador: duelos, duelos decisivos, concordância com a espécie real, confiabilidade suavizada e o peso
+    # usado no Bradley-Terry ponderado. Tudo por operações de coluna e um groupby (sem laço por duelo).
+    dados_brutos = _como_quadro(dados_brutos)
+    if dados_brutos.empty or "evaluator_email" not in dados_brutos.columns:
+        return pd.DataFrame()
+
+    acertos = marcar_acertos(dados_brutos)
+    resultado = dados_brutos["result_code"].to_numpy(dtype=object)
+    escolheu_lado = np.isin(resultado, ["A>B", "A<B"])
+    decisivo = (acertos["acerto_a"].to_numpy() != acertos["acerto_b"].to_numpy()) & escolheu_lado
+    votou_no_certo = np.where(acertos["acerto_a"].to_numpy(), resultado == "A>B", resultado == "A<B")
+
+    por_duelo = pd.DataFrame({
+        "email": dados_brutos["evaluator_email"].astype(str).str.lower().str.strip().to_numpy(),
+        "decisivo": decisivo,
+        "concorda": decisivo & votou_no_certo,
+    })
+    tabela = por_duelo.groupby("email").agg(
+        duelos=("decisivo", "size"), decisivos=("decisivo", "sum"), concordancias=("concorda", "sum")
+    )
+
+    prior_concorda, prior_discorda = PRIOR_CONCORDANCIA
+    tabela["Concordância (%)"] = (_dividir_ou_zero(tabela["concordancias"], tabela["decisivos"]) * 100).round(1)
+    confiabilidade = (tabela["concordancias"] + prior_concorda) / (tabela["decisivos"] + prior_concorda + prior_discorda)
+    tabela["Confiabilidade"] = confiabilidade.round(3)
+    # Votar ao acaso (50%) ou contra a espécie real não informa nada: peso 0. Concordância plena: peso 1.
+    tabela["Peso"] = ((confiabilidade - 0.5) / 0.5).clip(0, 1).round(3)
+
+    tabela = tabela.rename(columns={"duelos": "Duelos", "decisivos": "Duelos Decisivos", "concordancias": "Votos no Modelo Certo"})
+    tabela = tabela.rename_axis("Avaliador").reset_index()
+    tabela = tabela.sort_values(["Duelos Decisivos", "Confiabilidade"], ascending=False).reset_index(drop=True)
+    tabela.index += 1
+    return tabela
+
+
+def juntar_perfis_avaliadores(concordancia: pd.DataFrame, perfis: pd.DataFrame) -> pd.DataFrame:
+    # Junta user_profiles pelo email (um merge) para comparar concordância com a experiência declarada
+    if concordancia.empty or perfis is None or perfis.empty:
+        return concordancia
+    perfis = perfis.assign(email=perfis["email"].astype(str).str.lower().str.strip()).drop_duplicates("email")
+    tabela = concordancia.merge(perfis, how="left", left_on="Avaliador", right_on="email").drop(columns="email")
+    tabela.index += 1
+    return tabela
+
+
+def pesos_avaliadores(concordancia: pd.DataFrame) -> pd.Series:
+    # email → peso, a partir da tabela de calcular_concordancia_avaliadores
+    if concordancia.empty:
+        return pd.Series(dtype=np.float64)
+    return concordancia.set_index("Avaliador")["Peso"]
+
+
+def _peso_de_cada_voto(dados_brutos: pd.DataFrame, pesos: pd.Series) -> np.ndarray:
+    # Avaliador sem duelos decisivos (ou fora da tabela) recebe o peso do prior
+    prior_concorda, prior_discorda = PRIOR_CONCORDANCIA
+    peso_prior = min(max((prior_concorda / (prior_concorda + prior_discorda) - 0.5) / 0.5, 0.0), 1.0)
+    if "evaluator_email" not in dados_brutos.columns:
+        return np.full(len(dados_brutos), peso_prior)
+    emails = dados_brutos["evaluator_email"].astype(str).str.lower().str.strip()
+    return emails.map(pesos).fillna(peso_prior).to_numpy(dtype=np.float64)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#    IMAGEM ÚNICA × SEQUÊNCIA
+#    Duelos em sequência mandam a rajada inteira (anexos ou mosaico) para cada modelo.
+#    A comparação é por resposta: acurácia, tempo e bytes de imagem por chamada, para
+#    medir se o contexto extra compensa o custo.
+# ══════════════════════════════════════════════════════════════════════════════
+
+ROTULOS_MODO = {"imagem_unica": "Imagem única", "multi_imagem": "Sequência (anexos)", "mosaico": "Sequência (mosaico)"}
+
+
+def _numero_quadros(frame_ids) -> int:
+    # frame_ids é a lista JSON dos quadros; nulo nos duelos de imagem única
+    return len(json.loads(frame_ids)) if isinstance(frame_ids, str) and frame_ids else 1
+
+
+def comparar_sequencias(dados_brutos: pd.DataFrame) -> pd.DataFrame:
+    # Uma linha por (modelo, modo): respostas, quadros, acurácia contra a espécie da pasta, tempo médio e
+    # bytes de imagem por chamada. "Acertos por MB" usa os bytes enviados como aproximação do custo em tokens.
+    dados_brutos = _como_quadro(dados_brutos)
+    if dados_brutos.empty:
+        return pd.DataFrame()
+
+    n = len(dados_brutos)
+    modo = (dados_brutos["sequence_mode"].astype(object).where(dados_brutos["sequence_mode"].notna(), "imagem_unica").to_numpy(dtype=object)
+            if "sequence_mode" in dados_brutos.columns else np.full(n, "imagem_unica", dtype=object))
+    quadros = mapear_unicos(dados_brutos["frame_ids"], _numero_quadros) if "frame_ids" in dados_brutos.columns else np.ones(n, dtype=object)
+    enviados = (pd.to_numeric(dados_brutos["payload_bytes"], errors="coerce").to_numpy(dtype=np.float64)
+                if "payload_bytes" in dados_brutos.columns else np.full(n, np.nan))
+    acertos = marcar_acertos(dados_brutos)
+
+    por_resposta = pd.DataFrame({
+        "modelo": _intercalar(dados_brutos["model_a"].to_numpy(dtype=object), dados_brutos["model_b"].to_numpy(dtype=object)),
+        "modo": np.repeat(modo, 2),
+        "quadros": np.repeat(quadros.astype(np.float64), 2),
+        "acerto": _intercalar(acertos["acerto_a"].to_numpy(), acertos["acerto_b"].to_numpy()).astype(np.float64),
+        "tempo": _intercalar(pd.to_numeric(dados_brutos["time_a"], errors="coerce").to_numpy(dtype=object),
+                             pd.to_numeric(dados_brutos["time_b"], errors="coerce").to_numpy(dtype=object)).astype(np.float64),
+        "bytes": np.repeat(enviados, 2),
+    })
+    tabela = por_resposta.groupby(["modelo", "modo"]).agg(
+        respostas=("acerto", "size"), quadros=("quadros", "mean"), acertos=("acerto", "sum"),
+        tempo=("tempo", "mean"), bytes=("bytes", "mean"), bytes_total=("bytes", "sum")
+    ).reset_index()
+
+    tabela = pd.DataFrame({
+        "Modelo": tabela["modelo"],
+        "Modo": tabela["modo"].map(ROTULOS_MODO).fillna(tabela["modo"]),
+        "Respostas": tabela["respostas"],
+        "Quadros": tabela["quadros"].round(1),
+        "Acurácia (%)": (tabela["acertos"] / tabela["respostas"] * 100).round(1),
+        "Tempo Médio (s)": tabela["tempo"].round(2),
+        "Imagem por Chamada (KB)": (tabela["bytes"] / 1024).round(0),
+        # Sem bytes registrados (duelos de imagem única) a razão fica vazia, não infinita
+        "Acertos por MB": (tabela["acertos"] / (tabela["bytes_total"] / 1e6).where(tabela["bytes_total"] > 0)).round(2),
+    })
+    return tabela.sort_values(["Modelo", "Modo"]).reset_index(drop=True)
+
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#    COMPARAÇÃO PAREADA DE PROMPTS
+#    A varredura (ai/varredura.py) roda cada variante de prompt em cada modelo e
+#    imagem, então os prompts se comparam na mesma (modelo, imagem): contagens
+#    discordantes com teste de McNemar e um Bradley-Terry em que os prompts duelam.
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _acertos_varredura(respostas: pd.DataFrame) -> np.ndarray:
+    # Uma resposta por linha (colunas model_response ou predicao, e species)
+    verdade = normalizar_labels(respostas["species"])
+    if "predicao" in respostas.columns:
+        predicao = respostas["predicao"].to_numpy(dtype=object)
+    else:
+        predicao = mapear_unicos(respostas["model_response"], parsear_resposta)
+    return predicao == verdade
+
+
+def _pares_prompts(respostas: pd.DataFrame):
+    # Tabela (modelo, imagem) × prompt de acertos e a ordem dos prompts (a da varredura).
+    # Chamadas que falharam no provedor ficam fora: não dizem nada sobre o prompt.
+    validas = respostas[respostas["sucesso"].astype(bool)] if "sucesso" in respostas.columns else respostas
+    prompts = list(pd.unique(respostas["prompt"]))
+    acertos = pd.DataFrame({
+        "modelo": validas["modelo"].to_numpy(dtype=object),
+        "image_id": validas["image_id"].to_numpy(dtype=object),
+        "prompt": validas["prompt"].to_numpy(dtype=object),
+        "acerto": _acertos_varredura(validas).astype(np.float64),
+    })
+    tabela = acertos.pivot_table(index=["modelo", "image_id"], columns="prompt", values="acerto", aggfunc="first")
+    return tabela.reindex(columns=prompts), prompts
+
+
+def duelos_entre_prompts(respostas: pd.DataFrame) -> pd.DataFrame:
+    # Cada (modelo, imagem) vira um duelo entre cada par de prompts, no formato de `evaluations`
+    # (model_a/model_b são os prompts): só um acerta → A>B / A<B; os dois → A=B_GOOD; nenhum → !A!B.
+    tabela, prompts = _pares_prompts(respostas)
+    quadros = []
+    for i, prompt_a in enumerate(prompts):
+        for prompt_b in prompts[i + 1:]:
+            par = tabela[[prompt_a, prompt_b]].dropna()
+            acerto_a, acerto_b = par[prompt_a].to_numpy() > 0, par[prompt_b].to_numpy() > 0
+            quadros.append(pd.DataFrame({
+                "model_a": prompt_a,
+                "model_b": prompt_b,
+                "result_code": np.select(
+                    [acerto_a & ~acerto_b, ~acerto_a & acerto_b, acerto_a & acerto_b], ["A>B", "A<B", "A=B_GOOD"], "!A!B"
+                ),
+                "modelo": par.index.get_level_values("modelo"),
+                "image_id": par.index.get_level_values("image_id"),
+            }))
+    return pd.concat(quadros, ignore_index=True) if quadros else pd.DataFrame()
+
+
+def _p_mcnemar(so_a: int, so_b: int) -> float:
+    # McNemar exato: nos pares discordantes, cada prompt venceria metade se fossem equivalentes
+    if so_a + so_b == 0:
+        return 1.0
+    from scipy.stats import binomtest
+
+    return float(binomtest(int(so_a), int(so_a + so_b), 0.5).pvalue)
+
+
+def comparar_prompts(respostas: pd.DataFrame) -> dict:
+    """Relatório da varredura de prompts, a partir das respostas (uma linha por prompt × modelo × imagem).
+
+    Colunas: prompt, modelo, image_id, species, model_response (ou predicao), e opcionais sucesso e tempo.
+    Devolve "por_prompt" (acurácia de cada prompt por modelo e no total), "pareada" (contagens nas mesmas
+    imagens e p-valor de McNemar, por par de prompts) e "bradley_terry" (prompts ordenados pelos duelos pareados).
+    """
+    if respostas.empty:
+        return {"por_prompt": pd.DataFrame(), "pareada": pd.DataFrame(), "bradley_terry": pd.DataFrame()}
+
+    sucesso = respostas["sucesso"].astype(bool).to_numpy() if "sucesso" in respostas.columns else np.ones(len(respostas), dtype=bool)
+    por_resposta = pd.DataFrame({
+        "prompt": respostas["prompt"].to_numpy(dtype=object),
+        "modelo": respostas["modelo"].to_numpy(dtype=object),
+        "sucesso": sucesso,
+        "acerto": np.where(sucesso, _acertos_varredura(respostas), False),
+        "tempo": (pd.to_numeric(respostas["tempo"], errors="coerce").to_numpy(dtype=np.float64)
+                  if "tempo" in respostas.columns else np.full(len(respostas), np.nan)),
+    })
+    por_resposta["tempo"] = por_resposta["tempo"].where(por_resposta["sucesso"])
+    prompts = list(pd.unique(por_resposta["prompt"]))
+
+    agregados = []
+    for agrupamento, rotulo in ((["prompt", "modelo"], None), (["prompt"], "Todos")):
+        tabela = por_resposta.groupby(agrupamento, sort=False).agg(
+            chamadas=("sucesso", "size"), respostas=("sucesso", "sum"), acertos=("acerto", "sum"), tempo=("tempo", "mean")
+        ).reset_index()
+        tabela["total"] = rotulo is not None
+        if rotulo:
+            tabela["modelo"] = rotulo
+        agregados.append(tabela)
+    # Prompts na ordem da varredura; em cada um, os modelos e depois o total
+    tabela = pd.concat(agregados, ignore_index=True)
+    tabela["ordem"] = tabela["prompt"].map({p: i for i, p in enumerate(prompts)})
+    tabela = tabela.sort_values(["ordem", "total", "modelo"], kind="stable").reset_index(drop=True)
+    por_prompt = pd.DataFrame({
+        "Prompt": tabela["prompt"],
+        "Modelo": tabela["modelo"],
+        "Respostas": tabela["respostas"],
+        "Falhas": tabela["chamadas"] - tabela["respostas"],
+        "Acurácia (%)": (tabela["acertos"] / tabela["respostas"].where(tabela["respostas"] > 0) * 100).round(1),
+        "Tempo Médio (s)": tabela["tempo"].round(2),
+    })
+
+    duelos = duelos_entre_prompts(respostas)
+    linhas = []
+    if not duelos.empty:
+        for (prompt_a, prompt_b), grupo in duelos.groupby(["model_a", "model_b"], sort=False):
+            for modelo, subgrupo in [*grupo.groupby("modelo", sort=True), ("Todos", grupo)]:
+                contagem = subgrupo["result_code"].value_counts()
+                so_a, so_b = int(contagem.get("A>B", 0)), int(contagem.get("A<B", 0))
+                linhas.append({
+                    "Prompt A": prompt_a,
+                    "Prompt B": prompt_b,
+                    "Modelo": modelo,
+                    "Pares": len(subgrupo),
+                    "Ambos Acertam": int(contagem.get("A=B_GOOD", 0)),
+                    "Só A Acerta": so_a,
+                    "Só B Acerta": so_b,
+                    "Nenhum Acerta": int(contagem.get("!A!B", 0)),
+                    # Diferença de acurácia nas mesmas imagens (A − B), em pontos percentuais
+                    "Δ Acurácia (pp)": round((so_a - so_b) / len(subgrupo) * 100, 1),
+                    "p (McNemar)": round(_p_mcnemar(so_a, so_b), 4),
+                })
+
+    bradley_terry = calcular_bradley_terry(duelos) if not duelos.empty else pd.DataFrame()
+    if not bradley_terry.empty:
+        bradley_terry = bradley_terry.rename(columns={"Modelo": "Prompt"})
+
+    return {"por_prompt": por_prompt, "pareada": pd.DataFrame(linhas), "bradley_terry": bradley_terry}
+
+def calcular_rankings_snapshot(diretorio: str, versao_prompt: str = None, desde=None, ate=None) -> dict:
+    # Calcula todos os leaderboards a partir de um snapshot Parquet (ver data/snapshot.py), sem tocar no banco.
+    # Só as colunas leves são lidas (memory-map); os blobs de resposta ficam no dataset separado e não são carregados.
+    from data.snapshot import carregar_snapshot
+
+    dados_brutos = carregar_snapshot(
+        diretorio,
+        colunas=["id", "evaluator_email", "model_a", "model_b", "result_code", "species", "image_id", "image_path", "predicao_a", "predicao_b"],
+        versao=versao_prompt,
+        desde=desde,
+        ate=ate
+    )
+
+    # A leitura particionada não preserva a ordem de inserção, e o Elo depende da ordem cronológica dos duelos
+    if not dados_brutos.empty:
+        dados_brutos = dados_brutos.sort_values("id", kind="stable").reset_index(drop=True)
+
+    pool_normalizado = preparar_dados_analise(dados_brutos)
+    contagens = construir_contagens_confusao(pool_normalizado)
+
+    concordancia = calcular_concordancia_avaliadores(dados_brutos)
 
-    return tabela_elo
\ No newline at end of file
+    return {
+        "elo": calcular_elo_rating(dados_brutos),
+        "bradley_terry": calcular_bradley_terry(dados_brutos),
+        "bradley_terry_ponderado": calcular_bradley_terry(dados_brutos, pesos_avaliadores(concordancia)),
+        "concordancia_avaliadores": concordancia,
+        "metricas_globais": calcular_metricas_globais(pool_normalizado, contagens),
+        "pool_normalizado": pool_normalizado,
+        "contagens": contagens,
+    }
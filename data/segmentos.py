@@ -0,0 +1,323 @@
+import time
+import threading
+from datetime import date
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from config import INTERVALO_SINCRONIA_SEGMENTOS_S
+from data.ranking import (
+    PONTOS_RESULTADO,
+    normalizar_label,
+    parsear_resposta,
+    atualizar_elo,
+    tabela_elo,
+    bradley_terry_de_pares,
+)
+from utils.tracing import span
+
+# Rankings por segmento (perfil do avaliador, espécie, janela de tempo e prompt) sem recalcular do zero.
+#
+# Cada duelo cai numa célula (dia, prompt, espécie, perfil) e atualiza, na inserção, as estatísticas
+# suficientes dessa célula:
+#   pares     → pontos de i contra j (Bradley-Terry só depende deles)
+#   confusao  → contagens (modelo, predição); a verdade é a espécie da célula
+#   duelos    → log compacto (célula, a, b, resultado) em ordem de id, para o Elo
+# Uma fatia é uma máscara sobre as células; somar as estatísticas das células marcadas é um bincount.
+# O Elo depende da ordem, então cada fatia guarda o seu estado e só aplica os duelos chegados depois.
+#
+# O motor é por processo e se alimenta do banco por id (WHERE id > ultimo_id), então cada réplica
+# enxerga também os duelos gravados pelas outras. Os duelos julgados pelo gabarito (auto_evaluations, com
+# cursor próprio) entram só na confusão, sem avaliador (BIT_SEM_PERFIL): Elo e Bradley-Terry são dos votos humanos.
+
+# Perfis de avaliador: um bit por coluna de experiência em user_profiles
+PERFIS_AVALIADOR = {
+    "works_environmental_area": "Trabalha/estuda na área ambiental",
+    "has_forest_management_exp": "Experiência com manejo florestal",
+    "has_animal_monitoring_exp": "Experiência com monitoramento de animais",
+    "has_camera_trap_exp": "Experiência com armadilhas fotográficas",
+}
+BITS_PERFIL = {coluna: 1 << i for i, coluna in enumerate(PERFIS_AVALIADOR)}
+# Avaliador sem linha em user_profiles (não entra em nenhum segmento de experiência)
+BIT_SEM_PERFIL = 1 << len(PERFIS_AVALIADOR)
+# Segmento de quem não marcou nenhuma experiência
+SEM_EXPERIENCIA = "sem_experiencia"
+
+TAMANHO_LOTE = 20000
+
+
+class Fatia(NamedTuple):
+    """Filtros de um ranking segmentado; None em um campo = sem filtro nele."""
+    prompt: str | None = None        # versão do prompt (data/snapshot.versao_prompt)
+    especie: str | None = None       # espécie verdadeira da imagem (label normalizado)
+    perfil: str | None = None        # coluna de PERFIS_AVALIADOR ou SEM_EXPERIENCIA
+    janela_dias: int | None = None   # últimos N dias, contando hoje
+
+
+class _Colunas:
+    """Colunas numpy com crescimento amortizado (a capacidade dobra quando enche)."""
+
+    def __init__(self, **tipos):
+        self.n = 0
+        self._dados = {nome: np.zeros(256, dtype=tipo) for nome, tipo in tipos.items()}
+
+    def adicionar(self, **valores) -> int:
+        if self.n == len(next(iter(self._dados.values()))):
+            self._dados = {nome: np.concatenate([coluna, np.zeros_like(coluna)]) for nome, coluna in self._dados.items()}
+        for nome, valor in valores.items():
+            self._dados[nome][self.n] = valor
+        self.n += 1
+        return self.n - 1
+
+    def somar(self, nome, linha, valor):
+        self._dados[nome][linha] += valor
+
+    def __getitem__(self, nome) -> np.ndarray:
+        return self._dados[nome][:self.n]
+
+
+class _Vocabulario:
+    """Nome ↔ código inteiro, estável enquanto o processo vive."""
+
+    def __init__(self):
+        self.nomes = []
+        self._codigos = {}
+
+    def codigo(self, nome) -> int:
+        if nome not in self._codigos:
+            self._codigos[nome] = len(self.nomes)
+            self.nomes.append(nome)
+        return self._codigos[nome]
+
+    def buscar(self, nome) -> int:
+        return self._codigos.get(nome, -1)
+
+    def __len__(self):
+        return len(self.nomes)
+
+
+def _marcado(valor) -> bool:
+    # Flags chegam como bool, 0/1 ou texto, conforme o banco
+    if isinstance(valor, str):
+        return valor.strip().lower() in {"true", "t", "1", "sim", "yes"}
+    return bool(valor) and not pd.isna(valor)
+
+
+def perfil_da_linha(linha: dict) -> int:
+    """Bits de experiência do avaliador (BIT_SEM_PERFIL se ele não tem cadastro)."""
+    valores = [linha.get(coluna) for coluna in PERFIS_AVALIADOR]
+    if all(v is None or (not isinstance(v, str) and pd.isna(v)) for v in valores):
+        return BIT_SEM_PERFIL
+    return sum(bit for coluna, bit in BITS_PERFIL.items() if _marcado(linha.get(coluna)))
+
+
+def _dia(criado_em) -> int:
+    momento = pd.Timestamp(criado_em) if criado_em is not None else pd.NaT
+    return (date.today() if pd.isna(momento) else momento.date()).toordinal()
+
+
+class RankingSegmentado:
+    """Estatísticas suficientes por célula e consultas de Elo, Bradley-Terry e contagens de confusão por fatia."""
+
+    def __init__(self):
+        self._trava = threading.RLock()
+        self.ultimo_id = 0
+        self.ultimo_id_automaticos = 0
+        self._ultima_sincronia = None
+
+        self.modelos = _Vocabulario()
+        self.classes = _Vocabulario()
+        self.prompts = _Vocabulario()
+
+        self._indice_celulas = {}
+        self.celulas = _Colunas(dia=np.int32, prompt=np.int32, especie=np.int32, perfil=np.int32)
+        self._indice_pares = {}
+        self.pares = _Colunas(celula=np.int32, i=np.int32, j=np.int32, pontos_i=np.float64, pontos_j=np.float64)
+        self._indice_confusao = {}
+        self.confusao = _Colunas(celula=np.int32, modelo=np.int32, predicao=np.int32, n=np.int64)
+        self.duelos = _Colunas(celula=np.int32, a=np.int32, b=np.int32, pontos_a=np.float64)
+
+        # Estado do Elo por fatia: {fatia: (primeiro dia da janela, posição no log, pontuações)}
+        self._elo = {}
+
+    # --- Inserção ---
+    def _celula(self, dia, prompt, especie, perfil) -> int:
+        chave = (dia, prompt, especie, perfil)
+        if chave not in self._indice_celulas:
+            self._indice_celulas[chave] = self.celulas.adicionar(dia=dia, prompt=prompt, especie=especie, perfil=perfil)
+        return self._indice_celulas[chave]
+
+    def _somar_par(self, celula, a, b, pontos_a):
+        # Pares guardados com i < j: (a, b) e (b, a) são o mesmo confronto
+        i, j, pontos_i = (a, b, pontos_a) if a < b else (b, a, 1.0 - pontos_a)
+        linha = self._indice_pares.get((celula, i, j))
+        if linha is None:
+            linha = self._indice_pares[(celula, i, j)] = self.pares.adicionar(celula=celula, i=i, j=j)
+        self.pares.somar("pontos_i", linha, pontos_i)
+        self.pares.somar("pontos_j", linha, 1.0 - pontos_i)
+
+    def _somar_confusao(self, celula, modelo, predicao):
+        linha = self._indice_confusao.get((celula, modelo, predicao))
+        if linha is None:
+            linha = self._indice_confusao[(celula, modelo, predicao)] = self.confusao.adicionar(celula=celula, modelo=modelo, predicao=predicao)
+        self.confusao.somar("n", linha, 1)
+
+    def registrar(self, linha: dict, automatico: bool = False):
+        """Incorpora um duelo (linha de evaluations + flags do perfil). Predições podem vir prontas em predicao_a/_b.
+
+        `automatico`: linha de auto_evaluations, que só soma na confusão.
+        """
+        # Prompt nulo ou vazio vira o clássico dentro de versao_prompt (o mesmo do dataset do painel)
+        from data.snapshot import versao_prompt
+
+        predicao_a = linha.get("predicao_a") or parsear_resposta(linha.get("model_response_a"))
+        predicao_b = linha.get("predicao_b") or parsear_resposta(linha.get("model_response_b"))
+
+        with self._trava:
+            celula = self._celula(
+                _dia(linha.get("created_at")),
+                self.prompts.codigo(versao_prompt(linha.get("prompt"))),
+                self.classes.codigo(normalizar_label(linha.get("species"))),
+                BIT_SEM_PERFIL if automatico else perfil_da_linha(linha),
+            )
+            a = self.modelos.codigo(linha["model_a"])
+            b = self.modelos.codigo(linha["model_b"])
+
+            # Como em preparar_dados_analise: toda resposta conta para a confusão, com ou sem voto válido
+            self._somar_confusao(celula, a, self.classes.codigo(predicao_a))
+            self._somar_confusao(celula, b, self.classes.codigo(predicao_b))
+
+            pontos_a = PONTOS_RESULTADO.get(linha.get("result_code"))
+            if pontos_a is not None and not automatico:
+                self._somar_par(celula, a, b, pontos_a)
+                self.duelos.adicionar(celula=celula, a=a, b=b, pontos_a=pontos_a)
+
+            if linha.get("id") is not None:
+                if automatico:
+                    self.ultimo_id_automaticos = max(self.ultimo_id_automaticos, int(linha["id"]))
+                else:
+                    self.ultimo_id = max(self.ultimo_id, int(linha["id"]))
+
+    def registrar_tabela(self, dados_brutos: pd.DataFrame, automatico: bool = False) -> int:
+        # Linhas em ordem de id (ordem cronológica do Elo)
+        if "id" in dados_brutos.columns:
+            dados_brutos = dados_brutos.sort_values("id", kind="stable")
+        for linha in dados_brutos.to_dict("records"):
+            self.registrar(linha, automatico)
+        return len(dados_brutos)
+
+    def sincronizar(self, carregar_lote=None, forcar: bool = False) -> int:
+        """Busca no banco os duelos com id > ultimo_id (de cada tabela). Devolve quantos entraram."""
+        with self._trava:
+            agora = time.monotonic()
+            if not forcar and self._ultima_sincronia is not None and agora - self._ultima_sincronia < INTERVALO_SINCRONIA_SEGMENTOS_S:
+                return 0
+            self._ultima_sincronia = agora
+
+            if carregar_lote is None:
+                from data.database import carregar_lote_segmentos as carregar_lote
+
+            novos = 0
+            with span("segmentos.sincronizar", ultimo_id=self.ultimo_id, ultimo_id_automaticos=self.ultimo_id_automaticos) as s:
+                for tabela, automatico in (("evaluations", False), ("auto_evaluations", True)):
+                    while True:
+                        ultimo = self.ultimo_id_automaticos if automatico else self.ultimo_id
+                        lote = carregar_lote(ultimo, TAMANHO_LOTE, tabela)
+                        if lote.empty:
+                            break
+                        novos += self.registrar_tabela(lote, automatico)
+                        if len(lote) < TAMANHO_LOTE:
+                            break
+                s["attributes"]["novos"] = novos
+            return novos
+
+    # --- Consultas ---
+    def _mascara(self, fatia: Fatia, hoje: int) -> np.ndarray:
+        celulas = self.celulas
+        mascara = np.ones(celulas.n, dtype=bool)
+        if fatia.prompt is not None:
+            mascara &= celulas["prompt"] == self.prompts.buscar(fatia.prompt)
+        if fatia.especie is not None:
+            mascara &= celulas["especie"] == self.classes.buscar(normalizar_label(fatia.especie))
+        if fatia.perfil == SEM_EXPERIENCIA:
+            mascara &= celulas["perfil"] == 0
+        elif fatia.perfil is not None:
+            mascara &= (celulas["perfil"] & BITS_PERFIL[fatia.perfil]) != 0
+        if fatia.janela_dias:
+            mascara &= celulas["dia"] > hoje - fatia.janela_dias
+        return mascara
+
+    def _pontos(self, mascara):
+        pares = self.pares
+        selecionados = mascara[pares["celula"]]
+        n = len(self.modelos)
+        pontos = np.zeros(n * n, dtype=np.float64)
+        i, j = pares["i"][selecionados], pares["j"][selecionados]
+        pontos += np.bincount(i * n + j, weights=pares["pontos_i"][selecionados], minlength=n * n)
+        pontos += np.bincount(j * n + i, weights=pares["pontos_j"][selecionados], minlength=n * n)
+        pontos = pontos.reshape(n, n)
+
+        presentes = np.flatnonzero(pontos.sum(axis=0) + pontos.sum(axis=1) > 0)
+        presentes = presentes[np.argsort([self.modelos.nomes[k] for k in presentes])]
+        return pontos[np.ix_(presentes, presentes)], [self.modelos.nomes[k] for k in presentes]
+
+    def _contagens(self, mascara):
+        # Mesmo formato de construir_contagens_confusao: (tensor modelo × verdade × predição, modelos, classes)
+        confusao = self.confusao
+        selecionados = mascara[confusao["celula"]]
+        m, c = len(self.modelos), len(self.classes)
+        modelo = confusao["modelo"][selecionados]
+        verdade = self.celulas["especie"][confusao["celula"][selecionados]]
+        predicao = confusao["predicao"][selecionados]
+        tensor = np.bincount(
+            (modelo * c + verdade) * c + predicao, weights=confusao["n"][selecionados], minlength=m * c * c
+        ).astype(np.int64).reshape(m, c, c)
+
+        modelos = np.flatnonzero(tensor.sum(axis=(1, 2)) > 0)
+        classes = np.flatnonzero(tensor.sum(axis=(0, 2)) + tensor.sum(axis=(0, 1)) > 0)
+        classes = classes[np.argsort([self.classes.nomes[k] for k in classes])]
+        return (
+            tensor[np.ix_(modelos, classes, classes)],
+            [self.modelos.nomes[k] for k in modelos],
+            [self.classes.nomes[k] for k in classes],
+        )
+
+    def _elo_da_fatia(self, fatia: Fatia, mascara, hoje: int) -> dict:
+        inicio = hoje - fatia.janela_dias + 1 if fatia.janela_dias else None
+        inicio_guardado, posicao, pontuacoes = self._elo.get(fatia, (None, 0, {}))
+        if inicio_guardado != inicio:
+            # A janela andou (virou o dia): os duelos mais antigos saem, então o Elo recomeça do zero
+            posicao, pontuacoes = 0, {}
+
+        duelos = self.duelos
+        novos = np.flatnonzero(mascara[duelos["celula"][posicao:]]) + posicao
+        nomes = self.modelos.nomes
+        for a, b, pontos_a in zip(duelos["a"][novos], duelos["b"][novos], duelos["pontos_a"][novos]):
+            atualizar_elo(pontuacoes, nomes[a], nomes[b], float(pontos_a))
+
+        self._elo[fatia] = (inicio, duelos.n, pontuacoes)
+        return dict(pontuacoes)
+
+    def consultar(self, fatia: Fatia) -> dict:
+        """Elo, Bradley-Terry e contagens de confusão da fatia (formatos iguais aos de data/ranking.py)."""
+        hoje = date.today().toordinal()
+        with self._trava:
+            mascara = self._mascara(fatia, hoje)
+            pontos, modelos = self._pontos(mascara)
+            contagens = self._contagens(mascara)
+            pontuacoes = self._elo_da_fatia(fatia, mascara, hoje)
+            duelos = int(mascara[self.duelos["celula"]].sum())
+
+        return {
+            "duelos": duelos,
+            "elo": tabela_elo(pontuacoes),
+            "bradley_terry": bradley_terry_de_pares(pontos, modelos),
+            "contagens": contagens,
+        }
+
+    def especies(self) -> list:
+        with self._trava:
+            presentes = set(self.celulas["especie"].tolist())
+            return sorted(self.classes.nomes[k] for k in presentes)
+
+
+ranking_segmentado = RankingSegmentado()
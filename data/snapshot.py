@@ -0,0 +1,182 @@
+import os
+import json
+import hashlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from ai.prompt import PROMPT_TEMPLATE, PROMPT_TEMPLATE_2
+from data.database import carregar_lote_avaliacoes
+from data.ranking import parsear_resposta, mapear_unicos
+from data.nomes_especies import assinatura_correspondencia
+
+# Snapshots em Parquet da tabela `evaluations`, para análise fora do app sem varrer o banco de produção.
+# São dois datasets particionados por data e versão do prompt:
+#   duelos/     → colunas leves usadas pelos rankings (inclui as predições já parseadas)
+#   respostas/  → blobs de texto (respostas dos modelos, comentários e prompt), lidos só quando necessário
+# O estado guarda a assinatura do parser de espécies que gerou predicao_a/predicao_b; se ela muda, as predições
+# já exportadas são recalculadas a partir das respostas antes do próximo lote (um snapshot, um parser).
+
+DIRETORIO_PADRAO = "snapshots"
+ARQUIVO_ESTADO = "_estado.json"
+TAMANHO_LOTE = 50000
+COLUNAS_PARTICAO = ["data", "versao_prompt"]
+
+COLUNAS_DUELOS = [
+    "id", "created_at", "evaluator_email", "image_path", "image_id", "species",
+    "model_a", "model_b", "result_code", "time_a", "time_b",
+    "text_len_a", "text_len_b", "temperature", "predicao_a", "predicao_b",
+]
+COLUNAS_RESPOSTAS = ["id", "model_response_a", "model_response_b", "comments", "prompt"]
+
+ESQUEMA_PARTICAO = ds.partitioning(
+    pa.schema([("data", pa.string()), ("versao_prompt", pa.string())]),
+    flavor="hive"
+)
+
+
+def versao_prompt(texto) -> str:
+    # Identificador curto e estável do prompt, usado como chave de partição.
+    # Sem prompt (nulo, NaN ou vazio: linhas de antes da coluna existir) é o prompt clássico, como no painel.
+    limpo = texto.strip() if isinstance(texto, str) else ""
+    if not limpo or limpo == PROMPT_TEMPLATE.strip():
+        return "prompt_1"
+    if limpo == PROMPT_TEMPLATE_2.strip():
+        return "prompt_2"
+    return "custom_" + hashlib.sha1(limpo.encode("utf-8")).hexdigest()[:8]
+
+
+def _ler_estado(diretorio: str) -> dict:
+    caminho = os.path.join(diretorio, ARQUIVO_ESTADO)
+    if not os.path.exists(caminho):
+        return {"ultimo_id": 0, "total_linhas": 0, "prompts": {}, "correspondencia": assinatura_correspondencia()}
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar_estado(diretorio: str, estado: dict):
+    # Grava em arquivo temporário e renomeia, para que leitores nunca vejam um estado pela metade.
+    caminho = os.path.join(diretorio, ARQUIVO_ESTADO)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def _gravar_particionado(df: pd.DataFrame, destino: str, prefixo: str):
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(
+        tabela,
+        root_path=destino,
+        partition_cols=COLUNAS_PARTICAO,
+        basename_template=prefixo + "-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore"
+    )
+
+
+def reparsear_snapshot(diretorio: str = DIRETORIO_PADRAO) -> int:
+    # Recalcula predicao_a/predicao_b de todos os arquivos de duelos/ com o parser atual. Cada arquivo tem um par
+    # em respostas/ com o mesmo caminho relativo (mesmo lote e partição); é reescrito no lugar (temporário + rename).
+    # Devolve quantas linhas foram reparseadas.
+    raiz_duelos = os.path.join(diretorio, "duelos")
+    linhas = 0
+    for pasta, _, arquivos in os.walk(raiz_duelos):
+        for nome in arquivos:
+            if not nome.endswith(".parquet"):
+                continue
+            caminho = os.path.join(pasta, nome)
+            par = os.path.join(diretorio, "respostas", os.path.relpath(caminho, raiz_duelos))
+            duelos = pq.read_table(caminho).to_pandas()
+            respostas = pq.read_table(par, columns=["id", "model_response_a", "model_response_b"]).to_pandas()
+            respostas = duelos[["id"]].merge(respostas, on="id", how="left")
+            duelos["predicao_a"] = mapear_unicos(respostas["model_response_a"], parsear_resposta)
+            duelos["predicao_b"] = mapear_unicos(respostas["model_response_b"], parsear_resposta)
+            temporario = caminho + ".tmp"
+            pq.write_table(pa.Table.from_pandas(duelos, preserve_index=False), temporario)
+            os.replace(temporario, caminho)
+            linhas += len(duelos)
+    return linhas
+
+
+def exportar_snapshot(diretorio: str = DIRETORIO_PADRAO, tamanho_lote: int = TAMANHO_LOTE) -> int:
+    # Exporta incrementalmente as avaliações novas (id > último id exportado) em lotes paginados por chave.
+    # Cada lote vira novos arquivos Parquet; os já existentes só são reescritos quando o parser de espécies muda
+    # (as predições são recalculadas). Retorna o número de linhas exportadas.
+    os.makedirs(diretorio, exist_ok=True)
+    estado = _ler_estado(diretorio)
+    exportadas = 0
+
+    assinatura = assinatura_correspondencia()
+    if estado.get("correspondencia") != assinatura:
+        # Estados antigos não têm a assinatura: foram gerados por outro parser
+        print(f"[SNAPSHOT] Parser de espécies mudou ({estado.get('correspondencia')} → {assinatura}): recalculando as predições.")
+        reparseadas = reparsear_snapshot(diretorio)
+        estado["correspondencia"] = assinatura
+        _gravar_estado(diretorio, estado)
+        print(f"[SNAPSHOT] {reparseadas} linhas reparseadas.")
+
+    while True:
+        lote = carregar_lote_avaliacoes(estado["ultimo_id"], tamanho_lote)
+        if lote.empty:
+            break
+
+        lote["data"] = pd.to_datetime(lote["created_at"]).dt.strftime("%Y-%m-%d").fillna("sem_data")
+        lote["versao_prompt"] = lote["prompt"].map(versao_prompt)
+
+        # Predições parseadas uma única vez na exportação: os rankings não precisam ler os blobs de resposta
+        lote["predicao_a"] = lote["model_response_a"].map(parsear_resposta)
+        lote["predicao_b"] = lote["model_response_b"].map(parsear_resposta)
+
+        for texto in lote["prompt"].dropna().unique():
+            if str(texto).strip():
+                estado["prompts"].setdefault(versao_prompt(texto), str(texto).strip())
+
+        ultimo_id = int(lote["id"].max())
+        prefixo = f"lote-{ultimo_id:012d}"
+        _gravar_particionado(lote[COLUNAS_DUELOS + COLUNAS_PARTICAO], os.path.join(diretorio, "duelos"), prefixo)
+        _gravar_particionado(lote[COLUNAS_RESPOSTAS + COLUNAS_PARTICAO], os.path.join(diretorio, "respostas"), prefixo)
+
+        estado["ultimo_id"] = ultimo_id
+        estado["total_linhas"] += len(lote)
+        _gravar_estado(diretorio, estado)
+
+        exportadas += len(lote)
+        print(f"[SNAPSHOT] Lote exportado até id {ultimo_id} ({len(lote)} linhas).")
+
+        if len(lote) < tamanho_lote:
+            break
+
+    return exportadas
+
+
+def carregar_snapshot(diretorio: str = DIRETORIO_PADRAO, conjunto: str = "duelos", colunas=None,
+                      versao=None, desde=None, ate=None) -> pd.DataFrame:
+    # Lê um dos datasets do snapshot com memory-map, lendo só as colunas pedidas e
+    # podando partições por versão do prompt e intervalo de datas ('AAAA-MM-DD').
+    caminho = os.path.join(diretorio, conjunto)
+    if not os.path.isdir(caminho):
+        return pd.DataFrame(columns=colunas or [])
+
+    filtros = []
+    if versao:
+        filtros.append(("versao_prompt", "=", versao))
+    if desde:
+        filtros.append(("data", ">=", str(desde)))
+    if ate:
+        filtros.append(("data", "<=", str(ate)))
+
+    tabela = pq.read_table(
+        caminho,
+        columns=colunas,
+        filters=filtros or None,
+        partitioning=ESQUEMA_PARTICAO,
+        memory_map=True
+    )
+    return tabela.to_pandas()
+
+
+if __name__ == "__main__":
+    import sys
+    destino = sys.argv[1] if len(sys.argv) > 1 else DIRETORIO_PADRAO
+    total = exportar_snapshot(destino)
+    print(f"[SNAPSHOT] {total} novas avaliações exportadas para '{destino}'.")
@@ -0,0 +1,28 @@
+import os
+import sys
+
+# Ponto de entrada de produção: aquece o processo e abre o endpoint de prontidão antes de subir o Streamlit,
+# no mesmo processo (os caches e clientes aquecidos são os que o app vai usar).
+#
+# Uso (mesmos argumentos do `streamlit run`):
+#   python iniciar.py --server.port 8501
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    # st.secrets é lido de .streamlit/secrets.toml relativo ao diretório atual
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+
+    from utils.aquecimento import iniciar_aquecimento, iniciar_servidor_prontidao
+    iniciar_servidor_prontidao()
+    iniciar_aquecimento()
+
+    from streamlit.web import cli as stcli
+    sys.argv = ["streamlit", "run", os.path.join(RAIZ, "app.py"), *sys.argv[1:]]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# `pytest tests/` a partir da raiz: os pacotes do app (data, ai, utils...) ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Estado compartilhado em memória: os testes não criam .estado/ nem dependem de Redis
+os.environ.setdefault("ECOLLM_ESTADO_URL", "memoria://")
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from data.ranking import comparar_prompts, duelos_entre_prompts, normalizar_label
+
+ESPECIE = "Panthera onca"
+
+
+def _respostas(acertos: dict, modelo="m1") -> pd.DataFrame:
+    # acertos: {prompt: [acertou na imagem 0, 1, ...]}
+    linhas = []
+    for prompt, lista in acertos.items():
+        for imagem, acertou in enumerate(lista):
+            linhas.append({"prompt": prompt, "modelo": modelo, "image_id": f"i{imagem}", "species": ESPECIE,
+                           "predicao": normalizar_label(ESPECIE) if acertou else "outra", "sucesso": True, "tempo": 1.0})
+    return pd.DataFrame(linhas)
+
+
+def test_prompt_vence_em_todas_as_imagens():
+    # O caso que o relatório existe para achar: antes o Bradley-Terry entre prompts levantava ValueError
+    relatorio = comparar_prompts(_respostas({"p1": [True] * 8, "p2": [False] * 8}))
+
+    pareada = relatorio["pareada"].set_index("Modelo").loc["Todos"]
+    assert (pareada["Só A Acerta"], pareada["Só B Acerta"], pareada["Δ Acurácia (pp)"]) == (8, 0, 100.0)
+    assert np.isclose(pareada["p (McNemar)"], 2 * 0.5 ** 8, atol=1e-4)
+    assert list(relatorio["bradley_terry"]["Prompt"]) == ["p1", "p2"]
+
+
+def test_duelos_pareados_por_imagem():
+    duelos = duelos_entre_prompts(_respostas({"p1": [True, True, False, False], "p2": [True, False, True, False]}))
+    assert list(duelos["result_code"]) == ["A=B_GOOD", "A>B", "A<B", "!A!B"]
+
+
+def test_mcnemar_sem_discordancia():
+    relatorio = comparar_prompts(_respostas({"p1": [True, False], "p2": [True, False]}))
+    assert relatorio["pareada"]["p (McNemar)"].eq(1.0).all()
+    acuracia = relatorio["por_prompt"].set_index(["Prompt", "Modelo"])["Acurácia (%)"]
+    assert acuracia[("p1", "Todos")] == acuracia[("p2", "Todos")] == 50.0
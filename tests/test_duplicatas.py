@@ -0,0 +1,56 @@
+import io
+import numpy as np
+from PIL import Image
+from data.duplicatas import hashes_imagem, agrupar_especie
+
+
+def _jpeg(semente: int, data: str = None, ruido: float = 0.0) -> bytes:
+    # Cena suave determinística; `ruido` simula o quadro seguinte da rajada
+    rng = np.random.default_rng(semente)
+    base = rng.random((8, 8, 3))
+    pixels = np.kron(base, np.ones((32, 32, 1))) + ruido * np.random.default_rng(semente + 1000).random((256, 256, 3))
+    imagem = Image.fromarray((np.clip(pixels, 0, 1) * 255).astype(np.uint8))
+    exif = Image.Exif()
+    if data:
+        exif.get_ifd(0x8769)[36867] = data
+    buffer = io.BytesIO()
+    imagem.save(buffer, "JPEG", quality=90, exif=exif)
+    return buffer.getvalue()
+
+
+def _bit_distancia(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def test_hashes_e_data_do_exif():
+    cena, copia, outra = (hashes_imagem(_jpeg(s, "2024:05:01 10:00:00")) for s in (1, 1, 2))
+    assert cena == copia
+    assert cena[2] is not None and cena[2] == outra[2]
+    assert _bit_distancia(cena[0], outra[0]) > 10
+    assert hashes_imagem(_jpeg(1))[2] is None
+
+
+def _imagens(*nomes):
+    return [{"id": nome, "name": f"{nome}.jpg"} for nome in nomes]
+
+
+def test_rajada_limitada_pela_janela_de_tempo():
+    hashes = {
+        "a": hashes_imagem(_jpeg(1, "2024:05:01 10:00:00")),
+        "b": hashes_imagem(_jpeg(1, "2024:05:01 10:00:05", ruido=0.02)),
+        "c": hashes_imagem(_jpeg(1, "2024:05:01 14:00:00", ruido=0.02)),  # mesma cena, outro disparo
+    }
+    rajadas, _ = agrupar_especie(_imagens("a", "b", "c"), hashes)
+    assert rajadas == {"a": "a", "b": "a"}
+
+
+def test_sem_data_so_liga_vizinhos_pelo_nome():
+    hashes = {"a": hashes_imagem(_jpeg(1)), "b": hashes_imagem(_jpeg(2)), "c": hashes_imagem(_jpeg(1, ruido=0.02))}
+    rajadas, _ = agrupar_especie(_imagens("a", "b", "c"), hashes)
+    assert rajadas == {}
+    rajadas, _ = agrupar_especie(_imagens("a", "c"), hashes)
+    assert rajadas == {"a": "a", "c": "a"}
+    # Duplicatas (mesma foto) não dependem do tempo
+    hashes["b"] = hashes["a"]
+    _, duplicatas = agrupar_especie(_imagens("a", "b", "c"), hashes)
+    assert duplicatas["b"] == "a"
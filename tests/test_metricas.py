@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from sklearn.metrics import classification_report, confusion_matrix, precision_recall_fscore_support
+from data.ranking import (
+    construir_contagens_confusao, calcular_metricas_globais, calcular_matriz_confusao, calcular_metricas_binarias
+)
+
+CLASSES = ["especiea", "especieb", "especiec", "background", "erro_ou_desconhecido"]
+
+
+def _pool(semente: int) -> pd.DataFrame:
+    # Pool normalizado aleatório (verdade só entre as espécies; a predição pode ser qualquer classe)
+    rng = np.random.default_rng(semente)
+    n = int(rng.integers(1, 80))
+    return pd.DataFrame({
+        "modelo": rng.choice([f"m{i}" for i in range(int(rng.integers(1, 5)))], n),
+        "imagem": "x",
+        "verdade": rng.choice(CLASSES[:3], n),
+        "predicao": rng.choice(CLASSES, n),
+    })
+
+
+def test_metricas_globais_iguais_ao_sklearn():
+    for semente in range(30):
+        pool = _pool(semente)
+        tabela = calcular_metricas_globais(pool).set_index("Modelo")
+        for modelo, subconjunto in pool.groupby("modelo"):
+            rotulos = sorted(set(subconjunto["verdade"]) | set(subconjunto["predicao"]))
+            relatorio = classification_report(subconjunto["verdade"], subconjunto["predicao"], labels=rotulos,
+                                              output_dict=True, zero_division=0)
+            linha = tabela.loc[modelo]
+            assert np.isclose(linha["Macro F1-Score"], relatorio["macro avg"]["f1-score"], atol=5e-4)
+            assert np.isclose(linha["Recall Médio"], relatorio["macro avg"]["recall"], atol=5e-4)
+            assert np.isclose(linha["Acurácia Global (%)"], (subconjunto["verdade"] == subconjunto["predicao"]).mean() * 100, atol=0.05)
+            assert linha["Amostras"] == len(subconjunto)
+
+
+def test_matriz_e_binarias_iguais_ao_sklearn():
+    for semente in range(30):
+        pool = _pool(semente)
+        contagens = construir_contagens_confusao(pool)
+        _, modelos, classes = contagens
+        for modelo in modelos:
+            subconjunto = pool[pool["modelo"] == modelo]
+            matriz, rotulos = calcular_matriz_confusao(pool, modelo, contagens)
+            assert rotulos == classes
+            assert (matriz == confusion_matrix(subconjunto["verdade"], subconjunto["predicao"], labels=classes)).all()
+
+        for especie in CLASSES[:3]:
+            tabela = calcular_metricas_binarias(pool, especie, contagens).set_index("Modelo")
+            for modelo, subconjunto in pool.groupby("modelo"):
+                precisao, revocacao, f1, _ = precision_recall_fscore_support(
+                    subconjunto["verdade"] == especie, subconjunto["predicao"] == especie,
+                    average="binary", zero_division=0)
+                linha = tabela.loc[modelo]
+                assert np.isclose(linha["Precision"], precisao, atol=5e-4)
+                assert np.isclose(linha["Recall"], revocacao, atol=5e-4)
+                assert np.isclose(linha["F1-Score"], f1, atol=5e-4)
+
+
+def test_pool_vazio():
+    assert calcular_metricas_globais(pd.DataFrame()).empty
+    assert calcular_matriz_confusao(pd.DataFrame(), "m0") == (None, [])
@@ -0,0 +1,35 @@
+import pytest
+from data.nomes_especies import IndiceTaxonomico, NOMES_COMUNS_ESPECIES, SINONIMOS_ESPECIES, distancia_edicao
+
+
+@pytest.fixture(scope="module")
+def indice():
+    return IndiceTaxonomico(NOMES_COMUNS_ESPECIES, SINONIMOS_ESPECIES)
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Panthera onca", "pantheraonca"),
+    ("Panthera onca.", "pantheraonca"),
+    ("Mitu tuberosum", "pauxituberosa"),        # sinônimo taxonômico
+    ("Onça-pintada", "pantheraonca"),           # nome comum
+    ("onca pintada", "pantheraonca"),
+    ("Panthera onka", "pantheraonca"),          # erro de grafia
+    ("Didelphis sp.", "didelphisalbiventris"),  # só gênero, com uma espécie no inventário
+    ("Leopardus", "leoparduswiedii"),
+    ("Didelphis marsupialis", None),            # outra espécie do gênero continua errada
+    ("Felis", None),                            # gênero só de sinônimo não conta
+    ("Canis lupus", None),
+])
+def test_resolver_aproximado(indice, texto, esperado):
+    assert indice.resolver(texto, aproximada=True) == esperado
+
+
+def test_resolver_exato(indice):
+    assert indice.resolver("Mitu tuberosum", aproximada=False) == "pauxituberosa"
+    assert indice.resolver("Onça-pintada", aproximada=False) is None
+    assert indice.resolver("Didelphis sp.", aproximada=False) is None
+
+
+def test_distancia_edicao_com_corte():
+    assert distancia_edicao("pantheraonca", "pantheraonka", 2) == 1
+    assert distancia_edicao("abc", "xyz", 1) == 2
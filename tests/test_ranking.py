@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from data.ranking import bradley_terry_de_pares, calcular_bradley_terry, construir_pontos_pares
+
+
+def _duelos(*resultados):
+    # (model_a, model_b, result_code[, evaluator_email]) → quadro de duelos
+    colunas = ["model_a", "model_b", "result_code", "evaluator_email"][:len(resultados[0])]
+    return pd.DataFrame(resultados, columns=colunas)
+
+
+def test_bt_um_duelo():
+    # Uma só vitória: a regressão logística recebia uma classe só e levantava ValueError
+    tabela = bradley_terry_de_pares(np.array([[0.0, 1.0], [0.0, 0.0]]), ["a", "b"])
+    assert list(tabela["Modelo"]) == ["a", "b"]
+    assert tabela["BT Score (Logit)"].iloc[0] > 0 > tabela["BT Score (Logit)"].iloc[1]
+
+
+def test_bt_gabarito_so_decisivos():
+    # auto_evaluations só tem A>B / A<B; aqui o modelo de menor índice sempre vence
+    tabela = calcular_bradley_terry(_duelos(("a", "b", "A>B"), ("a", "c", "A>B"), ("b", "c", "A>B")))
+    assert list(tabela["Modelo"]) == ["a", "b", "c"]
+
+
+def test_bt_sem_vitorias():
+    assert bradley_terry_de_pares(np.zeros((2, 2)), ["a", "b"]).empty
+    assert calcular_bradley_terry(pd.DataFrame()).empty
+
+
+def test_bt_simetrico():
+    # Vitórias iguais nos dois sentidos: forças iguais
+    tabela = bradley_terry_de_pares(np.array([[0.0, 3.0], [3.0, 0.0]]), ["a", "b"])
+    assert np.allclose(tabela["BT Score (Logit)"], 0.0)
+
+
+def test_bt_ponderado_avaliador_com_peso_zero():
+    # Só quem votou em "b" tem peso 0: sobram vitórias num sentido só
+    duelos = _duelos(("a", "b", "A>B", "X@x"), ("a", "b", "A<B", " y@x"), ("b", "a", "A>B", "y@x"))
+    pesos = pd.Series({"x@x": 1.0, "y@x": 0.0})
+    pontos, _ = construir_pontos_pares(duelos, np.array([1.0, 0.0, 0.0]))
+    assert pontos[1, 0] == 0
+
+    tabela = calcular_bradley_terry(duelos, pesos)
+    assert list(tabela["Modelo"]) == ["a", "b"]
+    assert tabela["BT Score (Logit)"].iloc[0] > 0
+
+
+def test_bt_ponderado_pesos_iguais():
+    # Pesos todos iguais a 1 dão o mesmo ajuste sem pesos
+    duelos = _duelos(("a", "b", "A>B", "x@x"), ("b", "c", "A=B_GOOD", "y@x"), ("c", "a", "A>B", "y@x"))
+    pesos = pd.Series({"x@x": 1.0, "y@x": 1.0})
+    pd.testing.assert_frame_equal(calcular_bradley_terry(duelos, pesos), calcular_bradley_terry(duelos))
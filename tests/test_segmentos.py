@@ -0,0 +1,47 @@
+import pandas as pd
+from data.ranking import calcular_bradley_terry
+from data.segmentos import RankingSegmentado, Fatia, PERFIS_AVALIADOR
+
+HOJE = pd.Timestamp.today().isoformat()
+
+
+def _linha(id, a, b, resultado, especie="especie_x", perfil=None, prompt="p1"):
+    flags = {coluna: coluna == perfil for coluna in PERFIS_AVALIADOR}
+    return {"id": id, "model_a": a, "model_b": b, "result_code": resultado, "species": especie, "prompt": prompt,
+            "predicao_a": especie, "predicao_b": "outra", "created_at": HOJE, **flags}
+
+
+def test_fatia_estreita_com_um_voto():
+    # Uma espécie com um único voto decisivo: antes o Bradley-Terry da fatia levantava ValueError
+    ranking = RankingSegmentado()
+    ranking.registrar(_linha(1, "a", "b", "A>B", especie="especie_y", perfil="has_camera_trap_exp"))
+    ranking.registrar(_linha(2, "b", "c", "A=B_GOOD"))
+
+    resultado = ranking.consultar(Fatia(especie="especie_y"))
+    assert resultado["duelos"] == 1
+    assert list(resultado["bradley_terry"]["Modelo"]) == ["a", "b"]
+
+    resultado = ranking.consultar(Fatia(perfil="has_camera_trap_exp", janela_dias=7))
+    assert list(resultado["bradley_terry"]["Modelo"]) == ["a", "b"]
+
+
+def test_fatia_completa_igual_ao_ajuste_direto():
+    # As estatísticas suficientes das células dão o mesmo Bradley-Terry do ajuste sobre os duelos
+    linhas = [
+        _linha(1, "a", "b", "A>B"), _linha(2, "b", "c", "A<B"), _linha(3, "c", "a", "!A!B"),
+        _linha(4, "a", "c", "A>B", especie="especie_y"), _linha(5, "b", "a", "A=B_GOOD", perfil="works_environmental_area"),
+    ]
+    ranking = RankingSegmentado()
+    ranking.registrar_tabela(pd.DataFrame(linhas))
+
+    segmentado = ranking.consultar(Fatia())["bradley_terry"]
+    direto = calcular_bradley_terry(pd.DataFrame(linhas))
+    pd.testing.assert_frame_equal(segmentado, direto)
+
+
+def test_gabarito_so_na_confusao():
+    ranking = RankingSegmentado()
+    ranking.registrar(_linha(1, "a", "b", "A>B"), automatico=True)
+    resultado = ranking.consultar(Fatia())
+    assert resultado["duelos"] == 0 and resultado["bradley_terry"].empty
+    assert resultado["contagens"][0].sum() == 2
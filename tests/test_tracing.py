@@ -0,0 +1,37 @@
+import os
+import utils.tracing as tracing
+
+
+def _spans(quantidade):
+    for i in range(quantidade):
+        with tracing.span("etapa", i=i):
+            pass
+        tracing.registrar_evento("evento", "mensagem")
+
+
+def test_gira_por_tamanho_e_le_o_fim(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "spans.jsonl")
+    monkeypatch.setattr(tracing, "ARQUIVO_SPANS", caminho)
+    monkeypatch.setattr(tracing, "_arquivo", None)
+    monkeypatch.setattr(tracing, "LIMITE_ARQUIVO_SPANS_MB", 0.01)
+    monkeypatch.setattr(tracing, "COPIAS_ARQUIVO_SPANS", 2)
+
+    _spans(300)
+    tracing._arquivo.close()
+    monkeypatch.setattr(tracing, "_arquivo", None)
+
+    # Só o atual e duas cópias, cada um perto do limite
+    assert sorted(os.listdir(tmp_path)) == ["spans.jsonl", "spans.jsonl.1", "spans.jsonl.2"]
+    assert all(os.path.getsize(tmp_path / nome) < 0.01 * 1024 * 1024 + 1024 for nome in os.listdir(tmp_path))
+
+    # Os últimos spans, em ordem, atravessando as cópias giradas
+    ultimos = tracing.carregar_spans(limite=40)
+    assert [a["i"] for a in ultimos["attributes"]] == list(range(260, 300))
+    todos = tracing.carregar_spans()
+    assert todos["attributes"].iloc[-1]["i"] == 299 and len(todos) < 300
+
+
+def test_linha_incompleta_no_fim(tmp_path):
+    caminho = tmp_path / "spans.jsonl"
+    caminho.write_text('{"tipo": "span", "name": "a"}\n{"tipo": "span", "na', encoding="utf-8")
+    assert list(tracing.carregar_spans(str(caminho))["name"]) == ["a"]
@@ -0,0 +1,185 @@
+import time
+import streamlit as st
+from ai.saude import disjuntores, ABERTO, MEIO_ABERTO
+from utils.tracing import carregar_spans, calcular_percentis, calcular_prazos_hedge, ARQUIVO_SPANS
+
+
+def usuario_e_admin() -> bool:
+    """Admins são listados em [geral] ADMIN_EMAILS no secrets.toml."""
+    email = (st.session_state.usuario_info.get("email") or "").lower().strip()
+    try:
+        admins = [e.lower().strip() for e in st.secrets["geral"].get("ADMIN_EMAILS", [])]
+    except KeyError:
+        return False
+    return bool(email) and email in admins
+
+
+def renderizar_painel_saude():
+    st.subheader("Saúde dos Modelos")
+    st.write("Disjuntores por modelo neste processo. Modelos abertos ficam fora do sorteio de duelos até a "
+             "sondagem (meio-aberto) confirmar que voltaram.")
+
+    estados = disjuntores.estados()
+    if not estados:
+        st.info("Nenhuma chamada registrada neste processo ainda.")
+        return
+
+    abertos = [e["Modelo"] for e in estados if e["Estado"] == ABERTO]
+    meio_abertos = [e["Modelo"] for e in estados if e["Estado"] == MEIO_ABERTO]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Modelos monitorados", len(estados))
+    c2.metric("Abertos", len(abertos))
+    c3.metric("Em sondagem", len(meio_abertos))
+    if abertos:
+        st.warning("Fora do sorteio: " + ", ".join(abertos))
+
+    ordem = {ABERTO: 0, MEIO_ABERTO: 1}
+    st.dataframe(sorted(estados, key=lambda e: (ordem.get(e["Estado"], 2), e["Modelo"])), width='stretch', hide_index=True)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _percentis_cached(limite: int):
+    spans = carregar_spans(limite=limite)
+    return spans, calcular_percentis(spans)
+
+
+def renderizar_painel_latencia():
+    st.subheader("Latência por Etapa do Duelo")
+    st.write("Percentis de tempo de cada etapa (Drive, imagem, modelos, banco), a partir dos spans gravados em "
+             f"`{ARQUIVO_SPANS}`. Atualiza a cada minuto.")
+
+    limite = st.select_slider("Spans considerados (mais recentes):", options=[1000, 10000, 50000, 200000], value=50000)
+    spans, tabela = _percentis_cached(limite)
+
+    if tabela.empty:
+        st.info("Nenhum span registrado ainda. Execute alguns duelos.")
+        return
+
+    st.dataframe(tabela, width='stretch', hide_index=True)
+
+    chamadas = spans[spans["name"] == "modelo.chamada"]
+    if not chamadas.empty:
+        st.markdown("##### Chamadas por Modelo")
+        chamadas = chamadas.assign(modelo=chamadas["attributes"].map(lambda a: a.get("modelo")))
+        por_modelo = chamadas.groupby("modelo")["duracao_s"].quantile([0.5, 0.9, 0.99]).unstack().round(3)
+        por_modelo.columns = ["p50 (s)", "p90 (s)", "p99 (s)"]
+        st.dataframe(por_modelo.sort_values("p90 (s)", ascending=False), width='stretch')
+
+        st.markdown("##### Prazos e Hedging")
+        st.caption("Chamadas que estouraram o orçamento do modelo e requisições duplicadas disparadas após o p90.")
+        st.dataframe(calcular_prazos_hedge(spans), width='stretch', hide_index=True)
+
+    duelos = spans[spans["name"] == "duelo"]
+    if not duelos.empty:
+        abandonados = duelos["attributes"].map(lambda a: bool(a.get("abandonado"))).sum()
+        st.metric("Duelos abandonados", f"{abandonados} de {len(duelos)}", f"{abandonados / len(duelos):.1%}", delta_color="inverse")
+
+
+def renderizar_correspondencia_taxonomica(df_duelos):
+    from data.ranking import comparar_correspondencia
+    from data.nomes_especies import taxonomia
+    from config import CORRESPONDENCIA_APROXIMADA
+
+    st.subheader("Correspondência Taxonômica")
+    st.write("Respostas guardadas que mudam de categoria quando nomes comuns, erros de grafia e respostas no nível "
+             "de gênero são aceitos, em vez de só o nome científico exato. "
+             + ("A correspondência aproximada está ligada nos rankings." if CORRESPONDENCIA_APROXIMADA
+                else "A correspondência aproximada está desligada (CORRESPONDENCIA_APROXIMADA no config.py)."))
+    if df_duelos.empty:
+        st.info("Sem duelos registrados.")
+        return
+    # As respostas não ficam no dataset em memória: o relatório as busca no banco, então só roda a pedido
+    if not st.toggle("Analisar respostas guardadas", key="analisar_correspondencia"):
+        return
+
+    inicio = time.perf_counter()
+    if hasattr(df_duelos, "visao"):
+        transicoes = df_duelos.visao("correspondencia", lambda: comparar_correspondencia(df_duelos)).copy()
+    else:
+        transicoes = comparar_correspondencia(df_duelos)
+    total = 2 * len(df_duelos)
+    mudaram = int(transicoes["Respostas"].sum())
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Respostas analisadas", total)
+    c2.metric("Mudaram de categoria", mudaram, f"{100 * mudaram / total:.1f}%", delta_color="off")
+    c3.metric("Deixaram de ser erro", int(transicoes.loc[transicoes["Antes"] == "erro_ou_desconhecido", "Respostas"].sum()))
+    st.caption(f"Calculado em {1000 * (time.perf_counter() - inicio):.0f} ms")
+
+    if not transicoes.empty:
+        transicoes["Antes"] = taxonomia.nomes_exibicao(transicoes["Antes"], incluir_cientifico=True)
+        transicoes["Depois"] = taxonomia.nomes_exibicao(transicoes["Depois"], incluir_cientifico=True)
+        st.dataframe(transicoes, width='stretch', hide_index=True)
+
+
+def renderizar_sequencias():
+    from data.database import carregar_resultados_sequencias
+    from data.ranking import comparar_sequencias
+    from config import FRACAO_DUELOS_SEQUENCIA
+
+    st.subheader("Imagem Única × Sequência")
+    st.write("Duelos em sequência mandam a rajada inteira da armadilha para cada IA (anexos separados ou um mosaico). "
+             "Acurácia contra a espécie da pasta, tempo e tamanho da imagem por chamada, por modelo e modo; "
+             "\"Acertos por MB\" usa os bytes de imagem enviados como aproximação do custo. "
+             + (f"{FRACAO_DUELOS_SEQUENCIA:.0%} dos duelos novos são sequências." if FRACAO_DUELOS_SEQUENCIA
+                else "Os duelos em sequência estão desligados (FRACAO_DUELOS_SEQUENCIA no config.py)."))
+    if not st.toggle("Comparar modos", key="comparar_sequencias"):
+        return
+
+    tabela = comparar_sequencias(carregar_resultados_sequencias())
+    if tabela.empty:
+        st.info("Sem resultados (ou o banco ainda não tem as colunas de sequência, ver README).")
+        return
+    st.dataframe(
+        tabela, width='stretch', hide_index=True,
+        column_config={"Acurácia (%)": st.column_config.ProgressColumn(format="%.1f%%", min_value=0, max_value=100)}
+    )
+
+
+def renderizar_concordancia_avaliadores(df_duelos):
+    from data.database import carregar_perfis_avaliadores
+    from data.ranking import juntar_perfis_avaliadores
+    from data.segmentos import PERFIS_AVALIADOR
+    from ui.tables import tabela_concordancia_avaliadores
+
+    st.subheader("Concordância dos Avaliadores")
+    st.write("Em duelos decisivos (só uma das IAs acertou a espécie da pasta), o voto esperado é na IA que acertou; "
+             "votos de empate não contam como duelo decisivo. "
+             "A confiabilidade suaviza a concordância para quem tem poucos duelos; o peso é o usado no Bradley-Terry ponderado.")
+
+    concordancia = tabela_concordancia_avaliadores(df_duelos) if not df_duelos.empty else None
+    if concordancia is None or concordancia.empty:
+        st.info("Sem duelos com avaliador identificado.")
+        return
+
+    concordancia = juntar_perfis_avaliadores(concordancia, carregar_perfis_avaliadores())
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Avaliadores", len(concordancia))
+    com_decisivos = concordancia.loc[concordancia["Duelos Decisivos"] > 0, "Concordância (%)"]
+    c2.metric("Concordância mediana", f"{com_decisivos.median():.1f}%" if not com_decisivos.empty else "—")
+    c3.metric("Com peso abaixo de 0,5", int((concordancia["Peso"] < 0.5).sum()))
+
+    st.dataframe(
+        concordancia, width='stretch',
+        column_config={
+            "Concordância (%)": st.column_config.ProgressColumn(format="%.1f%%", min_value=0, max_value=100),
+            "Peso": st.column_config.ProgressColumn(format="%.2f", min_value=0, max_value=1),
+        }
+    )
+
+    colunas_perfil = [c for c in PERFIS_AVALIADOR if c in concordancia.columns]
+    if colunas_perfil:
+        # Concordância agregada (votos no modelo certo / duelos decisivos) de quem marcou cada experiência
+        linhas = []
+        for coluna in colunas_perfil:
+            marcados = concordancia[concordancia[coluna].fillna(False).astype(bool)]
+            decisivos = int(marcados["Duelos Decisivos"].sum())
+            linhas.append({
+                "Perfil": PERFIS_AVALIADOR[coluna],
+                "Avaliadores": len(marcados),
+                "Duelos Decisivos": decisivos,
+                "Concordância (%)": round(marcados["Votos no Modelo Certo"].sum() / decisivos * 100, 1) if decisivos else None,
+            })
+        st.markdown("##### Concordância por experiência declarada")
+        st.dataframe(linhas, width='stretch')
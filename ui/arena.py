@@ -2,14 +2,298 @@ import streamlit as st
 import json
 import random
 import time
-from ai.prompt import PROMPT_TEMPLATE, PROMPT_TEMPLATE_2
-from utils.image import codificar_imagem
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from ai.prompt import PROMPT_TEMPLATE, PROMPT_TEMPLATE_2, prompt_sequencia
+from ai.provedores import obter_registro
+from utils.image import codificar_imagem_id, obter_bytes_imagem, codificar_sequencia
 from utils.json_utils import decodificar_json
 from ai.models import executar_analise
-from data.database import salvar_avaliacao
-from data.drive import obter_imagem_aleatoria
-from config import TEMPERATURA_FIXA
-from data.nomes_especies import NOMES_COMUNS_ESPECIES
+from ai.parsing import analisar_resposta
+from ai.prazos import motivo_falha
+from ai.saude import disjuntores
+from data.database import salvar_avaliacao, salvar_falha_modelo, salvar_duelo_automatico
+from data.drive import obter_imagem_aleatoria, obter_sequencia_aleatoria, carregar_imagem
+from data.duplicatas import indice_perceptual
+from data.ranking import veredito_gabarito
+from config import (
+    TEMPERATURA_FIXA, MAX_SUBSTITUICOES_DUELO, ADJUDICACAO_AUTOMATICA, MAX_ADJUDICACOES_POR_SORTEIO, FRACAO_DUELOS_CONTROLE,
+    FRACAO_DUELOS_SEQUENCIA, MODO_SEQUENCIA, MIN_QUADROS_SEQUENCIA, MAX_QUADROS_SEQUENCIA
+)
+from data.nomes_especies import taxonomia
+from utils.tracing import span, registrar_evento
+
+def _resposta_valida(sucesso, resposta) -> bool:
+    # Mesmo critério da exibição (decodificar_json): JSON completo e não vazio
+    if not (sucesso and resposta):
+        return False
+    registro = analisar_resposta(resposta)
+    return registro.json_valido and bool(registro.dados)
+
+
+def _analisar_em_paralelo(modelos, prompt, ref_imagem, enc, img_hash) -> list:
+    # As chamadas de um mesmo turno saem juntas. Cada thread recebe o contexto do Streamlit (sessão)
+    # e uma cópia do contexto de tracing, para os spans ficarem pendurados no span do duelo.
+    ctx = get_script_run_ctx()
+
+    def _chamar(modelo):
+        add_script_run_ctx(None, ctx)
+        return executar_analise(modelo, prompt, ref_imagem, enc, img_hash)
+
+    with ThreadPoolExecutor(max_workers=len(modelos)) as executor:
+        futuros = [executor.submit(contextvars.copy_context().run, _chamar, m) for m in modelos]
+        return [f.result() for f in futuros]
+
+
+def _executar_lados(modelos_iniciais: dict, candidatos: list, prompt, ref_imagem, enc, img_hash) -> dict:
+    # Roda os dois lados do duelo. Um lado que falha (erro, prazo ou JSON inválido) é substituído por
+    # outro modelo sorteado, com a mesma imagem e o mesmo prompt, sem descartar a resposta (já paga)
+    # do lado que deu certo. Cada tentativa falha é devolvida em "falhas" com sua latência.
+    lados = {lado: {"modelo": m, "sucesso": False, "resposta": None, "tempo": 0.0} for lado, m in modelos_iniciais.items()}
+    usados = set(modelos_iniciais.values())
+    pendentes = list(lados)
+    falhas = []
+
+    for rodada in range(1 + MAX_SUBSTITUICOES_DUELO):
+        resultados = _analisar_em_paralelo([lados[l]["modelo"] for l in pendentes], prompt, ref_imagem, enc, img_hash)
+        proximos = []
+        for lado, (sucesso, resposta, tempo) in zip(pendentes, resultados):
+            lados[lado].update(sucesso=sucesso, resposta=resposta, tempo=tempo)
+            if _resposta_valida(sucesso, resposta):
+                continue
+
+            modelo = lados[lado]["modelo"]
+            motivo = "json_invalido" if sucesso else motivo_falha(modelo, tempo)
+            falhas.append({"lado": lado, "modelo": modelo, "tempo": tempo, "motivo": motivo, "resposta": resposta})
+
+            restantes = [m for m in candidatos if m not in usados and disjuntores.disponivel(m)]
+            if rodada < MAX_SUBSTITUICOES_DUELO and restantes:
+                substituto = random.choice(restantes)
+                usados.add(substituto)
+                registrar_evento("duelo.substituicao", f"Modelo {modelo} falhou ({motivo}, {tempo:.2f}s); sorteado {substituto} para o lado {lado.upper()}",
+                                 nivel="aviso", lado=lado, modelo=modelo, substituto=substituto, motivo=motivo, tempo_s=tempo)
+                lados[lado]["modelo"] = substituto
+                proximos.append(lado)
+        if not proximos:
+            break
+        pendentes = proximos
+
+    return {"lados": lados, "falhas": falhas}
+
+
+def _aceita_quadros(modelo: str, quadros: int) -> bool:
+    provedor = obter_registro().provedor(st.session_state.modelos_disponiveis[modelo])
+    return provedor.max_imagens(modelo) >= quadros
+
+
+def _campos_sequencia(quadros: list | None, modo: str | None, enviados: int | None) -> dict:
+    # Colunas de sequência do banco (vazias nos duelos de imagem única)
+    if not quadros:
+        return {"frame_ids": None, "sequence_mode": None, "payload_bytes": None}
+    return {"frame_ids": json.dumps(quadros), "sequence_mode": modo, "payload_bytes": enviados}
+
+
+class SorteioImpossivel(Exception):
+    """Não há como montar um duelo agora (sem imagem, sem modelos). A mensagem é para o avaliador."""
+
+
+def _sortear_e_executar() -> dict:
+    # Sorteia imagem (ou rajada), par de modelos e prompt e roda os dois lados (com substituições). Tentativas que
+    # falharam vão para o banco. Roda também no pré-sorteio (fora do script): erros sem saída viram SorteioImpossivel.
+    with span("duelo") as span_duelo:
+        # Duelo em sequência: a rajada inteira vai para cada modelo numa só requisição
+        sequencia = None
+        if FRACAO_DUELOS_SEQUENCIA and random.random() < FRACAO_DUELOS_SEQUENCIA:
+            sequencia = obter_sequencia_aleatoria(MIN_QUADROS_SEQUENCIA, MAX_QUADROS_SEQUENCIA)
+
+        if sequencia:
+            quadros, nomes_quadros, especie = sequencia
+            # O primeiro quadro identifica o duelo (image_id/image_path); a lista completa vai em frame_ids
+            ref_imagem, nome_arq, id_arq = quadros[0], nomes_quadros[0], quadros[0]
+        else:
+            quadros = None
+            dados_img = obter_imagem_aleatoria()
+
+            if not dados_img:
+                raise SorteioImpossivel("Nenhuma imagem disponível no dataset.")
+
+            # Só o handle vai para a sessão; os bytes ficam no cache compartilhado do processo
+            ref_imagem, nome_arq, especie, id_arq = dados_img
+        
+        # Modelos com disjuntor aberto ficam fora do sorteio até a sondagem
+        mods = [m for m in st.session_state.modelos_disponiveis if disjuntores.disponivel(m)]
+        if len(mods) < 2:
+            raise SorteioImpossivel("Não há modelos suficientes disponíveis (mínimo 2). Tente novamente em instantes.")
+
+        modo = None
+        if quadros:
+            # Os dois lados recebem a mesma entrada: anexos só se os dois (e os substitutos) aceitam todos os quadros
+            capazes = [m for m in mods if _aceita_quadros(m, len(quadros))]
+            if MODO_SEQUENCIA == "multi_imagem" and len(capazes) >= 2:
+                modo, mods = "multi_imagem", capazes
+            else:
+                modo = "mosaico"
+        
+        modelo_a, modelo_b = random.sample(mods, 2)
+        
+        print(f"[DUELO] Modelo A: {modelo_a} | Modelo B: {modelo_b}")
+        print(f"[DUELO] Espécie: {especie} | Imagem: {nome_arq}" + (f" | Sequência: {len(quadros)} quadros ({modo})" if quadros else ""))
+        span_duelo["attributes"].update({
+            "modelo_a": modelo_a,
+            "modelo_b": modelo_b,
+            "especie": especie
+        })
+        
+        enviados = None
+        if quadros:
+            codificada = codificar_sequencia(quadros, modo)
+            if codificada is not None:
+                # Quadros podem ter saído para caber no orçamento: o duelo registra só os enviados
+                enc, img_hash, enviados, quadros = codificada
+                span_duelo["attributes"].update({"quadros": len(quadros), "modo_sequencia": modo, "bytes_imagem": enviados})
+            else:
+                # Sequência fora do cache ou acima do orçamento: o duelo segue só com o primeiro quadro
+                quadros, modo = None, None
+        if not quadros:
+            codificada = codificar_imagem_id(ref_imagem)
+            if codificada is not None:
+                enc, img_hash = codificada
+                img_hash = indice_perceptual.chave_inferencia(id_arq, img_hash)
+        if codificada is None:
+            raise SorteioImpossivel("A imagem sorteada não está mais disponível. Sorteie novamente.")
+        
+        # Blind test: não informar espécie. O banco guarda o prompt base; os modelos recebem a nota da sequência
+        prompt_blind = random.choice([PROMPT_TEMPLATE, PROMPT_TEMPLATE_2])
+        prompt_envio = prompt_sequencia(prompt_blind, len(quadros), modo) if quadros else prompt_blind
+        
+        execucao = _executar_lados({"a": modelo_a, "b": modelo_b}, mods, prompt_envio, ref_imagem, enc, img_hash)
+        lado_a, lado_b = execucao["lados"]["a"], execucao["lados"]["b"]
+
+        # Tentativas que falharam vão para o banco com a latência: entram na confiabilidade do leaderboard
+        email_avaliador = (st.session_state.usuario_info.get("email") or "").lower().strip()
+        for falha in execucao["falhas"]:
+            salvar_falha_modelo({
+                "evaluator_email": email_avaliador,
+                "image_id": id_arq,
+                "model": falha["modelo"],
+                "prompt": prompt_blind,
+                "time_s": falha["tempo"],
+                "reason": falha["motivo"]
+            })
+
+        if lado_a["modelo"] != modelo_a or lado_b["modelo"] != modelo_b:
+            print(f"[DUELO] Após substituição: A: {lado_a['modelo']} | B: {lado_b['modelo']}")
+            span_duelo["attributes"].update({
+                "modelo_a": lado_a["modelo"],
+                "modelo_b": lado_b["modelo"],
+                "substituicoes": len(execucao["falhas"])
+            })
+
+        if not (lado_a["sucesso"] and lado_b["sucesso"]):
+            # Duelo abandonado: fica registrado no trace com o motivo de cada lado (prazo ou erro)
+            motivos = {
+                "motivo_a": "ok" if lado_a["sucesso"] else motivo_falha(lado_a["modelo"], lado_a["tempo"]),
+                "motivo_b": "ok" if lado_b["sucesso"] else motivo_falha(lado_b["modelo"], lado_b["tempo"]),
+            }
+            span_duelo["attributes"].update({"abandonado": True, **motivos})
+            registrar_evento(
+                "duelo.abandonado",
+                f"Duelo abandonado: {lado_a['modelo']} ({motivos['motivo_a']}) x {lado_b['modelo']} ({motivos['motivo_b']})",
+                nivel="aviso", modelo_a=lado_a["modelo"], modelo_b=lado_b["modelo"],
+                tempo_a=lado_a["tempo"], tempo_b=lado_b["tempo"], image_id=id_arq, **motivos
+            )
+
+    return {
+        "ref_imagem": ref_imagem,
+        "nome_imagem": nome_arq,
+        "especie": especie,
+        "id_imagem": id_arq,
+        "prompt": prompt_blind,
+        "prompt_enviado": prompt_envio,
+        "quadros": quadros,
+        "modo_sequencia": modo,
+        "bytes_enviados": enviados,
+        "a": lado_a,
+        "b": lado_b,
+    }
+
+
+# Pré-sorteio: o próximo duelo do avaliador (imagem, chamadas, substituições de quem falhar e a adjudicação
+# pelo gabarito) é preparado numa thread enquanto ele vota no atual. A thread recebe o contexto do Streamlit
+# da sessão (session_state, modelos disponíveis) e uma cópia do contexto de tracing; o Future fica na sessão
+# até o próximo sorteio.
+_executor_pre_sorteio = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ecollm-pre-sorteio")
+
+
+def _agendar_proximo_duelo():
+    if st.session_state.get("proximo_duelo") is not None:
+        return
+    ctx = get_script_run_ctx()
+
+    def _preparar():
+        add_script_run_ctx(None, ctx)
+        return _preparar_duelo_ambiguo()
+
+    st.session_state.proximo_duelo = _executor_pre_sorteio.submit(contextvars.copy_context().run, _preparar)
+
+
+def _preparar_duelo_ambiguo() -> tuple[dict, int]:
+    # Duelos decisivos (só uma IA acertou a espécie) são julgados pelo gabarito e já gravados, exceto a fração
+    # de controle. Devolve o primeiro duelo para o avaliador (ou o último sorteado, se o limite acabar) e
+    # quantos foram decididos no caminho.
+    limite = MAX_ADJUDICACOES_POR_SORTEIO if ADJUDICACAO_AUTOMATICA else 0
+    automaticos = 0
+    while True:
+        duelo = _sortear_e_executar()
+        if automaticos >= limite or random.random() < FRACAO_DUELOS_CONTROLE or not _adjudicar_pelo_gabarito(duelo):
+            return duelo, automaticos
+        automaticos += 1
+
+
+def _obter_duelo() -> tuple[dict, int]:
+    # Duelo já preparado (ou em preparo) pelo pré-sorteio. Sem ele, sorteia um só agora, sem adjudicar (o
+    # avaliador não espera vários duelos); se sair decisivo, vale como duelo de controle.
+    futuro = st.session_state.get("proximo_duelo")
+    st.session_state.proximo_duelo = None
+    if futuro is None:
+        return _sortear_e_executar(), 0
+    with span("duelo.pre_sorteio", pronto=futuro.done()):
+        return futuro.result()
+
+
+def _adjudicar_pelo_gabarito(duelo: dict) -> bool:
+    # Grava o duelo sem voto humano quando o gabarito (pasta da espécie) decide sozinho: uma IA nomeou a
+    # espécie e a outra não. Duelos ambíguos (ambas certas ou ambas erradas) ficam para o avaliador.
+    lado_a, lado_b = duelo["a"], duelo["b"]
+    if not (_resposta_valida(lado_a["sucesso"], lado_a["resposta"]) and _resposta_valida(lado_b["sucesso"], lado_b["resposta"])):
+        return False
+
+    resultado = veredito_gabarito(duelo["especie"], lado_a["resposta"], lado_b["resposta"])
+    if resultado is None:
+        return False
+
+    salvo = salvar_duelo_automatico({
+        "image_path": duelo["nome_imagem"],
+        "image_id": duelo["id_imagem"],
+        "species": duelo["especie"],
+        "model_a": lado_a["modelo"],
+        "model_b": lado_b["modelo"],
+        "time_a": lado_a["tempo"],
+        "time_b": lado_b["tempo"],
+        "model_response_a": lado_a["resposta"],
+        "model_response_b": lado_b["resposta"],
+        "result_code": resultado,
+        "prompt": duelo["prompt"],
+        "temperature": TEMPERATURA_FIXA,
+        "adjudicator": "gabarito",
+        **_campos_sequencia(duelo["quadros"], duelo["modo_sequencia"], duelo["bytes_enviados"]),
+    })
+    if salvo:
+        registrar_evento("duelo.adjudicado", f"Duelo decidido pelo gabarito: {lado_a['modelo']} x {lado_b['modelo']} → {resultado}",
+                         modelo_a=lado_a["modelo"], modelo_b=lado_b["modelo"], resultado=resultado, image_id=duelo["id_imagem"])
+    return salvo
+
 
 def render_arena():
     st.caption("Compare modelos e ajude a classificar a melhor IA para biologia.")
@@ -23,11 +307,13 @@ def render_arena():
             2. **Teste Cego:** Dois modelos de IA analisarão a imagem sem acesso ao gabarito.
             3. **Votação:** Você, como especialista humano, avalia qual modelo teve o melhor desempenho.
 
+            Quando só um dos modelos acerta a espécie, o próprio gabarito da imagem decide o duelo, que quase nunca chega até você. Por isso a maioria dos duelos que você verá tem os dois modelos certos ou os dois errados.
+
             **Critério de Avaliação Principal:**
             * A identificação correta da espécie é o fator eliminatório. Um modelo que gera uma descrição detalhada, mas erra a espécie (alucinação), deve ser penalizado.
 
             **Opções de Voto:**
-            * **Vitória (Modelo A ou B):** O modelo acertou a identificação da espécie e o outro errou. Se ambos acertarem, vence aquele que apresentou a melhor justificativa com base na imagem (características visuais, comportamento ou habitat).
+            * **Vitória (Modelo A ou B):** Se ambos acertaram a espécie, vence aquele que apresentou a melhor justificativa com base na imagem (características visuais, comportamento ou habitat). Se só um acertou (acontece nos duelos de controle), ele vence.
             * **Ambos Bons:** Ambos acertaram a espécie de forma exata e forneceram descrições ricas e úteis, não sendo possível distinguir um vencedor.
             * **Ambos Ruins:** Ambos erraram a identificação grosseiramente ou inventaram animais que não estão na imagem. Nesse caso, o sistema pedirá que você descreva brevemente o que realmente há na foto.
             """)
@@ -44,101 +330,88 @@ def render_arena():
     
     if st.session_state.duelo_ativo and not st.session_state.analise_executada:
         with st.spinner("Carregando duelo..."):
-            dados_img = obter_imagem_aleatoria()
-            
-            if not dados_img:
-                st.error("Nenhuma imagem disponível no dataset.")
-                st.session_state.duelo_ativo = False
-                st.stop()
-            
-            img, nome_arq, especie, id_arq = dados_img
-            st.session_state.imagem = img
-            st.session_state.nome_imagem = nome_arq
-            st.session_state.pasta_especie = especie
-            st.session_state.id_imagem = id_arq
-            
-            mods = list(st.session_state.modelos_disponiveis.keys())
-            if len(mods) < 2:
-                st.error("Não há modelos suficientes configurados (mínimo 2).")
+            try:
+                duelo, automaticos = _obter_duelo()
+            except SorteioImpossivel as e:
+                st.error(str(e))
                 st.session_state.duelo_ativo = False
                 st.stop()
-            
-            st.session_state.modelo_a, st.session_state.modelo_b = random.sample(mods, 2)
-            
-            print(f"[DUELO] Modelo A: {st.session_state.modelo_a} | Modelo B: {st.session_state.modelo_b}")
-            print(f"[DUELO] Espécie: {especie} | Imagem: {nome_arq}")
-            
-            enc = codificar_imagem(st.session_state.imagem)
-            
-            # Blind test: não informar espécie
-            prompt_blind = random.choice([PROMPT_TEMPLATE, PROMPT_TEMPLATE_2])
-            st.session_state.prompt_usado = prompt_blind
-            
-            sucesso_a, resposta_a, tempo_a = executar_analise(
-                st.session_state.modelo_a, 
-                prompt_blind, 
-                st.session_state.imagem, 
-                enc
-            )
-            
-            sucesso_b, resposta_b, tempo_b = executar_analise(
-                st.session_state.modelo_b, 
-                prompt_blind, 
-                st.session_state.imagem, 
-                enc
-            )
-            
+
             st.session_state.update({
-                "resposta_modelo_a": resposta_a, 
-                "tempo_modelo_a": tempo_a, 
-                "sucesso_modelo_a": sucesso_a,
-                "resposta_modelo_b": resposta_b, 
-                "tempo_modelo_b": tempo_b, 
-                "sucesso_modelo_b": sucesso_b,
+                "ref_imagem": duelo["ref_imagem"],
+                "nome_imagem": duelo["nome_imagem"],
+                "pasta_especie": duelo["especie"],
+                "id_imagem": duelo["id_imagem"],
+                "prompt_usado": duelo["prompt"],
+                "prompt_enviado": duelo["prompt_enviado"],
+                "quadros_sequencia": duelo["quadros"],
+                "modo_sequencia": duelo["modo_sequencia"],
+                "bytes_enviados": duelo["bytes_enviados"],
+                "modelo_a": duelo["a"]["modelo"],
+                "modelo_b": duelo["b"]["modelo"],
+                "resposta_modelo_a": duelo["a"]["resposta"],
+                "tempo_modelo_a": duelo["a"]["tempo"],
+                "sucesso_modelo_a": duelo["a"]["sucesso"],
+                "resposta_modelo_b": duelo["b"]["resposta"],
+                "tempo_modelo_b": duelo["b"]["tempo"],
+                "sucesso_modelo_b": duelo["b"]["sucesso"],
+                "duelos_automaticos": automaticos,
                 "analise_executada": True
             })
+            # O próximo duelo já começa a ser preparado enquanto o avaliador lê e vota neste
+            _agendar_proximo_duelo()
         
         st.rerun()
     
-    if st.session_state.analise_executada and st.session_state.imagem:
+    if st.session_state.analise_executada and st.session_state.ref_imagem:
         sucesso_total = st.session_state.sucesso_modelo_a and st.session_state.sucesso_modelo_b
 
+        if st.session_state.get("duelos_automaticos"):
+            st.caption(f"{st.session_state.duelos_automaticos} duelo(s) decidido(s) pelo gabarito enquanto este carregava "
+                       "(uma IA acertou a espécie e a outra errou), em segundo plano. Os casos em que o gabarito não basta ficam para você.")
+
         if sucesso_total:
             col_img, col_texto = st.columns([0.4, 0.6])
 
             with col_img:
                 st.markdown("#### Imagem da Armadilha")
                 
-                # Buscar nome comum
-                # Buscar nome comum e formatar científico
+                # Buscar nome comum e formatar científico (Ex: pasta "Tupinambisteguixin" → "Tupinambis teguixin")
                 especie_raw = st.session_state.pasta_especie
-                nome_comum = NOMES_COMUNS_ESPECIES.get(especie_raw, especie_raw)
-                cientifico_formatado = especie_raw
-
-                # Tenta recuperar o nome científico formatado (com espaços) se não bater direto
-                if especie_raw not in NOMES_COMUNS_ESPECIES:
-                    for k, v in NOMES_COMUNS_ESPECIES.items():
-                        # Compara ignorando espaços e case
-                        if k.replace(" ", "").lower() == especie_raw.replace(" ", "").lower():
-                            nome_comum = v
-                            cientifico_formatado = k # Usa a chave do dicionário (Ex: "Tupinambis teguixin")
-                            break
+                especie = taxonomia.buscar(especie_raw)
+                nome_comum = especie.comum if especie else especie_raw
+                cientifico_formatado = especie.cientifico if especie else especie_raw
                 
                 legenda = f"Científico: {cientifico_formatado}"
                 if nome_comum != cientifico_formatado:
                     legenda = f"**{nome_comum}** ({cientifico_formatado})"
                 
-                st.image(
-                    st.session_state.imagem,
-                    caption=f"{legenda} | Contexto: Selva Amazônica",
-                    width='stretch'
-                )
+                # Bytes JPEG originais direto para o navegador; se saíram do cache, baixa de novo do Drive
+                quadros = st.session_state.get("quadros_sequencia") or [st.session_state.ref_imagem]
+                bytes_quadros = []
+                for ref in quadros:
+                    bytes_imagem = obter_bytes_imagem(ref)
+                    if bytes_imagem is None and carregar_imagem(ref):
+                        bytes_imagem = obter_bytes_imagem(ref)
+                    bytes_quadros.append(bytes_imagem)
+
+                if len(bytes_quadros) > 1:
+                    # Sequência: o avaliador vê os quadros originais, na ordem de disparo
+                    st.image(bytes_quadros, caption=[f"Quadro {i + 1}" for i in range(len(bytes_quadros))], width=160)
+                    modo_envio = "anexos separados" if st.session_state.modo_sequencia == "multi_imagem" else "mosaico"
+                    st.caption(f"{legenda} | Contexto: Selva Amazônica | Rajada de {len(bytes_quadros)} quadros enviada às IAs em {modo_envio}")
+                else:
+                    st.image(
+                        bytes_quadros[0],
+                        caption=f"{legenda} | Contexto: Selva Amazônica",
+                        width='stretch'
+                    )
 
             with col_texto:
                 st.markdown("#### Prompt Enviado (Blind Test)")
                 st.text_area(
                     label="Prompt",
-                    value=st.session_state.get("prompt_usado", PROMPT_TEMPLATE),
+                    value=st.session_state.get("prompt_enviado") or st.session_state.get("prompt_usado", PROMPT_TEMPLATE),
                     height=300,
                     disabled=True,
                     label_visibility="collapsed"
@@ -185,7 +458,7 @@ def render_arena():
                         nome_comum_real = "BACKGROUND"
                         feedback_quantidade = 0
                     else:
-                        nome_comum_real = NOMES_COMUNS_ESPECIES.get(especie_real, especie_real)
+                        nome_comum_real = taxonomia.nome_comum(especie_real)
                         feedback_quantidade = st.number_input("Número de Indivíduos", min_value=1, value=1, step=1)
 
                     feedback_desc = st.text_area("Descrição Visual Correta", help="Descreva o animal e a cena como deveria ser.")
@@ -241,7 +514,12 @@ def render_arena():
                             "time_b": st.session_state.tempo_modelo_b,
                             "comments": obs,
                             "prompt": st.session_state.get("prompt_usado", PROMPT_TEMPLATE),
-                            "temperature": TEMPERATURA_FIXA
+                            "temperature": TEMPERATURA_FIXA,
+                            **_campos_sequencia(
+                                st.session_state.get("quadros_sequencia"),
+                                st.session_state.get("modo_sequencia"),
+                                st.session_state.get("bytes_enviados")
+                            )
                         }
                         
                         try:
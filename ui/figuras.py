@@ -0,0 +1,177 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import plotly.express as px
+from config import LIMITE_CACHE_FIGURAS, PRECOMPUTAR_FIGURAS
+from data.dataset import DatasetDuelos
+from data.ranking import (
+    preparar_dados_analise,
+    construir_contagens_confusao,
+    calcular_metricas_binarias,
+    calcular_matriz_confusao
+)
+from data.nomes_especies import taxonomia
+from utils.tracing import span, registrar_evento
+
+# Figuras Plotly do painel de rankings, prontas por (versão dos dados, gráfico, seleção).
+#
+# Montar um px.bar / px.imshow custa dezenas de ms por rerun; uma figura já montada só precisa ser
+# serializada pelo st.plotly_chart. As figuras ficam num LRU do processo (não no backend compartilhado:
+# reconstruir uma Figure a partir do JSON custa quase o mesmo que montá-la). A versão dos dados é a
+# impressão do DatasetDuelos, então uma sincronia com duelos novos gera chaves novas e as antigas
+# saem pelo LRU. Quando aparece uma versão nova, uma thread gera as figuras de todas as espécies e
+# modelos, e trocar a seleção no painel já encontra a figura pronta.
+
+
+class CacheFiguras:
+    """LRU do processo com as figuras prontas (e as tabelas que as acompanham), limitado em número de itens."""
+
+    def __init__(self, limite: int):
+        self.limite = limite
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave: tuple, construir):
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave]
+            self.faltas += 1
+        # Fora da trava: duas sessões podem montar a mesma figura ao mesmo tempo, mas uma não espera a outra
+        valor = construir()
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.limite:
+                self._itens.popitem(last=False)
+        return valor
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            return {"figuras": len(self._itens), "limite": self.limite, "acertos": self.acertos, "faltas": self.faltas}
+
+
+cache_figuras = CacheFiguras(LIMITE_CACHE_FIGURAS)
+
+
+def pool_analise(df_duelos: DatasetDuelos):
+    # Formato longo (1 predição por linha), montado uma vez por dataset e reaproveitado pelas abas e sessões
+    return df_duelos.visao("analise", lambda: preparar_dados_analise(df_duelos))
+
+
+def contagens_confusao(df_duelos: DatasetDuelos):
+    # Tensor modelo × verdade × predição de onde saem as métricas por espécie e as matrizes de todos os modelos
+    return df_duelos.visao("contagens", lambda: construir_contagens_confusao(pool_analise(df_duelos)))
+
+
+# --- FIGURAS ---
+
+CORES_DIAGNOSTICO = {
+    "Verdadeiros Positivos": "#2ecc71",  # Verde
+    "Falsos Positivos": "#e74c3c",       # Vermelho
+    "Falsos Negativos": "#f1c40f"        # Amarelo
+}
+
+
+def figura_diagnostico(df_especie):
+    # Barras empilhadas de TP, FP e FN por modelo
+    df_long = df_especie.melt(
+        id_vars=["Modelo"],
+        value_vars=["Verdadeiros Positivos", "Falsos Positivos", "Falsos Negativos"],
+        var_name="Tipo",
+        value_name="Quantidade"
+    )
+    fig = px.bar(
+        df_long,
+        x="Quantidade",
+        y="Modelo",
+        color="Tipo",
+        orientation='h',
+        color_discrete_map=CORES_DIAGNOSTICO,
+        text_auto=True
+    )
+    fig.update_layout(
+        showlegend=True,
+        margin=dict(l=0, r=0, t=0, b=0),
+        height=300,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+
+def figura_matriz_confusao(matriz, labels):
+    # Heatmap verdade × predição com os nomes de exibição das espécies
+    labels_display = [taxonomia.nome_exibicao(l, incluir_cientifico=True) for l in labels]
+    fig = px.imshow(
+        matriz,
+        labels=dict(x="Predição", y="Verdade (Real)", color="Quantidade"),
+        x=labels_display,
+        y=labels_display,
+        text_auto=True,
+        color_continuous_scale="Blues",
+        aspect="auto"
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+def diagnostico_especie(df_duelos: DatasetDuelos, especie: str):
+    """(métricas One-Vs-Rest da espécie, figura de diagnóstico), do cache quando já montados."""
+    def _montar():
+        df_especie = calcular_metricas_binarias(None, especie, contagens_confusao(df_duelos))
+        return df_especie, (figura_diagnostico(df_especie) if not df_especie.empty else None)
+    return cache_figuras.obter((df_duelos.impressao(), "especie", especie), _montar)
+
+
+def matriz_modelo(df_duelos: DatasetDuelos, modelo: str):
+    """Figura da matriz de confusão do modelo (None se o modelo não tem predições), do cache quando já montada."""
+    def _montar():
+        matriz, labels = calcular_matriz_confusao(None, modelo, contagens_confusao(df_duelos))
+        return figura_matriz_confusao(matriz, labels) if matriz is not None else None
+    return cache_figuras.obter((df_duelos.impressao(), "matriz", modelo), _montar)
+
+
+# --- PRÉ-CÁLCULO ---
+
+def precomputar_figuras(df_duelos: DatasetDuelos) -> int:
+    """Monta as figuras de todas as espécies e modelos do dataset. Devolve quantas estão no cache."""
+    if df_duelos.empty:
+        return 0
+    pool = pool_analise(df_duelos)
+    especies = sorted(pool["verdade"].unique())
+    modelos = sorted(pool["modelo"].unique())
+    with span("figuras.precomputo", especies=len(especies), modelos=len(modelos)):
+        for especie in especies:
+            diagnostico_especie(df_duelos, especie)
+        for modelo in modelos:
+            matriz_modelo(df_duelos, modelo)
+    return len(especies) + len(modelos)
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ecollm-figuras")
+_agendados = set()
+_trava_agenda = threading.Lock()
+
+
+def _precomputar_em_segundo_plano(df_duelos: DatasetDuelos):
+    try:
+        precomputar_figuras(df_duelos)
+    except Exception as e:
+        registrar_evento("figuras.erro", f"Pré-cálculo das figuras falhou: {e}", nivel="aviso")
+
+
+def agendar_precomputo(df_duelos: DatasetDuelos):
+    """Pré-calcula as figuras numa thread, uma vez por versão dos dados (não bloqueia o rerun)."""
+    if not PRECOMPUTAR_FIGURAS or df_duelos.empty:
+        return
+    impressao = df_duelos.impressao()
+    with _trava_agenda:
+        if impressao in _agendados:
+            return
+        if len(_agendados) > 4 * LIMITE_CACHE_FIGURAS:
+            _agendados.clear()
+        _agendados.add(impressao)
+    _executor.submit(_precomputar_em_segundo_plano, df_duelos)
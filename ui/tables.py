@@ -1,43 +1,108 @@
+import time
 import streamlit as st
 from data.ranking import (
     calcular_elo_rating, 
     calcular_bradley_terry, 
-    preparar_dados_analise,
     calcular_metricas_globais,
-    calcular_metricas_binarias,
-    calcular_matriz_confusao
+    calcular_confiabilidade,
+    calcular_concordancia_avaliadores,
+    calcular_matriz_confusao,
+    pesos_avaliadores
+)
+from data.nomes_especies import taxonomia
+from data.dataset import DatasetDuelos
+from ui.figuras import (
+    pool_analise, diagnostico_especie, matriz_modelo, figura_matriz_confusao, agendar_precomputo
 )
-import plotly.express as px
-from data.nomes_especies import NOMES_COMUNS_ESPECIES
 from ai.prompt import PROMPT_TEMPLATE, PROMPT_TEMPLATE_2
+from config import TTL_CACHE_RANKINGS_S, JANELAS_RANKING_DIAS
+from utils.estado import memorizar_tabela
 
-def _obter_nome_exibicao(especie_raw: str) -> str:
-    # Converte o código científico cru em uma string legível 'Nome Comum (Nome Científico)' para uso visual na interface gráfica.
-    # Efetua busca iterativa pelo mapeamento do catálogo oficial.
-    nome_comum = especie_raw
-    cientifico_formatado = especie_raw
 
-    for chave, valor in NOMES_COMUNS_ESPECIES.items():
-        if chave.replace(" ", "").lower() == especie_raw.replace(" ", "").lower():
-            nome_comum = valor
-            cientifico_formatado = chave
-            break
+def _impressao_duelos(df_duelos) -> str:
+    # Identifica o conjunto de duelos (após filtros) para o cache de rankings compartilhado entre réplicas.
+    # Num DatasetDuelos o hash é calculado uma vez por dataset, não a cada rerun.
+    if not isinstance(df_duelos, DatasetDuelos):
+        df_duelos = DatasetDuelos(df_duelos)
+    return df_duelos.impressao()
+
+
+def _humanos(df_duelos):
+    # Elo, Bradley-Terry e concordância são dos votos humanos; os duelos do gabarito só entram nas métricas de predição
+    return df_duelos.humanos() if isinstance(df_duelos, DatasetDuelos) else df_duelos
+
+
+# Tabelas de ranking memorizadas no backend compartilhado, chaveadas pela impressão dos duelos.
+# O aquecimento chama as mesmas funções, então a primeira visita ao painel já encontra o cache.
+def _tabela_elo(df_duelos):
+    df_duelos = _humanos(df_duelos)
+    return memorizar_tabela(f"ranking:elo:{_impressao_duelos(df_duelos)}",
+                            lambda: calcular_elo_rating(df_duelos), TTL_CACHE_RANKINGS_S)
+
+
+def _tabela_bt(df_duelos):
+    df_duelos = _humanos(df_duelos)
+    return memorizar_tabela(f"ranking:bt:{_impressao_duelos(df_duelos)}",
+                            lambda: calcular_bradley_terry(df_duelos), TTL_CACHE_RANKINGS_S)
+
 
-    if nome_comum != cientifico_formatado:
-        return f"{nome_comum} ({cientifico_formatado})"
-    return especie_raw
+def tabela_concordancia_avaliadores(df_duelos):
+    df_duelos = _humanos(df_duelos)
+    return memorizar_tabela(f"avaliadores:concordancia:{_impressao_duelos(df_duelos)}",
+                            lambda: calcular_concordancia_avaliadores(df_duelos), TTL_CACHE_RANKINGS_S)
+
+
+def _tabela_bt_ponderado(df_duelos):
+    df_duelos = _humanos(df_duelos)
+    return memorizar_tabela(f"ranking:bt_ponderado:{_impressao_duelos(df_duelos)}",
+                            lambda: calcular_bradley_terry(df_duelos, pesos_avaliadores(tabela_concordancia_avaliadores(df_duelos))),
+                            TTL_CACHE_RANKINGS_S)
+
+
+def _tabelas_gabarito(df_automaticos):
+    # Elo e Bradley-Terry dos duelos julgados pelo gabarito (origem "gabarito" do dataset), em chaves próprias do cache
+    impressao = _impressao_duelos(df_automaticos)
+    return (
+        memorizar_tabela(f"ranking:gabarito:elo:{impressao}", lambda: calcular_elo_rating(df_automaticos), TTL_CACHE_RANKINGS_S),
+        memorizar_tabela(f"ranking:gabarito:bt:{impressao}", lambda: calcular_bradley_terry(df_automaticos), TTL_CACHE_RANKINGS_S),
+    )
+
+
+def _tabela_falhas():
+    # model_failures cresce a cada lado que falha: lida no máximo uma vez por TTL, e só pelo painel de rankings
+    from data.database import carregar_falhas_modelos
+    return memorizar_tabela("ranking:falhas", carregar_falhas_modelos, TTL_CACHE_RANKINGS_S)
+
+
+def _tabela_macro_f1(df_duelos):
+    return memorizar_tabela(f"ranking:macro_f1:{_impressao_duelos(df_duelos)}",
+                            lambda: calcular_metricas_globais(pool_analise(df_duelos)), TTL_CACHE_RANKINGS_S)
+
+
+def precomputar_rankings(df_duelos) -> int:
+    # Calcula Elo, Bradley-Terry e Macro F1 da visão padrão do painel ("Todos os Prompts"); devolve quantas tabelas ficaram prontas
+    if df_duelos.empty:
+        return 0
+    return sum(not tabela(df_duelos).empty for tabela in (_tabela_elo, _tabela_bt, _tabela_macro_f1))
+
+
+def _obter_nome_exibicao(especie_raw: str) -> str:
+    # Converte o código científico cru em uma string legível 'Nome Comum (Nome Científico)' para uso visual na interface gráfica.
+    # Consulta o índice taxonômico (dicionário pela chave normalizada), sem varrer o catálogo.
+    return taxonomia.nome_exibicao(especie_raw, incluir_cientifico=True)
 
 
 def renderizar_estatisticas_globais(df_duelos):
     st.header("Visão Geral dos Duelos")
     st.write("Resumo de quantas avaliações já foram realizadas e quantos modelos de IA estão competindo.")
     if not df_duelos.empty:
-        total_batalhas = len(df_duelos)
+        total_batalhas = len(_humanos(df_duelos))
         total_modelos = len(set(df_duelos['model_a'].unique()) | set(df_duelos['model_b'].unique()))
 
-        m1, m2 = st.columns(2)
+        m1, m2, m3 = st.columns(3)
         m1.metric("Total de Batalhas Avaliadas", total_batalhas)
-        m2.metric("IAs Competidoras", total_modelos)
+        m2.metric("Decididas pelo Gabarito", len(df_duelos) - total_batalhas)
+        m3.metric("IAs Competidoras", total_modelos)
         st.divider()
     else:
         st.info("Ainda não temos dados o suficiente. Participe dos duelos para gerar relatórios!")
@@ -47,7 +112,7 @@ def renderizar_elo(df_duelos):
     st.subheader("Sistema de Pontuação (Elo Rating)")
     st.write("Funciona como o ranking do xadrez: a IA ganha pontos ao vencer e perde ao ser derrotada. Vencer uma IA mais forte vale mais pontos.")
     if not df_duelos.empty:
-        df_elo = calcular_elo_rating(df_duelos)
+        df_elo = _tabela_elo(df_duelos)
         st.dataframe(df_elo, width='stretch', column_config={"Elo Rating": st.column_config.NumberColumn(format="%d")})
     else:
         st.info("Sem dados para Elo.")
@@ -57,7 +122,14 @@ def renderizar_bt(df_duelos):
     st.subheader("Chances de Vitória (Modelo Bradley-Terry)")
     st.write("A barra indica a força estimada de cada modelo. Quanto mais preenchida, maior a chance dessa IA vencer qualquer confronto.")
     if not df_duelos.empty:
-        df_bt = calcular_bradley_terry(df_duelos)
+        ponderado = "evaluator_email" in df_duelos.columns and st.toggle(
+            "Ponderar votos pela confiabilidade do avaliador", key="bt_ponderado",
+            help="Cada voto vale o peso de quem votou: avaliadores que costumam votar no modelo que errou a espécie pesam menos."
+        )
+        df_bt = _tabela_bt_ponderado(df_duelos) if ponderado else _tabela_bt(df_duelos)
+        if df_bt.empty:
+            st.info("Nenhum voto com peso positivo: os avaliadores ainda não concordam com a espécie real o suficiente.")
+            return
 
         bt_min = float(df_bt['BT Score (Logit)'].min()) if not df_bt.empty else 0
         bt_max = float(df_bt['BT Score (Logit)'].max()) if not df_bt.empty else 1
@@ -79,6 +151,8 @@ def renderizar_bt(df_duelos):
         st.info("Sem dados para Bradley-Terry.")
 
 
+# Fragmento: trocar a espécie só reexecuta esta seção (e só este gráfico volta ao navegador), não o painel inteiro
+@st.fragment
 def renderizar_analise_especies(df_duelos):
     st.divider()
     st.subheader("Análise por Espécie")
@@ -88,7 +162,7 @@ def renderizar_analise_especies(df_duelos):
         st.info("Sem dados para análise.")
         return
 
-    df_flat = preparar_dados_analise(df_duelos)
+    df_flat = pool_analise(df_duelos)
     todas_especies = sorted(df_flat['verdade'].unique())
     
     # Criar mapa para exibição no Selectbox
@@ -99,7 +173,8 @@ def renderizar_analise_especies(df_duelos):
 
     if selecao:
         especie_real = mapa_reverso[selecao]
-        df_especie = calcular_metricas_binarias(df_flat, especie_real)
+        # Métricas e figura saem prontas do cache de figuras (ui/figuras.py)
+        df_especie, fig = diagnostico_especie(df_duelos, especie_real)
 
         coluna_tabela, coluna_grafico = st.columns([0.65, 0.35])
 
@@ -121,39 +196,10 @@ def renderizar_analise_especies(df_duelos):
             )
 
         with coluna_grafico:
-            if not df_especie.empty:
+            if fig is not None:
                 st.markdown("##### Diagnóstico de Erros")
                 st.write("Veja quantas vezes cada IA acertou, inventou ou deixou de identificar esta espécie:")
                 # Gráfico de Barras Empilhadas para TP, FP, FN
-                df_long = df_especie.melt(
-                    id_vars=["Modelo"], 
-                    value_vars=["Verdadeiros Positivos", "Falsos Positivos", "Falsos Negativos"],
-                    var_name="Tipo",
-                    value_name="Quantidade"
-                )
-                
-                color_map = {
-                    "Verdadeiros Positivos": "#2ecc71", # Verde
-                    "Falsos Positivos": "#e74c3c",      # Vermelho
-                    "Falsos Negativos": "#f1c40f"       # Amarelo
-                }
-
-                fig = px.bar(
-                    df_long,
-                    x="Quantidade",
-                    y="Modelo",
-                    color="Tipo",
-                    orientation='h',
-                    
-                    color_discrete_map=color_map,
-                    text_auto=True
-                )
-                fig.update_layout(
-                    showlegend=True, 
-                    margin=dict(l=0, r=0, t=0, b=0), 
-                    height=300,
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-                )
                 st.plotly_chart(fig, key=f"grafico_stacked_{especie_real}")
                 
                 st.caption("Verde = Acertou | Vermelho = Alucinou (disse que era este animal, mas não era) | Amarelo = Omitiu (o animal estava na foto, mas a IA não o reconheceu)")
@@ -165,12 +211,13 @@ def renderizar_macro_f1(df_duelos):
     Algumas espécies aparecem com muito mais frequência do que outras no dataset. Uma IA poderia inflar sua pontuação acertando apenas os animais comuns e errando os raros.  
     A **Precisão Justa** corrige isso: ela dá peso igual a todas as espécies, penalizando modelos que falham com animais raros. O primeiro lugar aqui é o modelo mais equilibrado.
     
+    *As respostas de todos os duelos entram aqui, inclusive as dos decididos pelo gabarito (que não passam pelos avaliadores).*
+
     *Nota sobre as **Amostras**: O cálculo inteiro é feito apenas nas espécies em que aquele modelo já esbarrou na avaliação. Se o modelo nunca sorteou a imagem de um macaco para testar, a nota final dele ignorará a existência de macacos no F1-Score e na Acurácia. A nota é 100% calibrada no universo exato de fotos que ele efetivamente tentou a sorte!*
     """)
 
     if not df_duelos.empty:
-        df_flat = preparar_dados_analise(df_duelos)
-        df_macro = calcular_metricas_globais(df_flat)
+        df_macro = _tabela_macro_f1(df_duelos)
 
         st.dataframe(
             df_macro, width='stretch',
@@ -183,6 +230,7 @@ def renderizar_macro_f1(df_duelos):
         st.info("Sem dados para Macro F1.")
 
 
+@st.fragment
 def renderizar_matriz_confusao_global(df_duelos):
     st.divider()
     st.subheader("Mapa de Confusões da IA")
@@ -191,7 +239,7 @@ def renderizar_matriz_confusao_global(df_duelos):
     if df_duelos.empty:
         return
 
-    df_flat = preparar_dados_analise(df_duelos)
+    df_flat = pool_analise(df_duelos)
     modelos = sorted(df_flat["modelo"].unique())
     
     col_sel, col_viz = st.columns([0.3, 0.7])
@@ -200,27 +248,113 @@ def renderizar_matriz_confusao_global(df_duelos):
         modelo_selecionado = st.selectbox("Selecione o Modelo:", modelos)
     
     if modelo_selecionado:
-        matriz, labels = calcular_matriz_confusao(df_flat, modelo_selecionado)
+        fig = matriz_modelo(df_duelos, modelo_selecionado)
         
-        if matriz is not None:
-            # Labels formatados para o gráfico
-            labels_display = [_obter_nome_exibicao(l) for l in labels]
-            
-            fig = px.imshow(
-                matriz,
-                labels=dict(x="Predição", y="Verdade (Real)", color="Quantidade"),
-                x=labels_display,
-                y=labels_display,
-                text_auto=True,
-                color_continuous_scale="Blues",
-                aspect="auto"
-            )
-            fig.update_layout(height=500)
-            
+        if fig is not None:
             with col_viz:
                 st.plotly_chart(fig, key=f"heatmap_{modelo_selecionado}")
 
-def renderizar_painel_rankings(df_duelos):
+
+def _desenhar_matriz_confusao(matriz, labels, chave):
+    # Heatmap verdade × predição com os nomes de exibição das espécies
+    st.plotly_chart(figura_matriz_confusao(matriz, labels), key=chave)
+
+def renderizar_confiabilidade(df_duelos, df_falhas):
+    st.subheader("Confiabilidade dos Modelos")
+    st.write("Quando uma IA falha no duelo (erro, demora demais ou responde fora do formato), ela é trocada por outra e a tentativa fica registrada aqui. Uma IA bem colocada no ranking, mas com baixa confiabilidade, costuma falhar antes de chegar ao voto.")
+
+    df_conf = calcular_confiabilidade(df_duelos, df_falhas)
+    if df_conf.empty:
+        st.info("Sem dados de confiabilidade.")
+        return
+
+    st.dataframe(
+        df_conf, width='stretch',
+        column_config={
+            "Confiabilidade (%)": st.column_config.ProgressColumn(format="%.1f%%", min_value=0, max_value=100)
+        }
+    )
+
+
+def renderizar_gabarito(df_duelos):
+    st.subheader("Ranking pelo Gabarito (sem voto humano)")
+    st.write("Duelos em que só uma das IAs acertou a espécie da pasta são decididos automaticamente e, tirando uma pequena "
+             "fração de controle, não chegam aos avaliadores. Este ranking usa apenas esses duelos. Elo e Bradley-Terry das "
+             "outras abas usam apenas os votos humanos; as métricas de precisão e a confiabilidade usam as respostas de todos os duelos.")
+    df_automaticos = df_duelos.gabarito()
+    if df_automaticos.empty:
+        st.info("Nenhum duelo decidido pelo gabarito ainda.")
+        return
+
+    st.caption(f"{len(df_automaticos)} duelos automáticos considerados.")
+    df_elo, df_bt = _tabelas_gabarito(df_automaticos)
+    col_elo, col_bt = st.columns(2)
+    with col_elo:
+        st.dataframe(df_elo, width='stretch', column_config={"Elo Rating": st.column_config.NumberColumn(format="%d")})
+    with col_bt:
+        st.dataframe(df_bt, width='stretch', column_config={"BT Score (Logit)": st.column_config.NumberColumn(format="%.2f")})
+
+
+def renderizar_segmentos(versao_prompt=None):
+    # Rankings de uma fatia (perfil do avaliador × espécie × período), servidos pelo motor incremental de data/segmentos.py.
+    # O prompt vem do filtro geral do painel; cada consulta soma estatísticas já acumuladas em vez de refazer os rankings.
+    from data.segmentos import ranking_segmentado, Fatia, PERFIS_AVALIADOR, SEM_EXPERIENCIA
+
+    st.subheader("Rankings por Segmento")
+    st.write("Compare os modelos dentro de um grupo: avaliadores com certa experiência de campo, uma espécie específica ou só os duelos recentes.")
+
+    with st.spinner("Atualizando segmentos..."):
+        ranking_segmentado.sincronizar()
+
+    opcoes_perfil = {"Todos os avaliadores": None, **{rotulo: coluna for coluna, rotulo in PERFIS_AVALIADOR.items()},
+                     "Sem experiência de campo": SEM_EXPERIENCIA}
+    especies = ranking_segmentado.especies()
+    opcoes_especie = {"Todas as espécies": None, **{_obter_nome_exibicao(sp): sp for sp in especies}}
+    opcoes_janela = {"Todo o período": None, **{f"Últimos {dias} dias": dias for dias in JANELAS_RANKING_DIAS}}
+
+    c1, c2, c3 = st.columns(3)
+    perfil = c1.selectbox("Perfil do avaliador:", list(opcoes_perfil), key="segmento_perfil")
+    especie = c2.selectbox("Espécie:", list(opcoes_especie), key="segmento_especie")
+    janela = c3.selectbox("Período:", list(opcoes_janela), key="segmento_janela")
+
+    fatia = Fatia(prompt=versao_prompt, especie=opcoes_especie[especie], perfil=opcoes_perfil[perfil], janela_dias=opcoes_janela[janela])
+    inicio = time.perf_counter()
+    resultado = ranking_segmentado.consultar(fatia)
+    st.caption(f"{resultado['duelos']} duelos neste segmento · calculado em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    if resultado["duelos"] == 0:
+        st.info("Nenhum duelo neste segmento ainda.")
+        return
+
+    col_elo, col_bt = st.columns(2)
+    with col_elo:
+        st.markdown("##### Elo Rating")
+        st.dataframe(resultado["elo"], width='stretch', column_config={"Elo Rating": st.column_config.NumberColumn(format="%d")})
+    with col_bt:
+        st.markdown("##### Bradley-Terry")
+        st.dataframe(resultado["bradley_terry"], width='stretch')
+
+    st.markdown("##### Precisão Justa (Macro F1-Score)")
+    df_macro = calcular_metricas_globais(None, resultado["contagens"])
+    st.dataframe(
+        df_macro, width='stretch',
+        column_config={
+            "Macro F1-Score": st.column_config.ProgressColumn(format="%.3f", min_value=0, max_value=1),
+            "Acurácia Global (%)": st.column_config.ProgressColumn(format="%.1f%%", min_value=0, max_value=100)
+        }
+    )
+
+    modelos = sorted(resultado["contagens"][1])
+    modelo_selecionado = st.selectbox("Mapa de confusões do modelo:", modelos, key="segmento_modelo")
+    if modelo_selecionado:
+        matriz, labels = calcular_matriz_confusao(None, modelo_selecionado, resultado["contagens"])
+        if matriz is not None:
+            _desenhar_matriz_confusao(matriz, labels, f"heatmap_segmento_{modelo_selecionado}")
+
+
+def renderizar_painel_rankings(df_duelos, df_falhas=None):
+    from data.snapshot import versao_prompt
+
     st.subheader("Filtros de Estatísticas & Ranking")
     
     # Inicializa estado se não existir
@@ -241,24 +375,22 @@ def renderizar_painel_rankings(df_duelos):
         "Prompt 2 (C/ Lista de Espécies)": PROMPT_TEMPLATE_2.strip()
     }
 
-    if not df_duelos.empty:
+    if not isinstance(df_duelos, DatasetDuelos):
         # Se a base de dados for antiga e não tiver a coluna, preenchemos com o prompt clássico
-        if "prompt" not in df_duelos.columns:
-            df_duelos["prompt"] = PROMPT_TEMPLATE.strip()
+        if not df_duelos.empty and "prompt" not in df_duelos.columns:
+            df_duelos = df_duelos.assign(prompt=PROMPT_TEMPLATE.strip())
+        df_duelos = DatasetDuelos.de_quadro(df_duelos)
 
-        prompts_unicos = df_duelos["prompt"].dropna().unique().tolist()
-        
-        for p in prompts_unicos:
-            p_limpo = str(p).strip()
-            
-            if p_limpo == PROMPT_TEMPLATE.strip() or p_limpo == PROMPT_TEMPLATE_2.strip():
-                continue
-                
-            nome_botao = f"Prompt Personalizado ({p_limpo[:30]}...)"
-            
-            if nome_botao not in opcoes_nomes:
-                opcoes_nomes.append(nome_botao)
-                nome_para_texto[nome_botao] = p_limpo
+    # Os prompts distintos já vêm do dataset (versão → texto), sem varrer a coluna de texto a cada rerun
+    for p_limpo in df_duelos.prompts.values():
+        if p_limpo == PROMPT_TEMPLATE.strip() or p_limpo == PROMPT_TEMPLATE_2.strip():
+            continue
+
+        nome_botao = f"Prompt Personalizado ({p_limpo[:30]}...)"
+
+        if nome_botao not in opcoes_nomes:
+            opcoes_nomes.append(nome_botao)
+            nome_para_texto[nome_botao] = p_limpo
 
     idx_selecionado = 0
     if st.session_state.get('filtro_prompt_ranking') in opcoes_nomes:
@@ -271,10 +403,17 @@ def renderizar_painel_rankings(df_duelos):
         key='filtro_prompt_ranking'
     )
 
+    if df_falhas is None:
+        df_falhas = _tabela_falhas()
+
     if prompt_selecionado != "Todos os Prompts":
         texto_prompt = nome_para_texto.get(prompt_selecionado, texto_prompt)
-        # Filtra o dataframe usando strip para evitar incompatibilidades de quebra de linha
-        df_duelos = df_duelos[df_duelos["prompt"].astype(str).str.strip() == texto_prompt]
+        # Visão memorizada no dataset: a mesma para todas as sessões até a próxima sincronia
+        df_duelos = df_duelos.por_prompt(versao_prompt(texto_prompt))
+        # Falhas são uma tabela pequena: filtra pela versão do prompt (sem prompt = clássico, como no dataset)
+        versao = versao_prompt(texto_prompt)
+        if df_falhas is not None and not df_falhas.empty:
+            df_falhas = df_falhas[df_falhas["prompt"].map(versao_prompt) == versao]
             
     with st.expander("Ver texto do Prompt considerado nestes resultados"):
         if prompt_selecionado == "Todos os Prompts":
@@ -284,14 +423,20 @@ def renderizar_painel_rankings(df_duelos):
              
     st.divider()
 
+    # Figuras de todas as espécies e modelos desta versão dos dados, em segundo plano (uma vez por versão)
+    agendar_precomputo(df_duelos)
+
     # Só exibimos as abas do dashboard abaixo
     renderizar_estatisticas_globais(df_duelos)
 
-    tab_elo, tab_bt, tab_binario, tab_geral = st.tabs([
+    tab_elo, tab_bt, tab_binario, tab_geral, tab_confiabilidade, tab_segmentos, tab_gabarito = st.tabs([
         "Elo Rating", 
         "Bradley-Terry", 
         "Métricas por Espécies (Binário)",
         "Métricas no Geral (por Classes)",
+        "Confiabilidade",
+        "Segmentos",
+        "Gabarito (Automático)",
     ])
 
     with tab_elo:
@@ -305,4 +450,13 @@ def renderizar_painel_rankings(df_duelos):
 
     with tab_geral:
         renderizar_macro_f1(df_duelos)
-        renderizar_matriz_confusao_global(df_duelos)
\ No newline at end of file
+        renderizar_matriz_confusao_global(df_duelos)
+
+    with tab_confiabilidade:
+        renderizar_confiabilidade(df_duelos, df_falhas)
+
+    with tab_segmentos:
+        renderizar_segmentos(None if prompt_selecionado == "Todos os Prompts" else versao_prompt(texto_prompt))
+
+    with tab_gabarito:
+        renderizar_gabarito(df_duelos)
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import PORTA_PRONTIDAO
+from utils.tracing import span, registrar_evento
+
+# Aquecimento do processo: tudo o que o primeiro avaliador pagaria no primeiro duelo é feito uma vez,
+# em segundo plano, logo na partida do worker (imports pesados, clientes dos provedores, pool do banco,
+# catálogo do Drive, imagens pré-carregadas e rankings). O Streamlit não tem gancho de inicialização,
+# então `iniciar.py` dispara o aquecimento antes de subir o servidor; o app.py também chama
+# `iniciar_aquecimento()` (idempotente) para quem roda `streamlit run app.py` direto.
+#
+# O balanceador consulta GET /pronto numa porta própria (PORTA_PRONTIDAO, ou ECOLLM_PORTA_PRONTIDAO):
+# 503 enquanto aquece, 200 depois. Etapas que falham não seguram o worker: ele fica pronto como
+# "degradado" e o duelo volta a fazer a etapa sob demanda, como antes.
+
+
+def _modulos():
+    # Mesmos imports que o app.py adia para depois do login (ver benchmarks/bench_inicio.py)
+    import ui.arena  # noqa: F401
+    import ui.tables  # noqa: F401
+    import ai.models  # noqa: F401
+    return "ok"
+
+
+def _provedores():
+    from ai.provedores import obter_registro
+
+    registro = obter_registro()
+    for provedor in registro.provedores.values():
+        provedor.preparar()
+    return f"{len(registro.modelos)} modelos"
+
+
+def _banco():
+    from data.database import verificar_conexao
+
+    if not verificar_conexao():
+        raise RuntimeError("sem conexão com o banco")
+    return "ok"
+
+
+def _catalogo():
+    import streamlit as st
+    from data.drive import get_drive_service, obter_catalogo
+
+    service = get_drive_service()
+    root_id = st.secrets.get("geral", {}).get("DRIVE_FOLDER_ID")
+    if not service or not root_id:
+        raise RuntimeError("Drive não configurado")
+    catalogo = obter_catalogo(service, root_id)
+    if not catalogo:
+        raise RuntimeError("catálogo vazio")
+    return f"{len(catalogo)} espécies"
+
+
+def _imagens():
+    from data.drive import buffer_imagens
+
+    return f"{buffer_imagens.reabastecer()} imagens"
+
+
+def _rankings():
+    from data.dataset import colecao_duelos
+    from data.segmentos import ranking_segmentado
+    from ui.tables import precomputar_rankings
+    from ui.figuras import precomputar_figuras
+
+    duelos_segmentos = ranking_segmentado.sincronizar(forcar=True)
+    dataset = colecao_duelos.sincronizar(forcar=True)
+    tabelas = precomputar_rankings(dataset)
+    return f"{tabelas} tabelas, {precomputar_figuras(dataset)} figuras, {duelos_segmentos} duelos nos segmentos"
+
+
+# Em ordem: o buffer de imagens usa o catálogo, e os rankings são os menos urgentes
+ETAPAS = [
+    ("modulos", _modulos),
+    ("provedores", _provedores),
+    ("banco", _banco),
+    ("catalogo", _catalogo),
+    ("imagens", _imagens),
+    ("rankings", _rankings),
+]
+
+
+class Aquecimento:
+    """Estado do aquecimento do processo, lido pelo endpoint de prontidão."""
+
+    def __init__(self, etapas):
+        self.etapas = etapas
+        self.estado = {nome: {"status": "pendente"} for nome, _ in etapas}
+        self.pronto = False
+        self.inicio = None
+        self.duracao_s = None
+        self._trava = threading.Lock()
+        self._thread = None
+
+    def executar(self):
+        self.inicio = time.time()
+        with span("aquecimento") as s:
+            for nome, etapa in self.etapas:
+                self.estado[nome] = {"status": "executando"}
+                inicio = time.perf_counter()
+                try:
+                    with span(f"aquecimento.{nome}"):
+                        detalhe = etapa()
+                    self.estado[nome] = {"status": "ok", "detalhe": detalhe}
+                except Exception as e:
+                    self.estado[nome] = {"status": "falhou", "erro": str(e)[:300]}
+                    registrar_evento("aquecimento.falha", f"Aquecimento: etapa '{nome}' falhou: {e}", nivel="aviso", etapa=nome)
+                self.estado[nome]["duracao_s"] = round(time.perf_counter() - inicio, 3)
+            s["attributes"]["degradado"] = self.degradado()
+        self.duracao_s = round(time.time() - self.inicio, 3)
+        self.pronto = True
+        print(f"[LOG] Aquecimento concluído em {self.duracao_s:.1f}s" + (" (degradado)" if self.degradado() else ""))
+
+    def iniciar(self):
+        """Dispara o aquecimento numa thread própria, uma única vez por processo."""
+        with self._trava:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.executar, daemon=True, name="ecollm-aquecimento")
+                self._thread.start()
+        return self._thread
+
+    def degradado(self) -> bool:
+        return any(e["status"] == "falhou" for e in self.estado.values())
+
+    def resumo(self) -> dict:
+        return {
+            "pronto": self.pronto,
+            "degradado": self.degradado(),
+            "duracao_s": self.duracao_s,
+            "etapas": self.estado,
+        }
+
+
+aquecimento = Aquecimento(ETAPAS)
+
+
+def iniciar_aquecimento():
+    return aquecimento.iniciar()
+
+
+class _RespostaProntidao(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/pronto"):
+            codigo = 200 if aquecimento.pronto else 503
+        elif self.path.startswith("/saude"):
+            # Vivo (o processo responde), mesmo aquecendo: para liveness probes
+            codigo = 200
+        else:
+            self.send_error(404)
+            return
+        corpo = json.dumps(aquecimento.resumo(), ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+_servidor = None
+
+
+def iniciar_servidor_prontidao(porta: int = None):
+    """Sobe o endpoint de prontidão numa thread (uma vez por processo). Devolve o servidor."""
+    global _servidor
+    if _servidor is None:
+        porta = porta or int(os.environ.get("ECOLLM_PORTA_PRONTIDAO", PORTA_PRONTIDAO))
+        _servidor = ThreadingHTTPServer(("0.0.0.0", porta), _RespostaProntidao)
+        threading.Thread(target=_servidor.serve_forever, daemon=True, name="ecollm-prontidao").start()
+        print(f"[LOG] Prontidão em http://0.0.0.0:{porta}/pronto")
+    return _servidor
@@ -0,0 +1,271 @@
+import os
+import time
+import sqlite3
+import threading
+from io import BytesIO
+from config import ESTADO_BACKEND_URL, LIMITE_ESTADO_SQLITE_MB, INTERVALO_LIMPEZA_ESTADO_S
+
+# Estado compartilhado entre réplicas do app (várias instâncias do Streamlit atrás de um balanceador).
+# Cache de inferência, cache de imagens, limitadores de taxa dos provedores e cache dos rankings
+# passam por aqui, então N workers veem o mesmo estado em vez de N cópias.
+#
+# Backends (ESTADO_BACKEND_URL no secrets.toml, ou ECOLLM_ESTADO_URL no ambiente):
+#   sqlite:///caminho/estado.db   → padrão; um arquivo compartilhado pelas réplicas da mesma máquina
+#   redis://host:6379/0           → réplicas em máquinas diferentes (requer o pacote `redis`)
+#   memoria://                    → só o processo atual (testes e execução local)
+#
+# Valores são bytes; quem guarda decide a serialização (JSON, Parquet...). Nada de pickle: o backend
+# pode ser compartilhado com outros serviços.
+
+
+class BackendEstado:
+    """Interface mínima de chave-valor com expiração."""
+
+    def obter(self, chave: str) -> bytes | None:
+        raise NotImplementedError
+
+    def definir(self, chave: str, valor: bytes, ttl_s: float = None):
+        raise NotImplementedError
+
+    def apagar(self, chave: str):
+        raise NotImplementedError
+
+    def incrementar(self, chave: str, ttl_s: float) -> int:
+        """Soma 1 ao contador (criado com a expiração dada) e devolve o novo valor. Atômico entre réplicas."""
+        raise NotImplementedError
+
+
+class BackendMemoria(BackendEstado):
+    """Dicionário do processo, com a mesma semântica dos outros backends (stand-in para testes)."""
+
+    def __init__(self):
+        self._itens = {}
+        self._trava = threading.Lock()
+
+    def _vivo(self, chave):
+        item = self._itens.get(chave)
+        if item and item[1] is not None and item[1] <= time.time():
+            del self._itens[chave]
+            return None
+        return item
+
+    def obter(self, chave):
+        with self._trava:
+            item = self._vivo(chave)
+            return item[0] if item else None
+
+    def definir(self, chave, valor, ttl_s=None):
+        with self._trava:
+            self._itens[chave] = (valor, time.time() + ttl_s if ttl_s else None)
+
+    def apagar(self, chave):
+        with self._trava:
+            self._itens.pop(chave, None)
+
+    def incrementar(self, chave, ttl_s):
+        with self._trava:
+            item = self._vivo(chave)
+            valor = int(item[0]) + 1 if item else 1
+            self._itens[chave] = (str(valor).encode(), item[1] if item else time.time() + ttl_s)
+            return valor
+
+
+class BackendSQLite(BackendEstado):
+    """Arquivo SQLite em modo WAL: vários processos leem em paralelo e as escritas são serializadas pelo próprio SQLite.
+
+    Chaves vencidas são apagadas a cada `intervalo_limpeza_s` (na primeira escrita depois do intervalo) e, se os
+    valores passam de `limite_bytes`, as que vencem primeiro saem até caber. As páginas liberadas são
+    reaproveitadas pelo SQLite, então o arquivo para de crescer perto do limite.
+    """
+
+    def __init__(self, caminho: str, limite_bytes: int = None, intervalo_limpeza_s: float = INTERVALO_LIMPEZA_ESTADO_S):
+        self.caminho = caminho
+        self.limite_bytes = limite_bytes
+        self.intervalo_limpeza_s = intervalo_limpeza_s
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self._local = threading.local()
+        self._trava_limpeza = threading.Lock()
+        self._proxima_limpeza = 0.0
+        with self._conexao() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS estado (chave TEXT PRIMARY KEY, valor BLOB, expira REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS estado_expira ON estado (expira)")
+        self.limpar()
+
+    def _conexao(self) -> sqlite3.Connection:
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def obter(self, chave):
+        linha = self._conexao().execute(
+            "SELECT valor FROM estado WHERE chave = ? AND (expira IS NULL OR expira > ?)", (chave, time.time())
+        ).fetchone()
+        return bytes(linha[0]) if linha else None
+
+    def definir(self, chave, valor, ttl_s=None):
+        self._conexao().execute(
+            "INSERT OR REPLACE INTO estado (chave, valor, expira) VALUES (?, ?, ?)",
+            (chave, sqlite3.Binary(valor), time.time() + ttl_s if ttl_s else None)
+        )
+        with self._trava_limpeza:
+            vencida = time.monotonic() >= self._proxima_limpeza
+            if vencida:
+                self._proxima_limpeza = time.monotonic() + self.intervalo_limpeza_s
+        if vencida:
+            self.limpar()
+
+    def limpar(self) -> int:
+        """Apaga as chaves vencidas e, acima do limite, as que vencem primeiro. Devolve quantas saíram."""
+        conn = self._conexao()
+        removidas = conn.execute("DELETE FROM estado WHERE expira IS NOT NULL AND expira <= ?", (time.time(),)).rowcount
+        if self.limite_bytes:
+            excesso = conn.execute("SELECT COALESCE(SUM(LENGTH(valor)), 0) FROM estado").fetchone()[0] - self.limite_bytes
+            if excesso > 0:
+                # Chaves sem expiração (raras) ficam; das outras, sai a menor sequência que cobre o excesso
+                removidas += conn.execute("""
+                    DELETE FROM estado WHERE chave IN (
+                        SELECT chave FROM (
+                            SELECT chave, SUM(LENGTH(valor)) OVER (
+                                ORDER BY expira, chave ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                            ) AS anteriores
+                            FROM estado WHERE expira IS NOT NULL
+                        ) WHERE COALESCE(anteriores, 0) < ?
+                    )""", (excesso,)).rowcount
+        if removidas:
+            print(f"[ESTADO] Limpeza do SQLite: {removidas} chaves removidas.")
+        return removidas
+
+    def apagar(self, chave):
+        self._conexao().execute("DELETE FROM estado WHERE chave = ?", (chave,))
+
+    def incrementar(self, chave, ttl_s):
+        agora = time.time()
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            linha = conn.execute("SELECT valor FROM estado WHERE chave = ? AND (expira IS NULL OR expira > ?)", (chave, agora)).fetchone()
+            valor = int(bytes(linha[0])) + 1 if linha else 1
+            if linha:
+                conn.execute("UPDATE estado SET valor = ? WHERE chave = ?", (str(valor).encode(), chave))
+            else:
+                conn.execute("INSERT OR REPLACE INTO estado (chave, valor, expira) VALUES (?, ?, ?)",
+                             (chave, str(valor).encode(), agora + ttl_s))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return valor
+
+
+class BackendRedis(BackendEstado):
+    """Redis (ou compatível: Valkey, KeyDB, Dragonfly) para réplicas em máquinas diferentes."""
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("ESTADO_BACKEND_URL aponta para Redis, mas o pacote `redis` não está instalado (pip install redis).") from e
+        self.cliente = redis.Redis.from_url(url)
+
+    def obter(self, chave):
+        return self.cliente.get(chave)
+
+    def definir(self, chave, valor, ttl_s=None):
+        self.cliente.set(chave, valor, px=int(ttl_s * 1000) if ttl_s else None)
+
+    def apagar(self, chave):
+        self.cliente.delete(chave)
+
+    def incrementar(self, chave, ttl_s):
+        with self.cliente.pipeline() as pipe:
+            pipe.incr(chave)
+            pipe.pexpire(chave, int(ttl_s * 1000), nx=True)
+            valor, _ = pipe.execute()
+        return int(valor)
+
+
+def criar_backend(url: str) -> BackendEstado:
+    if url.startswith("memoria://"):
+        return BackendMemoria()
+    if url.startswith("sqlite:///"):
+        return BackendSQLite(url[len("sqlite:///"):], LIMITE_ESTADO_SQLITE_MB * 1024 * 1024)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return BackendRedis(url)
+    raise ValueError(f"ESTADO_BACKEND_URL desconhecida: {url}")
+
+
+def _url_configurada() -> str:
+    if "ECOLLM_ESTADO_URL" in os.environ:
+        return os.environ["ECOLLM_ESTADO_URL"]
+    try:
+        import streamlit as st
+        return st.secrets.get("ESTADO_BACKEND_URL", ESTADO_BACKEND_URL)
+    except Exception:
+        # Sem secrets.toml (scripts e benchmarks fora do app)
+        return ESTADO_BACKEND_URL
+
+
+_backend = None
+_trava_backend = threading.Lock()
+
+
+def obter_backend() -> BackendEstado:
+    """Backend do processo, criado na primeira chamada a partir da configuração."""
+    global _backend
+    with _trava_backend:
+        if _backend is None:
+            url = _url_configurada()
+            _backend = criar_backend(url)
+            print(f"[ESTADO] Backend compartilhado: {url.split('@')[-1]}")
+        return _backend
+
+
+def definir_backend(backend: BackendEstado):
+    """Troca o backend do processo (testes e benchmarks usam BackendMemoria)."""
+    global _backend
+    with _trava_backend:
+        _backend = backend
+
+
+class LimitadorTaxa:
+    """Limite de requisições por minuto de um provedor, somado entre todas as réplicas (janela fixa)."""
+
+    def __init__(self, nome: str, por_minuto: int):
+        self.nome = nome
+        self.por_minuto = por_minuto
+
+    def adquirir(self, prazo: float = None) -> bool:
+        """Espera uma vaga na janela atual; devolve False se o prazo (time.monotonic) vencer antes."""
+        while True:
+            janela = int(time.time() // 60)
+            usados = obter_backend().incrementar(f"taxa:{self.nome}:{janela}", ttl_s=120)
+            if usados <= self.por_minuto:
+                return True
+            espera = (janela + 1) * 60 - time.time()
+            if prazo is not None and time.monotonic() + espera >= prazo:
+                return False
+            time.sleep(espera + 0.01)
+
+
+def memorizar_tabela(chave: str, calcular, ttl_s: float = 300):
+    """DataFrame calculado uma vez e compartilhado entre réplicas (serializado em Parquet, índice incluso)."""
+    import pandas as pd
+
+    backend = obter_backend()
+    guardado = backend.obter(chave)
+    if guardado is not None:
+        return pd.read_parquet(BytesIO(guardado))
+
+    tabela = calcular()
+    if isinstance(tabela, pd.DataFrame) and not tabela.empty:
+        buffer = BytesIO()
+        tabela.to_parquet(buffer)
+        backend.definir(chave, buffer.getvalue(), ttl_s)
+    return tabela
@@ -1,9 +1,229 @@
 from PIL import Image
+import math
 import base64
+import hashlib
+import threading
 from io import BytesIO
+from collections import OrderedDict
+from config import (
+    LIMITE_CACHE_IMAGENS_MB, TTL_CACHE_IMAGENS_S, IMAGENS_NO_BACKEND,
+    ORCAMENTO_BYTES_SEQUENCIA, LADO_MAXIMO_QUADRO, LADO_MOSAICO, MIN_QUADROS_SEQUENCIA
+)
+from utils.estado import obter_backend
+from utils.tracing import span, registrar_evento
+
+# Assinatura dos arquivos JPEG: esses bytes podem ir direto para os provedores, sem decodificar/recodificar
+ASSINATURA_JPEG = b"\xff\xd8\xff"
+
+
+class CacheImagens:
+    """Cache LRU compartilhado pelo processo, limitado em bytes, com os bytes originais (JPEG) de cada imagem.
+
+    A sessão guarda só o id da imagem; pixels decodificados, base64 e hash são derivados sob demanda.
+    """
+
+    def __init__(self, limite_bytes: int):
+        self.limite_bytes = limite_bytes
+        self._itens = OrderedDict()
+        self._tamanho = 0
+        self._trava = threading.Lock()
+
+    @staticmethod
+    def _custo(item: dict) -> int:
+        return len(item["bytes"]) + len(item.get("base64") or "")
+
+    def guardar(self, id_imagem: str, dados: bytes):
+        with self._trava:
+            if id_imagem in self._itens:
+                self._itens.move_to_end(id_imagem)
+                return
+            item = {"bytes": dados, "hash": None, "base64": None}
+            self._itens[id_imagem] = item
+            self._tamanho += self._custo(item)
+            self._evictar()
+
+    def obter(self, id_imagem: str):
+        with self._trava:
+            item = self._itens.get(id_imagem)
+            if item is not None:
+                self._itens.move_to_end(id_imagem)
+            return item
+
+    def atualizar(self, id_imagem: str, **campos):
+        with self._trava:
+            item = self._itens.get(id_imagem)
+            if item is None:
+                return
+            self._tamanho -= self._custo(item)
+            item.update(campos)
+            self._tamanho += self._custo(item)
+            self._evictar()
+
+    def _evictar(self):
+        # Sempre mantém a imagem mais recente, mesmo que sozinha ultrapasse o limite
+        while self._tamanho > self.limite_bytes and len(self._itens) > 1:
+            _, removido = self._itens.popitem(last=False)
+            self._tamanho -= self._custo(removido)
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            return {"imagens": len(self._itens), "bytes": self._tamanho, "limite_bytes": self.limite_bytes}
+
+
+cache_imagens = CacheImagens(LIMITE_CACHE_IMAGENS_MB * 1024 * 1024)
+
+
+def registrar_imagem(id_imagem: str, dados: bytes) -> str:
+    """Guarda os bytes originais no cache compartilhado e devolve o id (handle) a ser salvo na sessão."""
+    if IMAGENS_NO_BACKEND and cache_imagens.obter(id_imagem) is None:
+        # Segundo nível, visto pelas outras réplicas: quem sortear a mesma imagem não baixa de novo do Drive
+        obter_backend().definir(f"imagem:{id_imagem}", dados, TTL_CACHE_IMAGENS_S)
+    cache_imagens.guardar(id_imagem, dados)
+    return id_imagem
+
+
+def _item_imagem(id_imagem: str) -> dict | None:
+    # LRU do processo primeiro; na falta, o backend compartilhado (imagem registrada por outra réplica)
+    item = cache_imagens.obter(id_imagem)
+    if item is None and IMAGENS_NO_BACKEND:
+        dados = obter_backend().obter(f"imagem:{id_imagem}")
+        if dados is not None:
+            cache_imagens.guardar(id_imagem, dados)
+            item = cache_imagens.obter(id_imagem)
+    return item
+
+
+def obter_bytes_imagem(id_imagem: str) -> bytes | None:
+    """Bytes originais da imagem, ou None se já saíram do cache."""
+    item = _item_imagem(id_imagem)
+    return item["bytes"] if item else None
+
+
+def abrir_imagem(id_imagem: str) -> Image.Image | None:
+    """Decodifica os pixels sob demanda (não guardar o resultado na sessão)."""
+    dados = obter_bytes_imagem(id_imagem)
+    return Image.open(BytesIO(dados)) if dados is not None else None
+
+
+def _bytes_jpeg(dados: bytes) -> bytes:
+    # JPEG original passa direto; outros formatos (PNG, etc.) são convertidos uma única vez
+    if dados.startswith(ASSINATURA_JPEG):
+        return dados
+    imagem = Image.open(BytesIO(dados))
+    buffer = BytesIO()
+    with span("imagem.jpeg", largura=imagem.width, altura=imagem.height) as s:
+        imagem.convert("RGB").save(buffer, format="JPEG")
+        s["attributes"]["bytes"] = buffer.tell()
+    return buffer.getvalue()
+
+
+def codificar_imagem_id(id_imagem: str) -> tuple[str, str] | None:
+    """Base64 (JPEG) e hash SHA-256 da imagem, calculados uma vez e memorizados no cache."""
+    item = _item_imagem(id_imagem)
+    if item is None:
+        return None
+    if item["base64"] is None:
+        jpeg = _bytes_jpeg(item["bytes"])
+        with span("imagem.base64"):
+            codificada = base64.b64encode(jpeg).decode("utf-8")
+        with span("imagem.hash"):
+            img_hash = hashlib.sha256(codificada.encode()).hexdigest()
+        cache_imagens.atualizar(id_imagem, base64=codificada, hash=img_hash)
+        return codificada, img_hash
+    return item["base64"], item["hash"]
+
 
 def codificar_imagem(imagem: Image.Image) -> str:
     """Converte imagem PIL para string base64."""
     buffer = BytesIO()
-    imagem.save(buffer, format="JPEG")
-    return base64.b64encode(buffer.getvalue()).decode("utf-8")
\ No newline at end of file
+    with span("imagem.jpeg", largura=imagem.width, altura=imagem.height) as s:
+        imagem.save(buffer, format="JPEG")
+        s["attributes"]["bytes"] = buffer.tell()
+    with span("imagem.base64"):
+        return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+# --- SEQUÊNCIAS (vários quadros da mesma rajada numa requisição) ---
+
+# Reduções tentadas, em ordem, até os quadros caberem no orçamento: (fração do lado máximo, qualidade JPEG)
+ETAPAS_REDUCAO = [(1.0, 85), (0.75, 80), (0.5, 75), (0.35, 70)]
+
+
+def _jpeg_reduzido(imagem: Image.Image, lado_maximo: int, qualidade: int) -> bytes:
+    imagem = imagem.convert("RGB")
+    if max(imagem.size) > lado_maximo:
+        imagem = imagem.copy()
+        imagem.thumbnail((lado_maximo, lado_maximo), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    imagem.save(buffer, format="JPEG", quality=qualidade)
+    return buffer.getvalue()
+
+
+def _quadros_no_orcamento(quadros: list, orcamento: int) -> list | None:
+    # JPEGs originais passam direto se couberem; senão todos os quadros descem juntos de resolução/qualidade.
+    # None se nem a última redução cabe.
+    jpegs = [_bytes_jpeg(q) for q in quadros]
+    if sum(len(j) for j in jpegs) <= orcamento:
+        return jpegs
+    imagens = [Image.open(BytesIO(q)) for q in quadros]
+    for fracao, qualidade in ETAPAS_REDUCAO:
+        jpegs = [_jpeg_reduzido(i, int(LADO_MAXIMO_QUADRO * fracao), qualidade) for i in imagens]
+        if sum(len(j) for j in jpegs) <= orcamento:
+            return jpegs
+    return None
+
+
+def montar_mosaico(quadros: list, orcamento: int = ORCAMENTO_BYTES_SEQUENCIA) -> bytes | None:
+    """Quadros lado a lado numa grade (esquerda→direita, cima→baixo), em JPEG dentro do orçamento (None se não cabe)."""
+    imagens = [Image.open(BytesIO(q)).convert("RGB") for q in quadros]
+    colunas = math.ceil(math.sqrt(len(imagens)))
+    linhas = math.ceil(len(imagens) / colunas)
+    # Células com a proporção do primeiro quadro (numa rajada todos têm o mesmo tamanho)
+    largura = LADO_MOSAICO // colunas
+    altura = int(largura * imagens[0].height / imagens[0].width)
+    mosaico = Image.new("RGB", (largura * colunas, altura * linhas))
+    for i, imagem in enumerate(imagens):
+        mosaico.paste(imagem.resize((largura, altura), Image.Resampling.LANCZOS), ((i % colunas) * largura, (i // colunas) * altura))
+
+    for fracao, qualidade in ETAPAS_REDUCAO:
+        jpeg = _jpeg_reduzido(mosaico, int(LADO_MOSAICO * fracao), qualidade)
+        if len(jpeg) <= orcamento:
+            return jpeg
+    return None
+
+
+def codificar_sequencia(ids_imagens: list, modo: str, orcamento: int = ORCAMENTO_BYTES_SEQUENCIA):
+    """Quadros prontos para uma requisição: (base64 de cada anexo, hash da sequência, bytes JPEG enviados, ids enviados).
+
+    "multi_imagem" devolve um anexo por quadro; "mosaico", um anexo só. Se nem a menor redução cabe no orçamento,
+    saem quadros (espaçados, como em sortear_rajada) até caber. None se algum quadro saiu do cache ou se nem
+    MIN_QUADROS_SEQUENCIA quadros cabem.
+    """
+    quadros = [obter_bytes_imagem(i) for i in ids_imagens]
+    if any(q is None for q in quadros):
+        return None
+    ids = list(ids_imagens)
+    with span("imagem.sequencia", quadros=len(quadros), modo=modo) as s:
+        while True:
+            if modo == "mosaico":
+                mosaico = montar_mosaico(quadros, orcamento)
+                jpegs = [mosaico] if mosaico is not None else None
+            else:
+                jpegs = _quadros_no_orcamento(quadros, orcamento)
+            if jpegs is not None or len(quadros) <= MIN_QUADROS_SEQUENCIA:
+                break
+            passo = (len(quadros) - 1) / (len(quadros) - 2)
+            manter = sorted({round(k * passo) for k in range(len(quadros) - 1)})
+            quadros, ids = [quadros[k] for k in manter], [ids[k] for k in manter]
+        if jpegs is None:
+            registrar_evento("imagem.sequencia_grande", f"Sequência de {len(ids_imagens)} quadros não cabe em {orcamento} bytes "
+                             f"nem com {len(quadros)} quadros na menor redução ({modo}): duelo sem a sequência.",
+                             nivel="erro", quadros=len(ids_imagens), modo=modo)
+            return None
+        codificadas = [base64.b64encode(j).decode("utf-8") for j in jpegs]
+        enviados = sum(len(j) for j in jpegs)
+        s["attributes"].update({"bytes": enviados, "enviados": len(ids)})
+    # O modo entra no hash: a mesma rajada em mosaico e em anexos são entradas diferentes para o cache de inferência
+    img_hash = hashlib.sha256((modo + "".join(codificadas)).encode()).hexdigest()
+    return codificadas, img_hash, enviados, ids
+
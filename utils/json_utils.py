@@ -1,27 +1,21 @@
-import json
-import re
 import streamlit as st
+from ai.parsing import analisar_resposta
 
 def extrair_json(texto: str) -> dict | None:
-    """Extrai JSON da resposta. Como usamos JSON Mode, a resposta já deve vir limpa."""
-    texto = texto.strip()
-    
-    # Remover markdown se houver (ex: ```json ... ```)
-    if texto.startswith("```"):
-        texto = re.sub(r"^```(?:json)?\n?|\n?```$", "", texto, flags=re.MULTILINE)
-    
-    try:
-        return json.loads(texto)
-    except json.JSONDecodeError:
-        return None
+    """Extrai o JSON da resposta via ai/parsing.py (memorizado). Respostas truncadas não contam como JSON válido."""
+    registro = analisar_resposta(texto)
+    return registro.dados if registro.json_valido else None
 
 def decodificar_json(resposta: str) -> bool:
     """Tenta renderizar o JSON na interface."""
-    dados = extrair_json(resposta)
-    if dados:
-        st.json(dados)
+    registro = analisar_resposta(resposta)
+    if registro.json_valido and registro.dados:
+        st.json(registro.dados)
         return True
     
-    st.warning("O modelo não retornou um JSON válido.")
+    if registro.truncado:
+        st.warning("O modelo retornou um JSON incompleto (resposta truncada).")
+    else:
+        st.warning("O modelo não retornou um JSON válido.")
     st.code(resposta, language="text")
-    return False
\ No newline at end of file
+    return False
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import secrets
+import threading
+import contextvars
+from contextlib import contextmanager
+from config import LIMITE_ARQUIVO_SPANS_MB, COPIAS_ARQUIVO_SPANS
+
+# Rastreamento leve de latência por etapa do duelo (Drive, imagem, modelos, banco).
+# Cada span vira uma linha JSONL com os mesmos campos de um span OpenTelemetry
+# (trace_id, span_id, parent_span_id, start/end em nanossegundos, atributos e status),
+# então o arquivo pode ser importado por qualquer coletor OTLP ou analisado com pandas.
+# O arquivo gira por tamanho (spans.jsonl → spans.jsonl.1 → ...), como um RotatingFileHandler.
+
+ARQUIVO_SPANS = os.environ.get("ECOLLM_TRACE_FILE", os.path.join("logs", "spans.jsonl"))
+
+_span_atual = contextvars.ContextVar("ecollm_span_atual", default=None)
+_trava_escrita = threading.Lock()
+_arquivo = None
+
+
+def _arquivos_spans(caminho: str) -> list:
+    # O arquivo atual e as cópias giradas, do mais novo para o mais antigo
+    return [caminho] + [f"{caminho}.{i}" for i in range(1, COPIAS_ARQUIVO_SPANS + 1)]
+
+
+def _girar():
+    # Chamada com a trava: spans.jsonl.N-1 → .N, ..., spans.jsonl → .1 (a cópia mais antiga é descartada)
+    arquivos = _arquivos_spans(ARQUIVO_SPANS)
+    for origem, destino in zip(reversed(arquivos[:-1]), reversed(arquivos[1:])):
+        if os.path.exists(origem):
+            os.replace(origem, destino)
+
+
+def _gravar(registro: dict):
+    global _arquivo
+    linha = json.dumps(registro, ensure_ascii=False, default=str)
+    with _trava_escrita:
+        try:
+            # Outro processo pode ter girado o arquivo: reabre se o caminho já não é o arquivo aberto
+            if _arquivo is not None and not _mesmo_arquivo(_arquivo):
+                _arquivo.close()
+                _arquivo = None
+            if _arquivo is None:
+                pasta = os.path.dirname(ARQUIVO_SPANS)
+                if pasta:
+                    os.makedirs(pasta, exist_ok=True)
+                _arquivo = open(ARQUIVO_SPANS, "a", encoding="utf-8")
+            _arquivo.write(linha + "\n")
+            _arquivo.flush()
+            if _arquivo.tell() >= LIMITE_ARQUIVO_SPANS_MB * 1024 * 1024:
+                _arquivo.close()
+                _arquivo = None
+                _girar()
+        except OSError as e:
+            # Rastreamento nunca pode derrubar o duelo
+            print(f"[TRACE] Falha ao gravar span: {e}")
+
+
+def _mesmo_arquivo(arquivo) -> bool:
+    try:
+        return os.path.samestat(os.fstat(arquivo.fileno()), os.stat(ARQUIVO_SPANS))
+    except OSError:
+        return False
+
+
+@contextmanager
+def span(nome: str, **atributos):
+    # Mede a duração de um bloco. Spans aninhados herdam o trace_id e apontam para o span pai,
+    # então um duelo inteiro (download → codificação → chamadas → insert) fica numa única árvore.
+    pai = _span_atual.get()
+    registro = {
+        "tipo": "span",
+        "name": nome,
+        "trace_id": pai["trace_id"] if pai else secrets.token_hex(16),
+        "span_id": secrets.token_hex(8),
+        "parent_span_id": pai["span_id"] if pai else None,
+        "start_time_unix_nano": time.time_ns(),
+        "attributes": dict(atributos),
+        "status": "OK",
+    }
+    token = _span_atual.set(registro)
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    except BaseException as e:
+        registro["status"] = "ERROR"
+        registro["attributes"]["erro"] = str(e)[:500]
+        raise
+    finally:
+        registro["duracao_s"] = time.perf_counter() - inicio
+        registro["end_time_unix_nano"] = registro["start_time_unix_nano"] + int(registro["duracao_s"] * 1e9)
+        _span_atual.reset(token)
+        _gravar(registro)
+
+
+def marcar_erro(mensagem: str):
+    # Marca o span atual como falho sem lançar exceção (ex.: funções que devolvem None/False em caso de erro).
+    atual = _span_atual.get()
+    if atual:
+        atual["status"] = "ERROR"
+        atual["attributes"]["erro"] = str(mensagem)[:500]
+
+
+def registrar_evento(nome: str, mensagem: str, nivel: str = "info", **atributos):
+    # Evento estruturado (substitui os antigos print("[LOG] ...")). Continua saindo no terminal
+    # e é gravado no mesmo arquivo, ligado ao span em andamento.
+    print(f"[LOG] {mensagem}")
+    atual = _span_atual.get()
+    _gravar({
+        "tipo": "evento",
+        "name": nome,
+        "nivel": nivel,
+        "mensagem": mensagem,
+        "time_unix_nano": time.time_ns(),
+        "trace_id": atual["trace_id"] if atual else None,
+        "span_id": atual["span_id"] if atual else None,
+        "attributes": atributos,
+    })
+
+
+def _linhas_do_fim(caminho: str, bloco: int = 1 << 20):
+    # Linhas do arquivo do fim para o começo, lidas em blocos (o arquivo nunca é carregado inteiro)
+    with open(caminho, "rb") as f:
+        posicao = f.seek(0, os.SEEK_END)
+        resto = b""
+        while posicao > 0:
+            tamanho = min(bloco, posicao)
+            posicao -= tamanho
+            f.seek(posicao)
+            linhas = (f.read(tamanho) + resto).split(b"\n")
+            resto = linhas.pop(0)
+            yield from reversed(linhas)
+        yield resto
+
+
+def carregar_spans(caminho: str = None, limite: int = 200000):
+    # Lê os últimos `limite` registros de span como DataFrame, do fim do arquivo atual para trás
+    # (e nas cópias giradas, se faltar), em ordem cronológica.
+    import pandas as pd
+
+    registros = []
+    for arquivo in _arquivos_spans(caminho or ARQUIVO_SPANS):
+        if not os.path.exists(arquivo):
+            continue
+        for linha in _linhas_do_fim(arquivo):
+            if len(registros) >= limite:
+                break
+            try:
+                registro = json.loads(linha)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # Linha vazia ou ainda sendo escrita por outro processo
+                continue
+            if registro.get("tipo") == "span":
+                registros.append(registro)
+        if len(registros) >= limite:
+            break
+
+    return pd.DataFrame(registros[::-1])
+
+
+def calcular_percentis(spans):
+    # Percentis de latência por etapa (p50/p90/p99), volume e taxa de erro.
+    import pandas as pd
+
+    if spans.empty:
+        return pd.DataFrame()
+
+    agrupado = spans.groupby("name")
+    tabela = pd.DataFrame({
+        "Chamadas": agrupado.size(),
+        "p50 (s)": agrupado["duracao_s"].quantile(0.50),
+        "p90 (s)": agrupado["duracao_s"].quantile(0.90),
+        "p99 (s)": agrupado["duracao_s"].quantile(0.99),
+        "Máximo (s)": agrupado["duracao_s"].max(),
+        "Erros (%)": agrupado["status"].apply(lambda s: (s == "ERROR").mean() * 100),
+    }).round(3)
+
+    return tabela.sort_values("p90 (s)", ascending=False).rename_axis("Etapa").reset_index()
+
+
+def calcular_prazos_hedge(spans):
+    # Por modelo: chamadas, prazos excedidos, hedges disparados e quantos deles venceram a corrida.
+    import pandas as pd
+
+    if spans.empty:
+        return pd.DataFrame()
+    chamadas = spans[spans["name"] == "modelo.chamada"]
+    if chamadas.empty:
+        return pd.DataFrame()
+
+    atributos = pd.DataFrame(chamadas["attributes"].tolist(), index=chamadas.index)
+    for coluna in ("hedge", "vencedor", "prazo_excedido"):
+        if coluna not in atributos:
+            atributos[coluna] = None
+    atributos["hedge"] = atributos["hedge"].fillna(False).astype(bool)
+    atributos["prazo_excedido"] = atributos["prazo_excedido"].fillna(False).astype(bool)
+    atributos["hedge_venceu"] = atributos["vencedor"] == "hedge"
+
+    agrupado = atributos.groupby("modelo")
+    tabela = pd.DataFrame({
+        "Chamadas": agrupado.size(),
+        "Prazo excedido (%)": agrupado["prazo_excedido"].mean() * 100,
+        "Hedges (%)": agrupado["hedge"].mean() * 100,
+        "Hedge venceu (%)": agrupado["hedge_venceu"].sum() / agrupado["hedge"].sum().where(lambda n: n > 0) * 100,
+    }).round(1)
+
+    return tabela.sort_values("Prazo excedido (%)", ascending=False).rename_axis("Modelo").reset_index()